@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import datetime as dt
+import os
+import tracemalloc
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any, NamedTuple
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from benchmarks.synthetic import generate_tree
+from py_clickhouse_migrator.migrator import LedgerRow, LedgerSnapshot, Migrator
+
+FAKE_URL = "clickhouse://default@localhost:9000/bench"
+# 50k files take a while to generate and parse; opt in with BENCH_SIZES=100,1000,10000,50000.
+SIZES = [int(size) for size in os.environ.get("BENCH_SIZES", "100,1000,10000").split(",")]
+APPLIED_AT = dt.datetime(2026, 1, 1)
+
+
+class MigrationTree(NamedTuple):
+    path: Path
+    names: list[str]
+
+
+@pytest.fixture(scope="session", params=SIZES, ids=lambda size: f"{size}_files")
+def migration_tree(request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory) -> MigrationTree:
+    size: int = request.param
+    path = tmp_path_factory.mktemp(f"tree_{size}")
+    return MigrationTree(path=path, names=generate_tree(path, size))
+
+
+def make_offline_migrator(migrations_dir: Path, **kwargs: Any) -> Migrator:
+    """Build a ``Migrator`` with a mocked client, for code paths that only need a ledger snapshot."""
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", return_value=MagicMock()),
+        patch.object(Migrator, "check_migrations_table"),
+    ):
+        return Migrator(database_url=FAKE_URL, migrations_dir=str(migrations_dir), **kwargs)
+
+
+def stub_ledger(names: list[str], checksums: dict[str, str] | None = None) -> LedgerSnapshot:
+    checksums = checksums or {}
+    return LedgerSnapshot(
+        [
+            LedgerRow(name, "migration", checksums.get(name, ""), APPLIED_AT + dt.timedelta(seconds=i))
+            for i, name in enumerate(names)
+        ]
+    )
+
+
+@pytest.fixture
+def track_peak_memory(benchmark: Any) -> Iterator[Callable[[Callable[[], object]], None]]:
+    """Run the callable once under tracemalloc and store its peak in the benchmark's ``extra_info``."""
+
+    def measure(func: Callable[[], object]) -> None:
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_memory_kib"] = round(peak / 1024)
+
+    yield measure
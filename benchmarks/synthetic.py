@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import os
+import random
+from pathlib import Path
+
+_CREATE = """CREATE TABLE IF NOT EXISTS t_{index}_{stmt}
+(
+    id UInt64,
+    created_at DateTime,
+    payload String,
+    tags Array(LowCardinality(String))
+)
+ENGINE = MergeTree
+ORDER BY (id, created_at)"""
+_ALTER = "ALTER TABLE t_{index}_0 ADD COLUMN IF NOT EXISTS c_{stmt} Nullable(String) COMMENT 'column {stmt}'"
+_DROP = "DROP TABLE IF EXISTS t_{index}_{stmt}"
+_MTIME_NS = 1_600_000_000_000_000_000
+
+
+def _insert(rng: random.Random, index: int, stmt: int) -> str:
+    rows = ",\n".join(f"({rng.randrange(10**9)}, now(), '{'x' * rng.randrange(16, 256)}', [])" for _ in range(40))
+    return f"INSERT INTO t_{index}_0 (id, created_at, payload, tags) VALUES\n{rows}"
+
+
+def render_migration(rng: random.Random, index: int) -> str:
+    """Render one migration with 1-8 up statements of mixed size and a matching rollback."""
+    up: list[str] = []
+    rollback: list[str] = []
+    for stmt in range(rng.randint(1, 8)):
+        kind = rng.random()
+        if stmt == 0 or kind < 0.4:
+            up.append(_CREATE.format(index=index, stmt=stmt))
+            rollback.append(_DROP.format(index=index, stmt=stmt))
+        elif kind < 0.9:
+            up.append(_ALTER.format(index=index, stmt=stmt))
+            rollback.append(f"ALTER TABLE t_{index}_0 DROP COLUMN IF EXISTS c_{stmt}")
+        else:
+            up.append(_insert(rng, index, stmt))
+    sections = ["-- migrator:up"]
+    sections.extend(f"-- @stmt\n{statement}\n" for statement in up)
+    sections.append("-- migrator:down")
+    sections.extend(f"-- @stmt\n{statement}\n" for statement in reversed(rollback))
+    return "\n".join(sections)
+
+
+def generate_tree(path: Path, count: int, seed: int = 0) -> list[str]:
+    """Write ``count`` deterministic migration files into ``path`` and return their names in apply order."""
+    rng = random.Random(seed)
+    path.mkdir(parents=True, exist_ok=True)
+    names = [f"{20200101000000 + index:014d}_m{index}.sql" for index in range(count)]
+    for index, name in enumerate(names):
+        filepath = os.path.join(path, name)
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(render_migration(rng, index))
+        # Old mtimes keep files outside the checksum cache's racy window, like a checked-out repository.
+        os.utime(filepath, ns=(_MTIME_NS, _MTIME_NS))
+    return names
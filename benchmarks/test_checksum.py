@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import Any
+
+from benchmarks.conftest import MigrationTree, make_offline_migrator, stub_ledger
+from py_clickhouse_migrator.migrator import _compute_file_checksum
+
+
+def _checksum_tree(tree: MigrationTree) -> dict[str, str]:
+    return {name: _compute_file_checksum(name, str(tree.path / name)) for name in tree.names}
+
+
+def test_checksum_tree(benchmark: Any, track_peak_memory: Any, migration_tree: MigrationTree) -> None:
+    track_peak_memory(lambda: _checksum_tree(migration_tree))
+    checksums = benchmark.pedantic(_checksum_tree, args=(migration_tree,), rounds=3, iterations=1)
+    assert len(checksums) == len(migration_tree.names)
+
+
+def test_validate_checksums_uncached(benchmark: Any, track_peak_memory: Any, migration_tree: MigrationTree) -> None:
+    migrator = make_offline_migrator(migration_tree.path, use_cache=False)
+    ledger = stub_ledger(migration_tree.names, _checksum_tree(migration_tree))
+
+    track_peak_memory(lambda: migrator.validate_checksums(ledger=ledger))
+    mismatches = benchmark.pedantic(migrator.validate_checksums, kwargs={"ledger": ledger}, rounds=3, iterations=1)
+    assert mismatches == []
+
+
+def test_validate_checksums_cached(benchmark: Any, migration_tree: MigrationTree) -> None:
+    ledger = stub_ledger(migration_tree.names, _checksum_tree(migration_tree))
+    make_offline_migrator(migration_tree.path).validate_checksums(ledger=ledger)
+
+    def validate() -> object:
+        return make_offline_migrator(migration_tree.path).validate_checksums(ledger=ledger)
+
+    assert benchmark.pedantic(validate, rounds=3, iterations=1) == []
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from typing import Any
+
+from benchmarks.conftest import MigrationTree
+from py_clickhouse_migrator.migration_parser import extract_migration_statements, load_migration_sections
+
+
+def _parse_tree(tree: MigrationTree) -> int:
+    statements = 0
+    for name in tree.names:
+        parsed = extract_migration_statements(load_migration_sections(str(tree.path / name)))
+        statements += len(parsed.up) + len(parsed.rollback)
+    return statements
+
+
+def test_parse_tree(benchmark: Any, track_peak_memory: Any, migration_tree: MigrationTree) -> None:
+    track_peak_memory(lambda: _parse_tree(migration_tree))
+    statements = benchmark.pedantic(_parse_tree, args=(migration_tree,), rounds=3, iterations=1)
+    benchmark.extra_info["statements"] = statements
+    assert statements >= 2 * len(migration_tree.names)
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from typing import Any
+
+from benchmarks.conftest import MigrationTree, make_offline_migrator, stub_ledger
+
+
+def test_get_migrations_for_apply(benchmark: Any, track_peak_memory: Any, migration_tree: MigrationTree) -> None:
+    migrator = make_offline_migrator(migration_tree.path, use_cache=False)
+    applied = len(migration_tree.names) // 2
+    ledger = stub_ledger(migration_tree.names[:applied])
+
+    track_peak_memory(lambda: migrator.get_migrations_for_apply(ledger=ledger))
+    pending = benchmark.pedantic(migrator.get_migrations_for_apply, kwargs={"ledger": ledger}, rounds=3, iterations=1)
+    assert [migration.name for migration in pending] == migration_tree.names[applied:]
+
+
+def test_get_unapplied_migration_names(benchmark: Any, migration_tree: MigrationTree) -> None:
+    migrator = make_offline_migrator(migration_tree.path, use_cache=False)
+    ledger = stub_ledger(migration_tree.names[: len(migration_tree.names) // 2])
+
+    names = benchmark(migrator.get_unapplied_migration_names, ledger=ledger)
+    assert len(names) == len(migration_tree.names) - len(migration_tree.names) // 2
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from benchmarks.synthetic import generate_tree
+from py_clickhouse_migrator.migrator import Migrator
+from tests.fake_clickhouse import FakeClickHouse
+
+URL = "clickhouse://default@localhost:9000/bench"
+# Simulated network round trip to the server.
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.001"))
+TREE_SIZE = 100
+
+
+@pytest.fixture(scope="module")
+def small_tree(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    path = tmp_path_factory.mktemp("round_trips")
+    generate_tree(path, TREE_SIZE)
+    return path
+
+
+def _connect(server: FakeClickHouse, tree: Path) -> Migrator:
+    return Migrator(URL, migrations_dir=str(tree), use_cache=False, client_factory=server.connect)  # type: ignore[arg-type]
+
+
+def test_up_against_fake_server(benchmark: Any, small_tree: Path) -> None:
+    servers: list[FakeClickHouse] = []
+
+    def setup() -> tuple[tuple[Migrator], dict[str, Any]]:
+        server = FakeClickHouse(databases=["bench"], latency=LATENCY)
+        servers.append(server)
+        migrator = _connect(server, small_tree)
+        server.reset_stats()
+        return (migrator,), {}
+
+    benchmark.pedantic(lambda migrator: migrator.up(), setup=setup, rounds=3)
+    benchmark.extra_info["round_trips"] = servers[-1].round_trips
+    assert len(servers[-1].applied_names("bench")) == TREE_SIZE
+
+
+def test_show_against_fake_server(benchmark: Any, small_tree: Path) -> None:
+    server = FakeClickHouse(databases=["bench"], latency=LATENCY)
+    migrator = _connect(server, small_tree)
+    migrator.up(validate=False)
+    server.reset_stats()
+
+    benchmark.pedantic(migrator.show_migrations, rounds=5)
+    benchmark.extra_info["round_trips"] = server.round_trips // 5
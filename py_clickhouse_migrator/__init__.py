@@ -1,38 +1,97 @@
-from .checksum import compute_checksum, normalize_content
-from .errors import (
-    ChecksumMismatchError,
-    ClickHouseServerIsNotHealthyError,
-    DatabaseNotFoundError,
-    InvalidMigrationError,
-    MigrationDirectoryNotFoundError,
-    MissingDatabaseUrlError,
-)
-from .lock import LockError, LockTimeoutError, MigrationLock
-from .migrator import (
-    ChecksumMismatch,
-    Migrator,
-    ShowMigrationsResult,
-    create_migration_file,
-    create_migrations_dir,
-    make_migration_filename,
-)
+import importlib
+from typing import TYPE_CHECKING, Any, Final
+
+if TYPE_CHECKING:
+    from .aio import AsyncMigrationLock, AsyncMigrator
+    from .checksum import compute_checksum, normalize_content
+    from .errors import (
+        ChecksumMismatchError,
+        ClickHouseServerIsNotHealthyError,
+        DatabaseNotFoundError,
+        InvalidMigrationError,
+        MigrationDirectoryNotFoundError,
+        MissingDatabaseUrlError,
+    )
+    from .fanout import DatabaseResult, up_databases
+    from .files import create_migration_file, create_migrations_dir, make_migration_filename
+    from .lock import LockBackend, LockError, LockLostError, LockTimeoutError, LockWait, LockWaitStrategy, MigrationLock
+    from .migrator import ChecksumMismatch, Migrator, ShowMigrationsResult
+    from .throttle import ThrottleConfig
+    from .timings import QueryCategory, QueryTimings
+
+# Public names are imported on first access (PEP 562), so importing the package or running offline CLI
+# commands does not load clickhouse_driver.
+_LAZY_EXPORTS: Final[dict[str, str]] = {
+    "AsyncMigrationLock": ".aio",
+    "AsyncMigrator": ".aio",
+    "ChecksumMismatch": ".migrator",
+    "ChecksumMismatchError": ".errors",
+    "ClickHouseServerIsNotHealthyError": ".errors",
+    "DatabaseNotFoundError": ".errors",
+    "DatabaseResult": ".fanout",
+    "InvalidMigrationError": ".errors",
+    "LockBackend": ".lock",
+    "LockError": ".lock",
+    "LockLostError": ".lock",
+    "LockTimeoutError": ".lock",
+    "LockWait": ".lock",
+    "LockWaitStrategy": ".lock",
+    "MigrationDirectoryNotFoundError": ".errors",
+    "MigrationLock": ".lock",
+    "MissingDatabaseUrlError": ".errors",
+    "Migrator": ".migrator",
+    "QueryCategory": ".timings",
+    "QueryTimings": ".timings",
+    "ShowMigrationsResult": ".migrator",
+    "ThrottleConfig": ".throttle",
+    "compute_checksum": ".checksum",
+    "create_migration_file": ".files",
+    "create_migrations_dir": ".files",
+    "make_migration_filename": ".files",
+    "normalize_content": ".checksum",
+    "up_databases": ".fanout",
+}
 
 __all__ = [
+    "AsyncMigrationLock",
+    "AsyncMigrator",
     "ChecksumMismatch",
     "ChecksumMismatchError",
     "ClickHouseServerIsNotHealthyError",
     "DatabaseNotFoundError",
+    "DatabaseResult",
     "InvalidMigrationError",
+    "LockBackend",
     "LockError",
+    "LockLostError",
     "LockTimeoutError",
+    "LockWait",
+    "LockWaitStrategy",
     "MigrationDirectoryNotFoundError",
     "MigrationLock",
-    "MissingDatabaseUrlError",
     "Migrator",
+    "MissingDatabaseUrlError",
+    "QueryCategory",
+    "QueryTimings",
     "ShowMigrationsResult",
+    "ThrottleConfig",
     "compute_checksum",
     "create_migration_file",
     "create_migrations_dir",
     "make_migration_filename",
     "normalize_content",
+    "up_databases",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from types import TracebackType
+from typing import Any, TypeVar
+
+from clickhouse_driver import Client
+
+from py_clickhouse_migrator.lock import LockBackend, LockInfo, LockWait, LockWaiter, MigrationLock
+from py_clickhouse_migrator.migrator import (
+    ChecksumMismatch,
+    LedgerSnapshot,
+    MigrationStats,
+    Migrator,
+    ShowMigrationsResult,
+)
+
+logger = logging.getLogger("py_clickhouse_migrator")
+
+_T = TypeVar("_T")
+
+
+def _new_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="py_clickhouse_migrator")
+
+
+async def _run_in(executor: Executor | None, func: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+    return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+class AsyncMigrator:
+    """asyncio interface to ``Migrator`` with the same semantics.
+
+    ``clickhouse-driver`` is synchronous, so the blocking round trips of each call still run on a thread: by
+    default a single worker thread owned by this instance and stopped by ``close``, not the loop's default
+    executor, so long migrations and lock waits do not take threads the application needs for its own
+    ``asyncio.to_thread`` calls. Many targets can be migrated concurrently from one loop with
+    ``asyncio.gather``. Calls on the same instance are serialized because they share one connection.
+
+    Use ``await AsyncMigrator.create(...)`` with the ``Migrator`` arguments, or wrap an existing ``Migrator``.
+
+    Args:
+        migrator: Connected synchronous migrator.
+        executor: Runs the blocking calls instead of a thread of this instance; it is not shut down by ``close``.
+
+    """
+
+    def __init__(self, migrator: Migrator, executor: Executor | None = None) -> None:
+        self.migrator: Migrator = migrator
+        self._lock = asyncio.Lock()
+        self._owns_executor = executor is None
+        self._executor: Executor = executor or _new_executor()
+
+    @classmethod
+    async def create(cls, executor: Executor | None = None, **kwargs: Any) -> AsyncMigrator:
+        """Connect, run the health check and create ``db_migrations`` without blocking the event loop.
+
+        Args:
+            executor: Runs the blocking calls, see ``AsyncMigrator``.
+            kwargs: ``Migrator`` arguments.
+
+        """
+        own_executor = executor or _new_executor()
+        try:
+            migrator = await _run_in(own_executor, Migrator, **kwargs)
+        except BaseException:
+            if executor is None:
+                own_executor.shutdown(wait=False)
+            raise
+        instance = cls(migrator, executor=own_executor)
+        instance._owns_executor = executor is None
+        return instance
+
+    async def _run(self, func: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+        async with self._lock:
+            return await _run_in(self._executor, func, *args, **kwargs)
+
+    async def up(
+        self, n: int | None = None, dry_run: bool = False, allow_dirty: bool = False, validate: bool = True
+    ) -> list[str]:
+        return await self._run(self.migrator.up, n=n, dry_run=dry_run, allow_dirty=allow_dirty, validate=validate)
+
+    async def rollback(self, number: int = 1, dry_run: bool = False, validate: bool = True) -> None:
+        await self._run(self.migrator.rollback, number=number, dry_run=dry_run, validate=validate)
+
+    async def show_migrations(
+        self, show_all: bool = False, ledger: LedgerSnapshot | None = None
+    ) -> ShowMigrationsResult:
+        return await self._run(self.migrator.show_migrations, show_all=show_all, ledger=ledger)
+
+    async def get_migration_stats(
+        self, limit: int | None = 10, ledger: LedgerSnapshot | None = None
+    ) -> list[MigrationStats]:
+        return await self._run(self.migrator.get_migration_stats, limit=limit, ledger=ledger)
+
+    async def load_ledger(self) -> LedgerSnapshot:
+        return await self._run(self.migrator.load_ledger)
+
+    async def validate_checksums(self, ledger: LedgerSnapshot | None = None) -> list[ChecksumMismatch]:
+        return await self._run(self.migrator.validate_checksums, ledger=ledger)
+
+    async def repair(self, ledger: LedgerSnapshot | None = None) -> list[str]:
+        return await self._run(self.migrator.repair, ledger=ledger)
+
+    async def baseline(self) -> list[str]:
+        return await self._run(self.migrator.baseline)
+
+    def get_db_name(self) -> str:
+        return self.migrator.get_db_name()
+
+    def lock(self, **kwargs: Any) -> AsyncMigrationLock:
+        """Return an ``AsyncMigrationLock`` for this migrator's database; ``kwargs`` go to ``MigrationLock``.
+
+        While the lock is entered, a heartbeat renews it over a new connection and ``up`` and ``rollback`` stop
+        before the next statement once it is lost.
+        """
+        kwargs.setdefault("cluster", self.migrator.cluster)
+        kwargs.setdefault("executor", self._executor)
+        if kwargs.get("backend") is None:
+            kwargs.setdefault("heartbeat_client", self.migrator.create_client())
+        return AsyncMigrationLock(
+            client=self.migrator.ch_client, db=self.get_db_name(), migrator=self.migrator, **kwargs
+        )
+
+    async def close(self) -> None:
+        """Disconnect, and stop the worker thread unless the executor was passed in."""
+        try:
+            await self._run(self.migrator.close)
+        finally:
+            if self._owns_executor:
+                self._executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> AsyncMigrator:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+
+class AsyncMigrationLock:
+    """asyncio interface to ``MigrationLock``.
+
+    Waiting for a held lock uses ``asyncio.sleep`` between attempts instead of blocking a thread.
+    The lock table is created on first use. While the context is entered, the heartbeat of ``MigrationLock`` renews
+    the lock from its own thread and ``migrator`` stops before the next statement once the lock is lost. Lock
+    queries run on ``executor``, or on the loop's default executor when it is not set.
+
+    Args:
+        ttl: Lock expiration time in seconds.
+        retry_count: Number of acquire retries when lock is held.
+        retry_delay: Seconds between acquire retries.
+        cluster: ClickHouse cluster name for replicated lock table.
+        wait: Wait strategy for a held lock; replaces ``retry_delay``, and ``retry_count`` when it has a timeout.
+        heartbeat_client: Connection the heartbeat renews the lock with, see ``MigrationLock``.
+        heartbeat_interval: Seconds between renewals; a third of ``ttl`` by default.
+        backend: Stores the lock instead of the ``_migrations_lock`` table, see ``MigrationLock``.
+        migrator: Migrator whose ``lock`` is set to this lock while the context is entered.
+        executor: Runs the blocking lock queries; ``AsyncMigrator.lock`` passes the migrator's own.
+
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        db: str,
+        ttl: int = 300,
+        retry_count: int = 0,
+        retry_delay: float = 1.0,
+        cluster: str = "",
+        wait: LockWait | None = None,
+        heartbeat_client: Client | None = None,
+        heartbeat_interval: float | None = None,
+        backend: LockBackend | None = None,
+        migrator: Migrator | None = None,
+        executor: Executor | None = None,
+    ) -> None:
+        self._client = client
+        self._db = db
+        self._ttl = ttl
+        self._retry_count = retry_count
+        self._retry_delay = retry_delay
+        self._cluster = cluster
+        self._wait = wait
+        self._heartbeat_client = heartbeat_client
+        self._heartbeat_interval = heartbeat_interval
+        self._backend = backend
+        self._migrator = migrator
+        self._executor = executor
+        self._lock: MigrationLock | None = None
+
+    async def _get_lock(self) -> MigrationLock:
+        if self._lock is None:
+            self._lock = await _run_in(
+                self._executor,
+                MigrationLock,
+                client=self._client,
+                db=self._db,
+                ttl=self._ttl,
+                retry_count=self._retry_count,
+                retry_delay=self._retry_delay,
+                cluster=self._cluster,
+                wait=self._wait,
+                heartbeat_client=self._heartbeat_client,
+                heartbeat_interval=self._heartbeat_interval,
+                backend=self._backend,
+            )
+        return self._lock
+
+    async def acquire(self, retry_count: int = 0, retry_delay: float = 1.0, wait: LockWait | None = None) -> None:
+        """Acquire the migration lock.
+
+        Args:
+            retry_count: Number of retries if lock is already held.
+            retry_delay: Seconds between retries.
+            wait: Wait strategy; replaces ``retry_delay``, and ``retry_count`` when it has a timeout.
+
+        """
+        lock = await self._get_lock()
+        waiter = LockWaiter(wait or LockWait(delay=retry_delay, max_delay=retry_delay), retry_count)
+        while True:
+            lock_info = await _run_in(self._executor, lock.get_lock_info)
+            if lock_info is None:
+                lock_info = await _run_in(self._executor, lock.try_acquire)
+                if lock_info is None:
+                    return
+            delay = waiter.next_delay(lock_info)
+            if delay is None:
+                raise waiter.error(lock_info)
+            logger.debug("Lock held by %s, retrying in %.1fs (retry %d)", lock_info.locked_by, delay, waiter.retries)
+            await asyncio.sleep(delay)
+
+    async def release(self, *, force: bool = False) -> None:
+        lock = await self._get_lock()
+        await _run_in(self._executor, lock.release, force=force)
+
+    async def is_locked(self) -> bool:
+        lock = await self._get_lock()
+        return await _run_in(self._executor, lock.is_locked)
+
+    async def get_lock_info(self) -> LockInfo | None:
+        lock = await self._get_lock()
+        return await _run_in(self._executor, lock.get_lock_info)
+
+    @property
+    def lost(self) -> bool:
+        """Whether the heartbeat found the lock expired or taken over."""
+        return self._lock is not None and self._lock.lost.is_set()
+
+    def check(self) -> None:
+        """Raise ``LockLostError`` if the heartbeat found the lock expired or taken over."""
+        if self._lock is not None:
+            self._lock.check()
+
+    async def __aenter__(self) -> AsyncMigrationLock:
+        await self.acquire(retry_count=self._retry_count, retry_delay=self._retry_delay, wait=self._wait)
+        lock = await self._get_lock()
+        lock.start_heartbeat()
+        if self._migrator is not None:
+            self._migrator.lock = lock
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        lock = await self._get_lock()
+        if self._migrator is not None and self._migrator.lock is lock:
+            self._migrator.lock = None
+        try:
+            await _run_in(self._executor, lock.stop_heartbeat)
+        except Exception:
+            logger.exception("Failed to stop the migration lock heartbeat")
+        try:
+            await self.release()
+        except Exception:
+            logger.exception("Failed to release migration lock")
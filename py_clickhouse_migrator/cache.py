@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Final, NamedTuple
+
+logger = logging.getLogger("py_clickhouse_migrator")
+
+CACHE_FILENAME: Final[str] = ".migrator-cache"
+_CACHE_VERSION: Final[int] = 1
+# Files modified this recently are not cached: a second write within the filesystem timestamp
+# granularity could keep the same size and mtime while changing the content.
+_RACY_WINDOW_NS: Final[int] = 2_000_000_000
+_MAX_VALIDATED: Final[int] = 10_000
+
+
+class FileSignature(NamedTuple):
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+class _CacheEntry(NamedTuple):
+    signature: FileSignature
+    checksum: str
+
+
+def get_file_signature(filepath: str) -> FileSignature:
+    stat = os.stat(filepath)
+    return FileSignature(size=stat.st_size, mtime_ns=stat.st_mtime_ns, inode=stat.st_ino)
+
+
+class MigrationCache:
+    """On-disk cache of migration file checksums and preflight validation results.
+
+    Checksum entries are keyed by migration filename and invalidated when the file size, mtime or inode
+    changes. When checksums were looked up since the cache was loaded, only those entries are written back by
+    ``save()``.
+    Validation keys are kept for the most recently used ``_MAX_VALIDATED`` statements.
+    Methods are thread-safe, so one instance can be shared between migrators running in parallel.
+
+    Args:
+        path: Cache file location.
+
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._entries: dict[str, _CacheEntry] = {}
+        self._validated: dict[str, None] = {}
+        self._used: dict[str, _CacheEntry] = {}
+        self._dirty: bool = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != _CACHE_VERSION:
+                return
+            self._entries = {
+                name: _CacheEntry(FileSignature(size, mtime_ns, inode), checksum)
+                for name, (size, mtime_ns, inode, checksum) in data["entries"].items()
+            }
+            self._validated = dict.fromkeys(str(key) for key in data.get("validated", []))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError, KeyError, AttributeError) as exc:
+            logger.debug("Ignoring unreadable migration cache %s: %s", self.path, exc)
+            self._entries = {}
+            self._validated = {}
+
+    def get_checksum(self, name: str, signature: FileSignature) -> str | None:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.signature != signature:
+                return None
+            self._used[name] = entry
+            return entry.checksum
+
+    def set_checksum(self, name: str, signature: FileSignature, checksum: str) -> None:
+        if time.time_ns() - signature.mtime_ns < _RACY_WINDOW_NS:
+            return
+        entry = _CacheEntry(signature, checksum)
+        with self._lock:
+            self._entries[name] = entry
+            self._used[name] = entry
+            self._dirty = True
+
+    def is_validated(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._validated:
+                return False
+            self._validated[key] = self._validated.pop(key)
+            return True
+
+    def set_validated(self, key: str) -> None:
+        with self._lock:
+            self._validated.pop(key, None)
+            self._validated[key] = None
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        entries = self._used or self._entries
+        if not self._dirty and entries.keys() == self._entries.keys():
+            return
+        data = {
+            "version": _CACHE_VERSION,
+            "entries": {name: [*entry.signature, entry.checksum] for name, entry in sorted(entries.items())},
+            "validated": list(self._validated)[-_MAX_VALIDATED:],
+        }
+        directory = os.path.dirname(self.path) or "."
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{CACHE_FILENAME}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as exc:
+            logger.debug("Cannot write migration cache %s: %s", self.path, exc)
+            return
+        self._entries = dict(entries)
+        self._dirty = False
@@ -14,6 +14,10 @@ def _serialize_statements(statements: list[SQL]) -> str:
     return "\0".join(normalize_content(statement) for statement in statements)
 
 
+def compute_statement_checksum(statement: SQL) -> str:
+    return hashlib.sha256(normalize_content(statement).encode("utf-8")).hexdigest()
+
+
 def compute_checksum_from_statements(up_statements: list[SQL], rollback_statements: list[SQL]) -> str:
     combined = _serialize_statements(up_statements) + "\0\0" + _serialize_statements(rollback_statements)
     return hashlib.sha256(combined.encode("utf-8")).hexdigest()
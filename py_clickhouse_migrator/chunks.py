@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+from py_clickhouse_migrator.migration_parser import PARTITION_ID_PLACEHOLDER, PARTITION_PLACEHOLDER, ChunkSpec
+
+if TYPE_CHECKING:
+    from clickhouse_driver import Client
+
+ClickHouseSettings = dict[str, str | int]
+
+
+class Partition(NamedTuple):
+    partition_id: str
+    # Partition expression as shown in ``system.parts.partition``, usable in ``... PARTITION <expr>`` clauses.
+    partition: str
+
+
+# Substituted for the placeholders when a chunked statement is validated with ``EXPLAIN AST``.
+VALIDATION_PARTITION: Final[Partition] = Partition(partition_id="0", partition="tuple()")
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def render_chunk(statement: str, partition: Partition) -> str:
+    """Return ``statement`` with the partition placeholders replaced for one partition."""
+    return statement.replace(PARTITION_ID_PLACEHOLDER, _quote(partition.partition_id)).replace(
+        PARTITION_PLACEHOLDER, partition.partition
+    )
+
+
+def list_partitions(
+    client: Client,
+    spec: ChunkSpec,
+    default_db: str,
+    cluster: str = "",
+    settings: ClickHouseSettings | None = None,
+) -> list[Partition]:
+    """Return the partitions of the table of ``spec`` that have active parts, ordered by partition id.
+
+    Args:
+        client: Client used for the ``system.parts`` query.
+        spec: Chunk options of the statement.
+        default_db: Database of the table when ``spec`` does not name one.
+        cluster: ClickHouse cluster name; partitions are collected from all replicas.
+        settings: Settings sent with the query.
+
+    """
+    source = f"clusterAllReplicas('{cluster}', system.parts)" if cluster else "system.parts"
+    rows = client.execute(
+        f"""
+        SELECT partition_id, any(partition)
+        FROM {source}
+        WHERE database = %(database)s AND table = %(table)s AND active
+        GROUP BY partition_id
+        ORDER BY partition_id
+        """,
+        {"database": spec.database or default_db, "table": spec.table},
+        settings=settings or {},
+    )
+    return [Partition(str(partition_id), str(partition)) for partition_id, partition in rows]
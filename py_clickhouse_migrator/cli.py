@@ -1,10 +1,11 @@
+import functools
+import importlib
 import logging
-from importlib.metadata import version
+import sys
 from typing import Final
 import typing as t
 
 import click
-from py_clickhouse_migrator import Migrator
 from py_clickhouse_migrator.errors import (
     BaselineError,
     ChecksumMismatchError,
@@ -13,29 +14,85 @@ from py_clickhouse_migrator.errors import (
     InvalidMigrationError,
     MigrationDirectoryNotFoundError,
     MissingDatabaseUrlError,
+    MutationFailedError,
+    MutationTimeoutError,
+    SchemaCloneError,
+    SquashError,
+    StatementTimeoutError,
+    ThrottleTimeoutError,
 )
-from py_clickhouse_migrator.lock import LockError, MigrationLock
-from py_clickhouse_migrator.migrator import (
+from py_clickhouse_migrator.files import (
     DEFAULT_MIGRATIONS_DIR,
     create_migration_file,
     create_migrations_dir,
 )
+from py_clickhouse_migrator.lock import (
+    LockBackend,
+    LockError,
+    LockLostError,
+    LockWait,
+    LockWaitStrategy,
+    MigrationLock,
+)
+from py_clickhouse_migrator.squash import squash_database_schema, squash_migration_files, write_snapshot
+from py_clickhouse_migrator.throttle import ThrottleConfig, parse_throttle_spec
+from py_clickhouse_migrator.timings import QueryTimings
+
+if t.TYPE_CHECKING:
+    from py_clickhouse_migrator.fanout import DatabaseResult
+    from py_clickhouse_migrator.migrator import Migrator
 
 logger = logging.getLogger("py_clickhouse_migrator")
 
+# Resolved on first use so that offline commands (init, new) do not import clickhouse_driver.
+_LAZY_IMPORTS: Final[dict[str, str]] = {
+    "Migrator": "py_clickhouse_migrator.migrator",
+    "format_migration_stats": "py_clickhouse_migrator.migrator",
+    "parse_databases": "py_clickhouse_migrator.fanout",
+    "resolve_databases": "py_clickhouse_migrator.fanout",
+    "up_databases": "py_clickhouse_migrator.fanout",
+    "KeeperLockBackend": "py_clickhouse_migrator.keeper",
+    "connect_keeper": "py_clickhouse_migrator.keeper",
+}
+
+
+def __getattr__(name: str) -> t.Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def _lazy(name: str) -> t.Any:
+    """Look up a lazily imported name through the module, so patched attributes are honoured."""
+    return getattr(sys.modules[__name__], name)
+
 
 _HANDLED_EXCEPTIONS: Final[tuple[type[Exception], ...]] = (
     BaselineError,
     LockError,
+    LockLostError,
     ChecksumMismatchError,
     InvalidMigrationError,
     ClickHouseServerIsNotHealthyError,
     MissingDatabaseUrlError,
     MigrationDirectoryNotFoundError,
     DatabaseNotFoundError,
+    MutationFailedError,
+    MutationTimeoutError,
+    StatementTimeoutError,
+    ThrottleTimeoutError,
+    SquashError,
+    SchemaCloneError,
 )
 
 
+_STATS_LIMIT: Final[int] = 10
+_PROGRESS_INTERVAL: Final[float] = 5.0
+
+
 class SafeGroup(click.Group):
     def invoke(self, ctx: click.Context) -> None:
         try:
@@ -52,6 +109,119 @@ class ContextObj(t.TypedDict):
     connect_retries: int
     connect_retries_interval: int
     send_receive_timeout: int
+    use_cache: bool
+    timings: QueryTimings | None
+    keeper_hosts: str
+    keeper_root: str
+    lock_scope: str
+
+
+def _make_migrator(ctx: click.Context, **kwargs: t.Any) -> "Migrator":
+    migrator_cls: type[Migrator] = _lazy("Migrator")
+    return migrator_cls(
+        database_url=ctx.obj["url"],
+        migrations_dir=ctx.obj["path"],
+        cluster=ctx.obj["cluster"],
+        connect_retries=ctx.obj["connect_retries"],
+        connect_retries_interval=ctx.obj["connect_retries_interval"],
+        send_receive_timeout=ctx.obj["send_receive_timeout"],
+        use_cache=ctx.obj["use_cache"],
+        timings=ctx.obj["timings"],
+        **kwargs,
+    )
+
+
+def _keeper_backends(ctx: click.Context) -> t.Callable[[str], LockBackend] | None:
+    """Return a factory of Keeper lock backends per database with ``--keeper-hosts``, stopped with the command."""
+    hosts = ctx.obj["keeper_hosts"]
+    if not hosts:
+        return None
+    try:
+        connect_keeper = _lazy("connect_keeper")
+    except ModuleNotFoundError as exc:
+        if exc.name is None or exc.name.split(".")[0] != "kazoo":
+            raise
+        raise click.UsageError(
+            "--keeper-hosts requires the keeper extra: pip install 'py-clickhouse-migrator[keeper]'"
+        ) from exc
+    keeper = connect_keeper(hosts)
+    ctx.call_on_close(keeper.stop)
+    kwargs = {"root": ctx.obj["keeper_root"]} if ctx.obj["keeper_root"] else {}
+    return functools.partial(
+        _lazy("KeeperLockBackend"), keeper, scope=ctx.obj["lock_scope"], cluster=ctx.obj["cluster"], **kwargs
+    )
+
+
+def _lock_backend(ctx: click.Context, migrator: "Migrator") -> LockBackend | None:
+    backends = _keeper_backends(ctx)
+    if backends is None:
+        return None
+    try:
+        return backends(migrator.get_db_name())
+    except ValueError as exc:
+        raise click.UsageError(str(exc)) from exc
+
+
+def _migration_lock(
+    ctx: click.Context, migrator: "Migrator", ttl: int, retry_count: int, wait: LockWait
+) -> MigrationLock:
+    """Return the lock for a migration run; its heartbeat renews it and stops ``migrator`` once it is lost.
+
+    The table lock is renewed on a second connection; a Keeper lock through the Keeper session.
+    """
+    backend = _lock_backend(ctx, migrator)
+    lock = MigrationLock(
+        client=migrator.ch_client,
+        db=migrator.get_db_name(),
+        ttl=ttl,
+        retry_count=retry_count,
+        cluster=ctx.obj["cluster"],
+        wait=wait,
+        heartbeat_client=migrator.create_client() if backend is None else None,
+        backend=backend,
+    )
+    migrator.lock = lock
+    return lock
+
+
+_F = t.TypeVar("_F", bound=t.Callable[..., t.Any])
+
+
+def _lock_wait_options(command: _F) -> _F:
+    """Add the options that choose how a command waits for a lock held by another run."""
+    options = (
+        click.option(
+            "--lock-wait",
+            type=click.Choice([strategy.value for strategy in LockWaitStrategy]),
+            default=LockWaitStrategy.FIXED.value,
+            show_default=True,
+            help="Delay between lock acquire retries: fixed 1s, exponential backoff from 1s, or decorrelated "
+            "jitter, which keeps workers that started together from polling in lockstep. Capped at 30s.",
+        ),
+        click.option(
+            "--lock-wait-timeout",
+            type=click.IntRange(min=0),
+            default=0,
+            help="Longest total wait for a held lock in seconds; replaces --lock-retry. 0 means use --lock-retry.",
+        ),
+        click.option(
+            "--lock-wait-until-expiry",
+            is_flag=True,
+            default=False,
+            help="Sleep until the holder's lock expires, up to 30s at a time, instead of polling every retry delay. "
+            "Not available with --keeper-hosts.",
+        ),
+    )
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def _lock_wait(ctx: click.Context, strategy: str, timeout: int, until_expiry: bool) -> LockWait:
+    if until_expiry and ctx.obj["keeper_hosts"]:
+        # A Keeper lock ends with its holder's session; there is no server-side expiry time to sleep until.
+        raise click.UsageError("--lock-wait-until-expiry cannot be used with --keeper-hosts.")
+    return LockWait(strategy=LockWaitStrategy(strategy), timeout=float(timeout), until_expiry=until_expiry)
 
 
 @click.command()
@@ -68,11 +238,86 @@ def init(ctx: click.Context) -> None:
     required=False,
 )
 @click.option("--lock/--no-lock", default=True, help="Enable/disable migration lock.")
-@click.option("--lock-ttl", type=click.IntRange(min=1), default=600, help="Lock TTL in seconds.")
+@click.option(
+    "--lock-ttl",
+    type=click.IntRange(min=1),
+    default=60,
+    help="Lock TTL in seconds; the lock is renewed every TTL/3 while held.",
+)
 @click.option("--lock-retry", type=click.IntRange(min=0), default=3, help="Number of lock acquire retries.")
+@_lock_wait_options
 @click.option("--dry-run", is_flag=True, default=False, help="Show SQL without executing.")
 @click.option("--validate/--no-validate", default=True, help="Enable/disable preflight validation.")
 @click.option("--allow-dirty", is_flag=True, default=False, help="Skip checksum validation.")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Parallel workers for checksum and preflight validation.",
+)
+@click.option(
+    "--parallel",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Apply up to N migrations at once. Migrations that touch the same tables, or declare "
+    "'-- migrator:depends', still run in order.",
+)
+@click.option(
+    "--wait-mutations/--no-wait-mutations",
+    default=False,
+    help="Wait for mutations started by ALTER TABLE statements before the next statement.",
+)
+@click.option(
+    "--mutation-timeout",
+    type=click.IntRange(min=1),
+    default=3600,
+    help="Seconds to wait for the mutations of one statement.",
+)
+@click.option(
+    "--progress/--no-progress",
+    default=False,
+    help=f"Log rows and bytes processed, rate and ETA of running statements every {_PROGRESS_INTERVAL:g}s.",
+)
+@click.option(
+    "--statement-timeout",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Seconds a single statement may run before it is cancelled. 0 means no limit.",
+)
+@click.option(
+    "--throttle",
+    type=str,
+    default="",
+    help="Pause before each statement or partition chunk while the server is over these limits, "
+    "e.g. queries=50,merges=10,mutations=5,background_tasks=16.",
+)
+@click.option(
+    "--throttle-timeout",
+    type=click.IntRange(min=1),
+    default=3600,
+    help="Seconds to wait for the server load to drop under the --throttle limits.",
+)
+@click.option(
+    "--stats",
+    "record_stats",
+    is_flag=True,
+    default=False,
+    help="Record duration and system.query_log counters of applied migrations in db_migrations_stats "
+    "(costs SYSTEM FLUSH LOGS, a query_log read and an insert per run).",
+)
+@click.option(
+    "--databases",
+    type=str,
+    default="",
+    help="Comma-separated databases to migrate instead of the url database. --jobs sets how many run at once.",
+)
+@click.option(
+    "--databases-from-query",
+    type=str,
+    default="",
+    help="SQL query whose first column lists the databases to migrate.",
+)
 @click.pass_context
 def up(
     ctx: click.Context,
@@ -80,31 +325,138 @@ def up(
     lock: bool,
     lock_ttl: int,
     lock_retry: int,
+    lock_wait: str,
+    lock_wait_timeout: int,
+    lock_wait_until_expiry: bool,
     dry_run: bool,
     validate: bool,
     allow_dirty: bool,
+    jobs: int,
+    parallel: int,
+    wait_mutations: bool,
+    mutation_timeout: int,
+    progress: bool,
+    statement_timeout: int,
+    throttle: str,
+    throttle_timeout: int,
+    record_stats: bool,
+    databases: str,
+    databases_from_query: str,
 ) -> None:
+    wait = _lock_wait(ctx, lock_wait, lock_wait_timeout, lock_wait_until_expiry)
     cluster = ctx.obj["cluster"]
-    migrator = Migrator(
-        database_url=ctx.obj["url"],
-        migrations_dir=ctx.obj["path"],
-        cluster=cluster,
-        connect_retries=ctx.obj["connect_retries"],
-        connect_retries_interval=ctx.obj["connect_retries_interval"],
-        send_receive_timeout=ctx.obj["send_receive_timeout"],
+    throttle_config = _parse_throttle(throttle, throttle_timeout)
+    if databases or databases_from_query:
+        if databases and databases_from_query:
+            raise click.UsageError("Use either --databases or --databases-from-query, not both.")
+        if dry_run:
+            raise click.UsageError("--dry-run cannot be combined with --databases or --databases-from-query.")
+        if lock and ctx.obj["lock_scope"]:
+            raise click.UsageError(
+                "--lock-scope cannot be combined with --databases or --databases-from-query: "
+                "all databases would share one lock."
+            )
+        try:
+            if databases:
+                names = _lazy("parse_databases")(databases)
+            else:
+                names = _lazy("resolve_databases")(
+                    ctx.obj["url"],
+                    databases_from_query,
+                    send_receive_timeout=ctx.obj["send_receive_timeout"],
+                    timings=ctx.obj["timings"],
+                )
+        except ValueError as exc:
+            raise click.UsageError(str(exc)) from exc
+        results = _lazy("up_databases")(
+            database_url=ctx.obj["url"],
+            databases=names,
+            migrations_dir=ctx.obj["path"],
+            jobs=jobs,
+            n=number,
+            allow_dirty=allow_dirty,
+            validate=validate,
+            lock=lock,
+            lock_ttl=lock_ttl,
+            lock_retry=lock_retry,
+            lock_wait=wait,
+            lock_backends=_keeper_backends(ctx) if lock else None,
+            use_cache=ctx.obj["use_cache"],
+            cluster=cluster,
+            connect_retries=ctx.obj["connect_retries"],
+            connect_retries_interval=ctx.obj["connect_retries_interval"],
+            send_receive_timeout=ctx.obj["send_receive_timeout"],
+            wait_mutations=wait_mutations,
+            mutation_timeout=mutation_timeout,
+            progress_interval=_PROGRESS_INTERVAL if progress else 0,
+            statement_timeout=statement_timeout,
+            throttle=throttle_config,
+            parallel=parallel,
+            record_stats=record_stats,
+            timings=ctx.obj["timings"],
+        )
+        _echo_fanout_summary(results)
+        if any(result.error for result in results):
+            ctx.exit(1)
+        return
+    migrator = _make_migrator(
+        ctx,
+        jobs=jobs,
+        wait_mutations=wait_mutations,
+        mutation_timeout=mutation_timeout,
+        progress_interval=_PROGRESS_INTERVAL if progress else 0,
+        statement_timeout=statement_timeout,
+        throttle=throttle_config,
+        parallel=parallel,
+        record_stats=record_stats,
     )
     if dry_run:
         migrator.up(n=number, dry_run=True, allow_dirty=allow_dirty, validate=validate)
         return
     if lock:
-        with MigrationLock(
-            client=migrator.ch_client, db=migrator.get_db_name(), ttl=lock_ttl, retry_count=lock_retry, cluster=cluster
+        with _migration_lock(
+            ctx,
+            migrator,
+            ttl=lock_ttl,
+            retry_count=lock_retry,
+            wait=wait,
         ):
             migrator.up(n=number, allow_dirty=allow_dirty, validate=validate)
     else:
         migrator.up(n=number, allow_dirty=allow_dirty, validate=validate)
 
 
+def _parse_throttle(spec: str, timeout: int) -> ThrottleConfig | None:
+    if not spec:
+        return None
+    try:
+        return parse_throttle_spec(spec, timeout=timeout)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="'--throttle'") from exc
+
+
+def _echo_timings(timings: QueryTimings) -> None:
+    if timings.count:
+        click.echo(timings.format_report(), err=True)
+
+
+def _echo_fanout_summary(results: "list[DatabaseResult]") -> None:
+    failed = sum(1 for result in results if result.error)
+    updated = sum(1 for result in results if result.applied and not result.error)
+    for result in results:
+        if result.error:
+            status = click.style("failed", fg="red") + f": {result.error}"
+        elif result.applied:
+            status = click.style(f"applied {len(result.applied)}", fg="green") + f" ({', '.join(result.applied)})"
+        else:
+            status = "up to date"
+        click.echo(f"  {result.database}: {status}")
+    summary = (
+        f"{len(results)} database(s): {updated} updated, {len(results) - updated - failed} up to date, {failed} failed."
+    )
+    click.echo(click.style(summary, fg="red" if failed else "green", bold=True))
+
+
 @click.command()
 @click.argument(
     "number",
@@ -113,10 +465,58 @@ def up(
     required=False,
 )
 @click.option("--lock/--no-lock", default=True, help="Enable/disable migration lock.")
-@click.option("--lock-ttl", type=click.IntRange(min=1), default=600, help="Lock TTL in seconds.")
+@click.option(
+    "--lock-ttl",
+    type=click.IntRange(min=1),
+    default=60,
+    help="Lock TTL in seconds; the lock is renewed every TTL/3 while held.",
+)
 @click.option("--lock-retry", type=click.IntRange(min=0), default=3, help="Number of lock acquire retries.")
+@_lock_wait_options
 @click.option("--dry-run", is_flag=True, default=False, help="Show SQL without executing.")
 @click.option("--validate/--no-validate", default=True, help="Enable/disable preflight validation.")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Parallel connections for preflight validation.",
+)
+@click.option(
+    "--wait-mutations/--no-wait-mutations",
+    default=False,
+    help="Wait for mutations started by ALTER TABLE statements before the next statement.",
+)
+@click.option(
+    "--mutation-timeout",
+    type=click.IntRange(min=1),
+    default=3600,
+    help="Seconds to wait for the mutations of one statement.",
+)
+@click.option(
+    "--progress/--no-progress",
+    default=False,
+    help=f"Log rows and bytes processed, rate and ETA of running statements every {_PROGRESS_INTERVAL:g}s.",
+)
+@click.option(
+    "--statement-timeout",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Seconds a single statement may run before it is cancelled. 0 means no limit.",
+)
+@click.option(
+    "--throttle",
+    type=str,
+    default="",
+    help="Pause before each statement or partition chunk while the server is over these limits, "
+    "e.g. queries=50,merges=10,mutations=5,background_tasks=16.",
+)
+@click.option(
+    "--throttle-timeout",
+    type=click.IntRange(min=1),
+    default=3600,
+    help="Seconds to wait for the server load to drop under the --throttle limits.",
+)
 @click.pass_context
 def rollback(
     ctx: click.Context,
@@ -124,24 +524,40 @@ def rollback(
     lock: bool,
     lock_ttl: int,
     lock_retry: int,
+    lock_wait: str,
+    lock_wait_timeout: int,
+    lock_wait_until_expiry: bool,
     dry_run: bool,
     validate: bool,
+    jobs: int,
+    wait_mutations: bool,
+    mutation_timeout: int,
+    progress: bool,
+    statement_timeout: int,
+    throttle: str,
+    throttle_timeout: int,
 ) -> None:
-    cluster = ctx.obj["cluster"]
-    migrator = Migrator(
-        database_url=ctx.obj["url"],
-        migrations_dir=ctx.obj["path"],
-        cluster=cluster,
-        connect_retries=ctx.obj["connect_retries"],
-        connect_retries_interval=ctx.obj["connect_retries_interval"],
-        send_receive_timeout=ctx.obj["send_receive_timeout"],
+    wait = _lock_wait(ctx, lock_wait, lock_wait_timeout, lock_wait_until_expiry)
+    throttle_config = _parse_throttle(throttle, throttle_timeout)
+    migrator = _make_migrator(
+        ctx,
+        jobs=jobs,
+        wait_mutations=wait_mutations,
+        mutation_timeout=mutation_timeout,
+        progress_interval=_PROGRESS_INTERVAL if progress else 0,
+        statement_timeout=statement_timeout,
+        throttle=throttle_config,
     )
     if dry_run:
         migrator.rollback(number=number, dry_run=True, validate=validate)
         return
     if lock:
-        with MigrationLock(
-            client=migrator.ch_client, db=migrator.get_db_name(), ttl=lock_ttl, retry_count=lock_retry, cluster=cluster
+        with _migration_lock(
+            ctx,
+            migrator,
+            ttl=lock_ttl,
+            retry_count=lock_retry,
+            wait=wait,
         ):
             migrator.rollback(number=number, validate=validate)
     else:
@@ -150,44 +566,67 @@ def rollback(
 
 @click.command()
 @click.option("--all", "show_all", is_flag=True, default=False, help="Show all migrations.")
+@click.option(
+    "--stats",
+    "show_stats",
+    is_flag=True,
+    default=False,
+    help="Show the slowest applied migrations with duration, rows, bytes and peak memory (all with --all).",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Parallel workers for checksum validation.",
+)
 @click.pass_context
-def show(ctx: click.Context, show_all: bool) -> None:
-    output, warning = Migrator(
-        database_url=ctx.obj["url"],
-        migrations_dir=ctx.obj["path"],
-        cluster=ctx.obj["cluster"],
-        connect_retries=ctx.obj["connect_retries"],
-        connect_retries_interval=ctx.obj["connect_retries_interval"],
-        send_receive_timeout=ctx.obj["send_receive_timeout"],
-    ).show_migrations(show_all=show_all)
+def show(ctx: click.Context, show_all: bool, show_stats: bool, jobs: int) -> None:
+    migrator = _make_migrator(
+        ctx,
+        jobs=jobs,
+    )
+    ledger = migrator.load_ledger()
+    output, warning = migrator.show_migrations(show_all=show_all, ledger=ledger)
     click.echo(output)
+    if show_stats:
+        stats = migrator.get_migration_stats(limit=None if show_all else _STATS_LIMIT, ledger=ledger)
+        click.echo("\n" + _lazy("format_migration_stats")(stats))
     if warning:
         click.echo(f"\n{warning}", err=True)
 
 
 @click.command()
 @click.option("--lock/--no-lock", default=True, help="Enable/disable migration lock.")
-@click.option("--lock-ttl", type=click.IntRange(min=1), default=600, help="Lock TTL in seconds.")
+@click.option(
+    "--lock-ttl",
+    type=click.IntRange(min=1),
+    default=60,
+    help="Lock TTL in seconds; the lock is renewed every TTL/3 while held.",
+)
 @click.option("--lock-retry", type=click.IntRange(min=0), default=3, help="Number of lock acquire retries.")
+@_lock_wait_options
 @click.pass_context
 def baseline(
     ctx: click.Context,
     lock: bool,
     lock_ttl: int,
     lock_retry: int,
+    lock_wait: str,
+    lock_wait_timeout: int,
+    lock_wait_until_expiry: bool,
 ) -> None:
-    cluster = ctx.obj["cluster"]
-    migrator = Migrator(
-        database_url=ctx.obj["url"],
-        migrations_dir=ctx.obj["path"],
-        cluster=cluster,
-        connect_retries=ctx.obj["connect_retries"],
-        connect_retries_interval=ctx.obj["connect_retries_interval"],
-        send_receive_timeout=ctx.obj["send_receive_timeout"],
+    wait = _lock_wait(ctx, lock_wait, lock_wait_timeout, lock_wait_until_expiry)
+    migrator = _make_migrator(
+        ctx,
     )
     if lock:
-        with MigrationLock(
-            client=migrator.ch_client, db=migrator.get_db_name(), ttl=lock_ttl, retry_count=lock_retry, cluster=cluster
+        with _migration_lock(
+            ctx,
+            migrator,
+            ttl=lock_ttl,
+            retry_count=lock_retry,
+            wait=wait,
         ):
             migration_names = migrator.baseline()
     else:
@@ -204,6 +643,71 @@ def baseline(
         click.echo(f"  {click.style('[B]', fg='cyan')} {name}")
 
 
+@click.command("clone-schema")
+@click.option(
+    "--from",
+    "source_url",
+    type=str,
+    required=True,
+    help="Url of the reference database whose tables, dictionaries, views and db_migrations rows are copied.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Connections used to create independent objects at once.",
+)
+@click.option("--dry-run", is_flag=True, default=False, help="Print the statements without executing them.")
+@click.option("--lock/--no-lock", default=True, help="Enable/disable migration lock.")
+@click.option(
+    "--lock-ttl",
+    type=click.IntRange(min=1),
+    default=60,
+    help="Lock TTL in seconds; the lock is renewed every TTL/3 while held.",
+)
+@click.option("--lock-retry", type=click.IntRange(min=0), default=3, help="Number of lock acquire retries.")
+@_lock_wait_options
+@click.pass_context
+def clone_schema(
+    ctx: click.Context,
+    source_url: str,
+    jobs: int,
+    dry_run: bool,
+    lock: bool,
+    lock_ttl: int,
+    lock_retry: int,
+    lock_wait: str,
+    lock_wait_timeout: int,
+    lock_wait_until_expiry: bool,
+) -> None:
+    wait = _lock_wait(ctx, lock_wait, lock_wait_timeout, lock_wait_until_expiry)
+    migrator = _make_migrator(ctx, jobs=jobs)
+    if lock and not dry_run:
+        with _migration_lock(
+            ctx,
+            migrator,
+            ttl=lock_ttl,
+            retry_count=lock_retry,
+            wait=wait,
+        ):
+            result = migrator.clone_schema(source_url)
+    else:
+        result = migrator.clone_schema(source_url, dry_run=dry_run)
+    if dry_run:
+        return
+    click.echo(
+        click.style(
+            f"Created {len(result.objects)} object(s) and recorded {len(result.migrations)} migration(s).",
+            fg="green",
+            bold=True,
+        )
+    )
+    if result.migrations:
+        click.echo(f"HEAD: {result.migrations[-1]}")
+
+
 @click.command()
 @click.pass_context
 @click.argument(
@@ -217,17 +721,21 @@ def new(ctx: click.Context, name: str) -> None:
 
 
 @click.command()
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Parallel workers for checksum validation.",
+)
 @click.pass_context
-def repair(ctx: click.Context) -> None:
-    migrator = Migrator(
-        database_url=ctx.obj["url"],
-        migrations_dir=ctx.obj["path"],
-        cluster=ctx.obj["cluster"],
-        connect_retries=ctx.obj["connect_retries"],
-        connect_retries_interval=ctx.obj["connect_retries_interval"],
-        send_receive_timeout=ctx.obj["send_receive_timeout"],
+def repair(ctx: click.Context, jobs: int) -> None:
+    migrator = _make_migrator(
+        ctx,
+        jobs=jobs,
     )
-    mismatches = migrator.validate_checksums()
+    ledger = migrator.load_ledger()
+    mismatches = migrator.validate_checksums(ledger=ledger)
     if not mismatches:
         click.echo("Nothing to repair. All checksums are valid.")
         return
@@ -237,24 +745,51 @@ def repair(ctx: click.Context) -> None:
             click.echo(f"  {name}: {stored[:12]}... \u2192 {actual[:12]}...")
         else:
             click.echo(f"  {name}: file missing (skipped)")
-    repaired = migrator.repair()
+    repaired = migrator.repair(ledger=ledger)
     if repaired:
         click.echo(f"\nRepaired {len(repaired)} migration(s).")
 
 
+@click.command()
+@click.argument("target", type=str)
+@click.option(
+    "--from-database",
+    is_flag=True,
+    default=False,
+    help="Build the snapshot from SHOW CREATE of the --url database, which must have exactly the migrations "
+    "up to TARGET applied. By default the statements of the migration files are concatenated.",
+)
+@click.option("--dry-run", is_flag=True, default=False, help="Print the snapshot without writing or deleting files.")
+@click.pass_context
+def squash(ctx: click.Context, target: str, from_database: bool, dry_run: bool) -> None:
+    if from_database:
+        migrator = _make_migrator(ctx)
+        snapshot = squash_database_schema(
+            migrator.ch_client,
+            migrator.get_db_name(),
+            ctx.obj["path"],
+            target,
+            applied=migrator.get_applied_migrations_names(),
+        )
+    else:
+        snapshot = squash_migration_files(ctx.obj["path"], target)
+    if dry_run:
+        click.echo(snapshot.content, nl=False)
+        return
+    filepath = write_snapshot(ctx.obj["path"], snapshot)
+    click.echo(click.style(f"Squashed {len(snapshot.replaced)} migration(s) into {filepath}.", fg="green", bold=True))
+
+
 @click.command("force-unlock")
 @click.pass_context
 def force_unlock(ctx: click.Context) -> None:
     cluster = ctx.obj["cluster"]
-    migrator = Migrator(
-        database_url=ctx.obj["url"],
-        migrations_dir=ctx.obj["path"],
-        cluster=cluster,
-        connect_retries=ctx.obj["connect_retries"],
-        connect_retries_interval=ctx.obj["connect_retries_interval"],
-        send_receive_timeout=ctx.obj["send_receive_timeout"],
+    migrator = _make_migrator(
+        ctx,
+    )
+    lock = MigrationLock(
+        client=migrator.ch_client, db=migrator.get_db_name(), cluster=cluster, backend=_lock_backend(ctx, migrator)
     )
-    lock = MigrationLock(client=migrator.ch_client, db=migrator.get_db_name(), cluster=cluster)
     lock.release(force=True)
     click.echo("Lock forcefully released.")
 
@@ -263,15 +798,12 @@ def force_unlock(ctx: click.Context) -> None:
 @click.pass_context
 def lock_info(ctx: click.Context) -> None:
     cluster = ctx.obj["cluster"]
-    migrator = Migrator(
-        database_url=ctx.obj["url"],
-        migrations_dir=ctx.obj["path"],
-        cluster=cluster,
-        connect_retries=ctx.obj["connect_retries"],
-        connect_retries_interval=ctx.obj["connect_retries_interval"],
-        send_receive_timeout=ctx.obj["send_receive_timeout"],
+    migrator = _make_migrator(
+        ctx,
+    )
+    ml = MigrationLock(
+        client=migrator.ch_client, db=migrator.get_db_name(), cluster=cluster, backend=_lock_backend(ctx, migrator)
     )
-    ml = MigrationLock(client=migrator.ch_client, db=migrator.get_db_name(), cluster=cluster)
     info = ml.get_lock_info()
     if info is None:
         click.echo("No active lock.")
@@ -283,7 +815,7 @@ def lock_info(ctx: click.Context) -> None:
 
 @click.group(cls=SafeGroup)
 @click.version_option(
-    version=version("py-clickhouse-migrator"),
+    package_name="py-clickhouse-migrator",
     prog_name="py-clickhouse-migrator",
 )
 @click.option(
@@ -342,6 +874,44 @@ def lock_info(ctx: click.Context) -> None:
     envvar="CLICKHOUSE_MIGRATE_SEND_RECEIVE_TIMEOUT",
     help="Timeout in seconds for sending/receiving data. Default: 600.",
 )
+@click.option(
+    "--cache/--no-cache",
+    "use_cache",
+    default=True,
+    envvar="CLICKHOUSE_MIGRATE_CACHE",
+    help="Enable/disable the checksum cache file in the migrations directory.",
+)
+@click.option(
+    "--keeper-hosts",
+    type=str,
+    default="",
+    envvar="CLICKHOUSE_MIGRATE_KEEPER_HOSTS",
+    help="Comma-separated ClickHouse Keeper or ZooKeeper host:port list. When set, the migration lock is an "
+    "ephemeral Keeper node instead of a _migrations_lock row. Requires the 'keeper' extra.",
+)
+@click.option(
+    "--keeper-root",
+    type=str,
+    default="",
+    envvar="CLICKHOUSE_MIGRATE_KEEPER_ROOT",
+    help="Keeper path under which lock nodes are created. Default: /py_clickhouse_migrator/locks, followed by "
+    "the --cluster name. Give servers that are not in a cluster but share one Keeper ensemble distinct roots.",
+)
+@click.option(
+    "--lock-scope",
+    type=str,
+    default="",
+    envvar="CLICKHOUSE_MIGRATE_LOCK_SCOPE",
+    help="Keeper lock key shared by runs that must not overlap, whatever database they migrate. "
+    "Default: one lock per database. Requires --keeper-hosts.",
+)
+@click.option(
+    "--timings",
+    "show_timings",
+    is_flag=True,
+    default=False,
+    help="Print query counts, latencies and sizes per query category to stderr when the command ends.",
+)
 @click.pass_context
 def main(
     ctx: click.Context,
@@ -353,6 +923,11 @@ def main(
     connect_retries: int,
     connect_retries_interval: int,
     send_receive_timeout: int,
+    use_cache: bool,
+    keeper_hosts: str,
+    keeper_root: str,
+    lock_scope: str,
+    show_timings: bool,
 ) -> None:
     if verbose:
         level = logging.DEBUG
@@ -361,6 +936,10 @@ def main(
     else:
         level = logging.INFO
     logging.basicConfig(level=level, format="%(message)s")
+    if lock_scope and not keeper_hosts:
+        raise click.UsageError("--lock-scope requires --keeper-hosts; the _migrations_lock table is per database.")
+    if keeper_root and not keeper_hosts:
+        raise click.UsageError("--keeper-root requires --keeper-hosts.")
 
     ctx.obj = ContextObj(
         url=url,
@@ -369,7 +948,15 @@ def main(
         connect_retries=connect_retries,
         connect_retries_interval=connect_retries_interval,
         send_receive_timeout=send_receive_timeout,
+        use_cache=use_cache,
+        timings=QueryTimings() if show_timings else None,
+        keeper_hosts=keeper_hosts,
+        keeper_root=keeper_root,
+        lock_scope=lock_scope,
     )
+    if show_timings:
+        # Runs when the command finishes, also after errors, so slow failed runs can be diagnosed.
+        ctx.call_on_close(functools.partial(_echo_timings, ctx.obj["timings"]))
 
 
 main.add_command(init)
@@ -378,6 +965,8 @@ main.add_command(up)
 main.add_command(rollback)
 main.add_command(show)
 main.add_command(baseline)
+main.add_command(clone_schema)
 main.add_command(repair)
+main.add_command(squash)
 main.add_command(force_unlock)
 main.add_command(lock_info)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Collection
+from typing import Final, NamedTuple
+
+from py_clickhouse_migrator.errors import InvalidMigrationError
+
+_NAME: Final[str] = r"(?P<name>[`\"]?[A-Za-z_]\w*[`\"]?(?:\.[`\"]?[A-Za-z_]\w*[`\"]?)?)(?![\w`\".])"
+# Tables, views and dictionaries named after these keywords are the objects a statement touches.
+_OBJECT_RE: Final[re.Pattern[str]] = re.compile(
+    r"\b(?:TABLE|VIEW|DICTIONARY|INTO|TO)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?" + _NAME, re.IGNORECASE
+)
+# A name after FROM or JOIN that is followed by "(" is a table function (numbers(10), remote(...)), not an object.
+_SOURCE_RE: Final[re.Pattern[str]] = re.compile(r"\b(?:FROM|JOIN)\s+" + _NAME + r"(?!\s*\()", re.IGNORECASE)
+# Dictionary sources name their table as a string: SOURCE(CLICKHOUSE(TABLE 'events')).
+_SOURCE_TABLE_RE: Final[re.Pattern[str]] = re.compile(r"\bTABLE\s+'(?P<name>[A-Za-z_]\w*)'", re.IGNORECASE)
+# CREATE TABLE copy AS source copies the structure (and engine) of another table.
+_AS_TABLE_RE: Final[re.Pattern[str]] = re.compile(
+    r"^\s*CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?\S+\s+(?:ON\s+CLUSTER\s+\S+\s+)?AS\s+"
+    + _NAME
+    + r"(?!\s*\()",
+    re.IGNORECASE,
+)
+# Engines that read another table, and the position of the table among their arguments. Engine and function
+# names are case-sensitive in ClickHouse, which keeps Dictionary(...) apart from CREATE DICTIONARY.
+_ENGINE_TABLE_ARG: Final[dict[str, int]] = {"Distributed": 2, "Buffer": 1, "Dictionary": 0}
+_ENGINE_RE: Final[re.Pattern[str]] = re.compile(r"\b(?i:ENGINE)\s*=\s*(?P<engine>Distributed|Buffer|Dictionary)\s*\(")
+_ARG_RE: Final[re.Pattern[str]] = re.compile(r"\s*(?P<arg>'[^']*'|\w+\(\s*\)|[`\"]?\w+[`\"]?)\s*(?P<end>[,)])")
+# Dictionary and Join table lookups name their object as a string literal: dictGet('users_dict', 'name', id).
+_LOOKUP_RE: Final[re.Pattern[str]] = re.compile(
+    r"\b(?:dictGet\w*|dictHas|dictIsIn|joinGet\w*)\s*\(\s*(?:'(?P<name>[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?)'(?=\s*,))?"
+)
+# Table references that name no single object (Merge tables, remote and cluster table functions).
+_UNKNOWN_SOURCE_RE: Final[re.Pattern[str]] = re.compile(
+    r"\b(?:(?i:ENGINE)\s*=\s*Merge|merge|remote|remoteSecure|cluster|clusterAllReplicas)\s*\("
+)
+# Statements with effects beyond single tables; a migration containing one runs alone.
+_GLOBAL_RE: Final[re.Pattern[str]] = re.compile(
+    r"^\s*(?:(?:CREATE|ALTER|DROP|RENAME|ATTACH|DETACH)\s+(?:OR\s+REPLACE\s+)?"
+    r"(?:DATABASE|USER|ROLE|QUOTA|ROW\s+POLICY|POLICY|SETTINGS\s+PROFILE|PROFILE|FUNCTION|NAMED\s+COLLECTION)\b"
+    r"|(?:SYSTEM|GRANT|REVOKE|USE|SET)\b)",
+    re.IGNORECASE,
+)
+_COMMENT_RE: Final[re.Pattern[str]] = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_NOT_OBJECTS: Final[frozenset[str]] = frozenset({"select", "with", "values", "format", "settings"})
+
+
+class MigrationNode(NamedTuple):
+    name: str
+    statements: list[str]
+    # Migration names from ``-- migrator:depends`` lines.
+    depends: list[str]
+
+
+def statement_objects(statement: str) -> set[str] | None:
+    """Return the tables, views and dictionaries ``statement`` touches, or None if it cannot be narrowed down.
+
+    Objects are named after ``TABLE``, ``VIEW``, ``DICTIONARY``, ``INTO``, ``TO``, ``FROM``, ``JOIN`` and
+    ``CREATE TABLE ... AS``, as ``Distributed``, ``Buffer`` and ``Dictionary`` engine arguments, as dictionary
+    source tables and as the first argument of ``dictGet*``, ``dictHas``, ``dictIsIn`` and ``joinGet*``. Names are
+    lowercased and stripped of their database, so the same table name in two databases counts as one object. A
+    statement with a reference that names no single object, such as a ``Merge`` table, a ``remote`` or
+    ``cluster`` table function, or a lookup or engine argument that is not a plain name, returns None.
+    """
+    statement = _COMMENT_RE.sub(" ", statement)
+    if _GLOBAL_RE.match(statement) or _UNKNOWN_SOURCE_RE.search(statement):
+        return None
+    names = [match["name"] for pattern in (_OBJECT_RE, _SOURCE_RE) for match in pattern.finditer(statement)]
+    names += [match["name"] for pattern in (_SOURCE_TABLE_RE, _AS_TABLE_RE) for match in pattern.finditer(statement)]
+    for match in _LOOKUP_RE.finditer(statement):
+        if match["name"] is None:
+            return None
+        names.append(match["name"])
+    for match in _ENGINE_RE.finditer(statement):
+        table = _engine_table(statement, match.end(), _ENGINE_TABLE_ARG[match["engine"]])
+        if table is None:
+            return None
+        names.append(table)
+    objects = {name.replace("`", "").replace('"', "").rsplit(".", 1)[-1].lower() for name in names}
+    objects -= _NOT_OBJECTS
+    return objects or None
+
+
+def _engine_table(statement: str, pos: int, index: int) -> str | None:
+    # Reads engine arguments from pos up to the table at index; expressions other than names and literals,
+    # and currentDatabase() in the table position, leave the table unknown.
+    arg = ""
+    for position in range(index + 1):
+        match = _ARG_RE.match(statement, pos)
+        if match is None or (match["end"] == ")" and position < index):
+            return None
+        arg, pos = match["arg"].strip("'`\""), match.end()
+    return None if arg.endswith(")") or not arg else arg
+
+
+def migration_objects(statements: list[str]) -> set[str] | None:
+    """Return the objects touched by any of ``statements``, or None if one of them cannot be narrowed down."""
+    objects: set[str] = set()
+    for statement in statements:
+        found = statement_objects(statement)
+        if found is None:
+            return None
+        objects |= found
+    return objects
+
+
+def plan_dependencies(nodes: list[MigrationNode], known: Collection[str]) -> dict[str, tuple[str, ...]]:
+    """Return the migrations each pending migration must wait for when independent migrations run in parallel.
+
+    A migration waits for the earlier migrations of ``nodes`` that it lists in ``-- migrator:depends`` or that
+    touch one of its objects. A migration whose objects cannot be inferred waits for all earlier ones, and all
+    later ones wait for it. Edges implied by others are dropped, so the result lists direct dependencies only.
+
+    Args:
+        nodes: Pending migrations in the order they would be applied one by one.
+        known: Names of all migration files, applied or not.
+
+    Raises:
+        InvalidMigrationError: A migration depends on an unknown migration or on one that sorts after it.
+
+    """
+    order = {node.name: position for position, node in enumerate(nodes)}
+    objects: list[set[str] | None] = []
+    ancestors: dict[str, set[str]] = {}
+    plan: dict[str, tuple[str, ...]] = {}
+    for position, node in enumerate(nodes):
+        for depend in node.depends:
+            if depend not in known:
+                raise InvalidMigrationError(f"Migration {node.name} depends on unknown migration {depend}.")
+            if order.get(depend, -1) >= position:
+                raise InvalidMigrationError(
+                    f"Migration {node.name} depends on {depend}, which does not sort before it. "
+                    "Dependencies must be applied first when running one by one too."
+                )
+        current = migration_objects(node.statements)
+        waits = {
+            earlier.name
+            for earlier, earlier_objects in zip(nodes[:position], objects, strict=True)
+            if current is None or earlier_objects is None or current & earlier_objects
+        }
+        waits.update(depend for depend in node.depends if depend in order)
+        objects.append(current)
+        implied: set[str] = set().union(*(ancestors[name] for name in waits))
+        ancestors[node.name] = waits | implied
+        plan[node.name] = tuple(sorted(waits - implied, key=order.__getitem__))
+    return plan
@@ -23,3 +23,21 @@ class MigrationParseError(ValueError): ...
 
 
 class BaselineError(Exception): ...
+
+
+class MutationFailedError(Exception): ...
+
+
+class MutationTimeoutError(Exception): ...
+
+
+class StatementTimeoutError(Exception): ...
+
+
+class ThrottleTimeoutError(Exception): ...
+
+
+class SquashError(Exception): ...
+
+
+class SchemaCloneError(Exception): ...
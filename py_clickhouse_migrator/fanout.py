@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Final, NamedTuple
+from urllib.parse import urlsplit, urlunsplit
+
+from py_clickhouse_migrator.cache import CACHE_FILENAME, MigrationCache
+from py_clickhouse_migrator.lock import LockBackend, LockWait, MigrationLock
+from py_clickhouse_migrator.files import DEFAULT_MIGRATIONS_DIR
+from py_clickhouse_migrator.migrator import ClientFactory, MigrationFiles, Migrator, create_client
+from py_clickhouse_migrator.timings import QueryTimings
+
+logger = logging.getLogger("py_clickhouse_migrator")
+
+_DB_NAME_RE: Final[re.Pattern[str]] = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*\Z")
+
+
+class DatabaseResult(NamedTuple):
+    database: str
+    applied: list[str]
+    error: str = ""
+
+
+def database_url_for(database_url: str, database: str) -> str:
+    """Return ``database_url`` pointing at ``database``, keeping credentials, host and query parameters."""
+    parts = urlsplit(database_url)
+    return urlunsplit(parts._replace(path=f"/{database}"))
+
+
+def parse_databases(value: str) -> list[str]:
+    """Split a comma-separated database list, dropping blanks and duplicates."""
+    return validate_databases(name.strip() for name in value.split(","))
+
+
+def validate_databases(names: Iterable[str]) -> list[str]:
+    databases = list(dict.fromkeys(name for name in names if name))
+    invalid = [name for name in databases if not _DB_NAME_RE.match(name)]
+    if invalid:
+        raise ValueError(f"Invalid database name(s): {', '.join(map(repr, invalid))}")
+    return databases
+
+
+def resolve_databases(
+    database_url: str,
+    query: str,
+    client_factory: ClientFactory | None = None,
+    send_receive_timeout: int = 600,
+    timings: QueryTimings | None = None,
+) -> list[str]:
+    """Return the first column of ``query`` executed against ``database_url``.
+
+    The connection is opened like the ones of ``Migrator``; the other arguments have the same meaning.
+    """
+    client = create_client(
+        database_url, client_factory=client_factory, send_receive_timeout=send_receive_timeout, timings=timings
+    )
+    try:
+        return validate_databases(str(row[0]) for row in client.execute(query))
+    finally:
+        client.disconnect()
+
+
+def up_databases(
+    database_url: str,
+    databases: list[str],
+    migrations_dir: str = DEFAULT_MIGRATIONS_DIR,
+    jobs: int = 1,
+    n: int | None = None,
+    allow_dirty: bool = False,
+    validate: bool = True,
+    lock: bool = True,
+    lock_ttl: int = 60,
+    lock_retry: int = 3,
+    lock_wait: LockWait | None = None,
+    lock_backends: Callable[[str], LockBackend] | None = None,
+    use_cache: bool = True,
+    **migrator_kwargs: Any,
+) -> list[DatabaseResult]:
+    """Apply the same migrations to several databases with at most ``jobs`` databases in flight.
+
+    Migration files are read once and the checksum/validation cache is shared, so each database only pays for
+    its own connection, ledger read and lock. A failure in one database does not stop the others.
+
+    Args:
+        database_url: ClickHouse url; its database part is replaced by each name in ``databases``.
+        databases: Databases to migrate.
+        migrations_dir: Directory containing ``.sql`` migration files.
+        jobs: Number of databases migrated concurrently.
+        n: Maximum number of migrations to apply per database. All pending if None.
+        allow_dirty: Skip checksum validation for modified files.
+        validate: Run preflight validation before apply.
+        lock: Hold a ``MigrationLock`` in each database while applying.
+        lock_ttl: Lock TTL in seconds; a heartbeat renews each lock every ``lock_ttl / 3`` seconds.
+        lock_retry: Number of lock acquire retries.
+        lock_wait: How to wait for a held lock; ``lock_retry`` fixed 1s delays by default.
+        lock_backends: Returns the lock backend of a database, e.g. ``functools.partial(KeeperLockBackend,
+            keeper)``; locks use the ``_migrations_lock`` table of each database when not set.
+        use_cache: Share one checksum and validation cache between all databases.
+        migrator_kwargs: Extra ``Migrator`` arguments, e.g. ``cluster`` or ``send_receive_timeout``.
+
+    Returns:
+        One result per database, in the order of ``databases``.
+
+    """
+    files = MigrationFiles(migrations_dir)
+    cache = MigrationCache(os.path.join(migrations_dir, CACHE_FILENAME)) if use_cache else None
+    cluster: str = migrator_kwargs.get("cluster", "")
+
+    def migrate(database: str) -> DatabaseResult:
+        try:
+            migrator = Migrator(
+                database_url=database_url_for(database_url, database),
+                migrations_dir=migrations_dir,
+                use_cache=use_cache,
+                cache=cache,
+                files=files,
+                **migrator_kwargs,
+            )
+            try:
+                if not lock:
+                    return DatabaseResult(database, migrator.up(n=n, allow_dirty=allow_dirty, validate=validate))
+                backend = lock_backends(database) if lock_backends is not None else None
+                migrator.lock = MigrationLock(
+                    client=migrator.ch_client,
+                    db=database,
+                    ttl=lock_ttl,
+                    retry_count=lock_retry,
+                    cluster=cluster,
+                    wait=lock_wait,
+                    heartbeat_client=migrator.create_client() if backend is None else None,
+                    backend=backend,
+                )
+                with migrator.lock:
+                    return DatabaseResult(database, migrator.up(n=n, allow_dirty=allow_dirty, validate=validate))
+            finally:
+                migrator.close()
+        except Exception as exc:
+            # One broken tenant must not abort the rest of the fan-out; the error is reported in the summary.
+            logger.error("%s: %s", database, exc)
+            return DatabaseResult(database, [], str(exc) or type(exc).__name__)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(databases)))) as pool:
+        return list(pool.map(migrate, databases))
@@ -0,0 +1,56 @@
+import datetime as dt
+import logging
+import os
+import re
+from typing import Final
+
+from py_clickhouse_migrator.errors import MigrationDirectoryNotFoundError
+
+logger = logging.getLogger("py_clickhouse_migrator")
+
+_MIGRATION_NAME_RE: Final[re.Pattern[str]] = re.compile(r"[a-zA-Z0-9_]+\Z")  # migration name suffix in filename
+
+MIGRATION_TEMPLATE: str = """-- migrator:up
+-- @stmt
+
+
+-- migrator:down
+-- @stmt
+"""
+DEFAULT_MIGRATIONS_DIR: str = "./db/migrations"
+
+
+def create_migrations_dir(migrations_dir: str = DEFAULT_MIGRATIONS_DIR) -> None:
+    """Create the migrations directory if it doesn't exist."""
+    os.makedirs(migrations_dir, exist_ok=True)
+    logger.info("Migrations directory %s successfully initialized.", migrations_dir)
+
+
+def make_migration_filename(name: str = "") -> str:
+    """Generate a timestamped migration filename."""
+    if name and not _MIGRATION_NAME_RE.match(name):
+        raise ValueError(f"Invalid migration name: '{name}'. Use only letters, digits, and underscores.")
+    filename = dt.datetime.now().strftime("%Y%m%d%H%M%S")
+    if name:
+        filename += f"_{name}"
+    filename += ".sql"
+    return filename
+
+
+def create_migration_file(migrations_dir: str = DEFAULT_MIGRATIONS_DIR, name: str = "") -> str:
+    """Create a new migration file from template. Returns the filepath."""
+    if not name:
+        logger.warning("Migration name is recommended: py-clickhouse-migrator new <name>")
+
+    filename = make_migration_filename(name)
+    filepath = os.path.join(migrations_dir, filename)
+    try:
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(MIGRATION_TEMPLATE)
+    except FileNotFoundError:
+        raise MigrationDirectoryNotFoundError(
+            f"Migration directory {migrations_dir} not found.\nMake sure you run 'init' first."
+        ) from None
+
+    logger.info("Migration %s has been created.", filepath)
+    return filepath
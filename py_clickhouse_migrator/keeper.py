@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import logging
+import re
+from typing import TYPE_CHECKING, Any, Final
+
+from kazoo.client import KazooClient
+from kazoo.exceptions import BadVersionError, NodeExistsError, NoNodeError
+
+from py_clickhouse_migrator.lock import LockBackend, LockInfo
+
+if TYPE_CHECKING:
+    from kazoo.protocol.states import ZnodeStat
+
+logger = logging.getLogger("py_clickhouse_migrator")
+
+DEFAULT_LOCK_ROOT: Final[str] = "/py_clickhouse_migrator/locks"
+_NODE_NAME_RE: Final[re.Pattern[str]] = re.compile(r"[a-zA-Z0-9_.-]+\Z")
+
+
+def connect_keeper(hosts: str, timeout: float = 10.0) -> KazooClient:
+    """Start a session with ClickHouse Keeper or ZooKeeper.
+
+    Args:
+        hosts: Comma-separated ``host:port`` list, e.g. ``keeper-1:9181,keeper-2:9181``.
+        timeout: Seconds to wait for the connection; also the session timeout, after which the server drops the
+            session and the locks it holds.
+
+    """
+    client = KazooClient(hosts=hosts, timeout=timeout)
+    client.start(timeout=timeout)
+    return client
+
+
+def _utc(seconds: float) -> dt.datetime:
+    return dt.datetime.fromtimestamp(seconds, dt.UTC).replace(tzinfo=None)
+
+
+class KeeperLockBackend(LockBackend):
+    """Migration lock stored as an ephemeral node in ClickHouse Keeper or ZooKeeper.
+
+    Creating the node is atomic, so exactly one worker gets the lock, and the server deletes the node as soon as
+    the holder's session ends, so a crashed runner releases it after the session timeout rather than ``ttl``.
+    Renewals only refresh the node to show the holder is alive, and check that the node still belongs to this
+    session; a session lost and re-established loses the lock. Times are reported in UTC.
+
+    The node is ``<root>/<cluster>/<scope or db>``, without ``<cluster>`` for a single server. Servers that are
+    not in a cluster and share one Keeper ensemble need different roots, or they lock each other's databases.
+
+    Args:
+        client: Started ``KazooClient``, see ``connect_keeper``. Kazoo clients are thread-safe, so one client can
+            serve the heartbeat and several locks; the caller stops it.
+        db: Database the lock protects; each database has its own node.
+        root: Absolute parent path of the lock nodes.
+        scope: Lock key to use instead of ``db``. Runs with the same scope exclude each other whatever database
+            they migrate, and a scope named after a database shares that database's lock.
+        cluster: ClickHouse cluster the database is on, so clusters sharing one ensemble have separate locks.
+
+    Raises:
+        ValueError: ``root`` is not an absolute path, or ``scope`` or ``cluster`` is not a plain node name.
+
+    """
+
+    def __init__(
+        self, client: KazooClient, db: str, root: str = DEFAULT_LOCK_ROOT, scope: str = "", cluster: str = ""
+    ) -> None:
+        if not root.startswith("/"):
+            raise ValueError(f"Keeper lock root must be an absolute path: {root!r}")
+        for kind, name in (("lock scope", scope), ("cluster name", cluster)):
+            if name and (not _NODE_NAME_RE.match(name) or name in {".", ".."}):
+                raise ValueError(f"Invalid {kind}: {name!r}")
+        self._client = client
+        self.path = "/".join(part for part in (root.rstrip("/"), cluster, scope or db) if part)
+
+    def _read(self) -> tuple[dict[str, Any], ZnodeStat] | None:
+        try:
+            data, stat = self._client.get(self.path)
+        except NoNodeError:
+            return None
+        return json.loads(data), stat
+
+    def _owns(self, value: dict[str, Any], stat: ZnodeStat, locked_by: str) -> bool:
+        session = self._client.client_id
+        return value["locked_by"] == locked_by and session is not None and stat.ephemeralOwner == session[0]
+
+    @staticmethod
+    def _lock_info(value: dict[str, Any], stat: ZnodeStat) -> LockInfo:
+        return LockInfo(
+            locked_by=value["locked_by"],
+            locked_at=_utc(stat.created),
+            expires_at=_utc(stat.last_modified + value["ttl"]),
+        )
+
+    def get_active_lock(self) -> LockInfo | None:
+        node = self._read()
+        return None if node is None else self._lock_info(*node)
+
+    def try_acquire(self, locked_by: str, ttl: int) -> LockInfo | None:
+        value = json.dumps({"locked_by": locked_by, "ttl": ttl}).encode()
+        while True:
+            try:
+                self._client.create(self.path, value, ephemeral=True, makepath=True)
+                return None
+            except NodeExistsError:
+                holder = self.get_active_lock()
+            # The holder may have released the node in between; try again instead of reporting a free lock.
+            if holder is not None:
+                return holder
+
+    def renew(self, locked_by: str, ttl: int) -> bool:
+        node = self._read()
+        if node is None or not self._owns(*node, locked_by):
+            return False
+        value, stat = node
+        try:
+            self._client.set(self.path, json.dumps({**value, "ttl": ttl}).encode(), version=stat.version)
+        except (BadVersionError, NoNodeError):
+            return False
+        return True
+
+    def release(self, locked_by: str, *, force: bool = False) -> None:
+        node = self._read()
+        if node is None:
+            logger.debug("No active lock to release")
+            return
+        value, stat = node
+        if not force and not self._owns(value, stat, locked_by):
+            logger.warning(
+                "Lock is held by another worker %s, skipping release (current worker: %s)",
+                value["locked_by"],
+                locked_by,
+            )
+            return
+        try:
+            self._client.delete(self.path, version=-1 if force else stat.version)
+        except NoNodeError:
+            pass
+        logger.debug("Lock released by %s", "force_release" if force else locked_by)
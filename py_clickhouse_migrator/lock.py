@@ -3,15 +3,21 @@ from __future__ import annotations
 import datetime as dt
 import logging
 import os
+import random
 import re
 import socket
+import threading
 import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
 from dataclasses import dataclass
-from typing import cast
+from enum import StrEnum
+from typing import TYPE_CHECKING, NamedTuple
 from types import TracebackType
 from uuid import uuid4
 
-from clickhouse_driver import Client
+if TYPE_CHECKING:
+    from clickhouse_driver import Client
 
 logger = logging.getLogger("py_clickhouse_migrator")
 
@@ -53,25 +59,164 @@ class LockTimeoutError(LockError):
         )
 
 
+class LockLostError(Exception):
+    def __init__(self, locked_by: str) -> None:
+        self.locked_by = locked_by
+        super().__init__(
+            f"Migration lock of {locked_by} was lost: it expired or another worker took it over.\n"
+            "Stopped before the next statement; completed statements are recorded, and 'migrator up' resumes "
+            "from the rest once no other run is active."
+        )
+
+
 @dataclass
 class LockInfo:
     locked_by: str
     locked_at: dt.datetime
     expires_at: dt.datetime
+    # Server time when the lock was read, to tell how long it has left without comparing clocks.
+    checked_at: dt.datetime | None = None
+
+
+class LockWaitStrategy(StrEnum):
+    FIXED = "fixed"
+    EXPONENTIAL = "exponential"
+    JITTER = "jitter"
+
+
+class LockWait(NamedTuple):
+    """How ``acquire`` waits while another worker holds the lock.
+
+    ``fixed`` sleeps ``delay`` between attempts and ``exponential`` doubles it after each one. ``jitter`` picks a
+    random delay between ``delay`` and three times the previous one (decorrelated jitter), so workers that started
+    together stop polling in lockstep. Delays are capped at ``max_delay``. With ``until_expiry``, a worker sleeps
+    until the holder's lock expires when that is later, so a held lock costs one query per ``max_delay`` rather
+    than one per ``delay``; a lock released early is noticed that much later. It needs the holder's
+    ``checked_at``; backends that leave it unset, such as the Keeper backend, use the strategy's delays only.
+    ``timeout`` is the longest total wait; when set, it replaces the retry count.
+    """
+
+    strategy: LockWaitStrategy = LockWaitStrategy.FIXED
+    delay: float = 1.0
+    max_delay: float = 30.0
+    timeout: float = 0.0
+    until_expiry: bool = False
+
+
+class LockWaiter:
+    """Attempts, delays and deadline of one ``acquire`` call, shared by the sync and async locks.
+
+    Args:
+        wait: Wait strategy.
+        retry_count: Number of retries when ``wait`` has no timeout.
+        clock: Monotonic clock, replaceable in tests.
+        uniform: Random number source for ``jitter``, replaceable in tests.
+
+    """
+
+    def __init__(
+        self,
+        wait: LockWait,
+        retry_count: int,
+        clock: Callable[[], float] = time.monotonic,
+        uniform: Callable[[float, float], float] = random.uniform,
+    ) -> None:
+        self._wait = wait
+        self._retry_count = retry_count
+        self._clock = clock
+        self._uniform = uniform
+        self._deadline = clock() + wait.timeout if wait.timeout else None
+        self._previous = wait.delay
+        self.retries = 0
+
+    def next_delay(self, holder: LockInfo | None) -> float | None:
+        """Return the seconds to sleep before the next attempt, or None when out of retries or time."""
+        wait = self._wait
+        if self._deadline is None and self.retries >= self._retry_count:
+            return None
+        if wait.strategy == LockWaitStrategy.EXPONENTIAL:
+            delay = wait.delay * 2.0 ** min(self.retries, 32)
+        elif wait.strategy == LockWaitStrategy.JITTER:
+            delay = self._uniform(wait.delay, max(wait.delay, self._previous * 3))
+        else:
+            delay = wait.delay
+        if wait.until_expiry and holder is not None and holder.checked_at is not None:
+            delay = max(delay, (holder.expires_at - holder.checked_at).total_seconds())
+        delay = min(delay, wait.max_delay)
+        if self._deadline is not None:
+            left = self._deadline - self._clock()
+            if left <= 0:
+                return None
+            delay = min(delay, left)
+        self._previous = delay
+        self.retries += 1
+        return delay
+
+    def error(self, holder: LockInfo) -> LockError:
+        """Return the error to raise once waiting for ``holder`` gave up."""
+        if self.retries:
+            return LockTimeoutError(
+                locked_by=holder.locked_by,
+                locked_at=holder.locked_at,
+                expires_at=holder.expires_at,
+                retries=self.retries,
+            )
+        return LockError(locked_by=holder.locked_by, locked_at=holder.locked_at, expires_at=holder.expires_at)
+
+
+class LockBackend(ABC):
+    """Where a ``MigrationLock`` is stored; ``MigrationLock`` adds waiting, the heartbeat and lost-lock checks.
+
+    Without a backend, ``MigrationLock`` keeps the lock in the ``_migrations_lock`` table. ``renew`` is called
+    from the heartbeat thread while the other methods may run on the caller's thread, so a backend must be safe
+    to use from both.
+    """
+
+    @abstractmethod
+    def get_active_lock(self) -> LockInfo | None:
+        """Return the current holder, or None if the lock is free.
+
+        Set ``checked_at`` to the store's current time to support ``LockWait.until_expiry``.
+        """
+
+    @abstractmethod
+    def try_acquire(self, locked_by: str, ttl: int) -> LockInfo | None:
+        """Take the lock for ``locked_by``; return None on success and the holder otherwise."""
+
+    @abstractmethod
+    def renew(self, locked_by: str, ttl: int) -> bool:
+        """Extend the lock of ``locked_by`` and return whether it still holds it."""
+
+    @abstractmethod
+    def release(self, locked_by: str, *, force: bool = False) -> None:
+        """Release the lock if ``locked_by`` holds it, or whoever holds it with ``force``."""
 
 
 class MigrationLock:
     """Distributed advisory lock for safe concurrent migrations.
 
+    With ``heartbeat_client`` set, a background thread renews the lock for another ``ttl`` seconds every
+    ``heartbeat_interval`` while the context is entered, so a short TTL covers long migrations and a crashed
+    runner blocks others for at most ``ttl``. If a renewal finds the lock held by someone else, or no renewal
+    succeeded for ``ttl`` seconds, ``lost`` is set and ``check`` raises ``LockLostError``.
+
     Args:
         ttl: Lock expiration time in seconds.
         retry_count: Number of acquire retries when lock is held.
         retry_delay: Seconds between acquire retries.
         cluster: ClickHouse cluster name for replicated lock table.
+        wait: Wait strategy for a held lock; replaces ``retry_delay``, and ``retry_count`` when it has a timeout.
+        heartbeat_client: Connection the heartbeat renews the lock with; no heartbeat runs when not set. It must
+            not be used by anything else while the lock is held, and is disconnected on exit.
+        heartbeat_interval: Seconds between renewals; a third of ``ttl`` by default.
+        backend: Stores the lock instead of the ``_migrations_lock`` table; ``client`` and ``cluster`` are then
+            not used. The heartbeat always runs and renews through the backend.
 
     """
 
     _LOCK_TABLE = "_migrations_lock"
+    # Every acquire, renewal and release adds a row; keep a day of history so lock reads stay small.
+    _ROW_TTL = "toDateTime(expires_at) + INTERVAL 1 DAY"
     _LOCK_ID = "migration"
 
     def __init__(
@@ -82,6 +227,10 @@ class MigrationLock:
         retry_count: int = 0,
         retry_delay: float = 1.0,
         cluster: str = "",
+        wait: LockWait | None = None,
+        heartbeat_client: Client | None = None,
+        heartbeat_interval: float | None = None,
+        backend: LockBackend | None = None,
     ) -> None:
         if not _DB_NAME_RE.match(db):
             raise ValueError(f"Invalid database name: {db!r}")
@@ -93,9 +242,17 @@ class MigrationLock:
         self._retry_count = retry_count
         self._retry_delay = retry_delay
         self._cluster = cluster
+        self._wait = wait
         self._settings: ClickHouseSettings = _CLUSTER_SETTINGS.copy() if self._cluster else {}
         self._locked_by = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
-        self.ensure_table()
+        self._heartbeat_client = heartbeat_client
+        self._heartbeat_interval = heartbeat_interval if heartbeat_interval is not None else ttl / 3
+        self._heartbeat: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self.lost = threading.Event()
+        self._backend = backend
+        if backend is None:
+            self.ensure_table()
 
     def ensure_table(self) -> None:
         on_cluster = f"ON CLUSTER {self._cluster}" if self._cluster else ""
@@ -114,12 +271,23 @@ class MigrationLock:
                 is_locked  UInt8     DEFAULT 1
             ) ENGINE = {engine}
             ORDER BY lock_id
+            TTL {self._ROW_TTL}
             """
         )
+        rows = self._client.execute(
+            f"SELECT engine_full FROM system.tables WHERE database = %(database)s AND name = '{self._LOCK_TABLE}'",
+            {"database": self._db},
+        )
+        if rows and " TTL " not in rows[0][0]:
+            # Tables created by older versions keep every row ever inserted.
+            logger.info("Adding row TTL to %s.%s", self._db, self._LOCK_TABLE)
+            self._client.execute(
+                f"ALTER TABLE {self._db}.{self._LOCK_TABLE} {on_cluster} MODIFY TTL {self._ROW_TTL}",
+                settings=self._settings,
+            )
 
-    def _try_acquire(self) -> LockInfo | None:
-        """Insert a lock row and verify ownership. Returns None on success, LockInfo of holder on failure."""
-        self._client.execute(
+    def _insert_lock(self, client: Client) -> None:
+        client.execute(
             f"""
             INSERT INTO {self._db}.{self._LOCK_TABLE}
                 (lock_id, locked_by, locked_at, expires_at, is_locked)
@@ -133,54 +301,49 @@ class MigrationLock:
             {"lock_id": self._LOCK_ID, "locked_by": self._locked_by, "ttl": self._ttl},
             settings=self._settings,
         )
+
+    def try_acquire(self) -> LockInfo | None:
+        """Take the lock and verify ownership. Returns None on success, LockInfo of holder on failure."""
+        if self._backend is not None:
+            holder = self._backend.try_acquire(self._locked_by, self._ttl)
+            if holder is None:
+                logger.debug("Lock acquired by %s", self._locked_by)
+            return holder
+        self._insert_lock(self._client)
         current_lock = self._get_active_lock()
         if current_lock is not None and current_lock.locked_by == self._locked_by:
             logger.debug("Lock acquired by %s", self._locked_by)
             return None
         return current_lock
 
-    def acquire(self, retry_count: int = 0, retry_delay: float = 1.0) -> None:
+    def acquire(self, retry_count: int = 0, retry_delay: float = 1.0, wait: LockWait | None = None) -> None:
         """Acquire the migration lock.
 
         Args:
             retry_count: Number of retries if lock is already held.
             retry_delay: Seconds between retries.
+            wait: Wait strategy; replaces ``retry_delay``, and ``retry_count`` when it has a timeout.
 
         """
-        for attempt in range(retry_count + 1):
+        waiter = LockWaiter(wait or LockWait(delay=retry_delay, max_delay=retry_delay), retry_count)
+        while True:
             lock_info = self._get_active_lock()
             if lock_info is None:
-                holder = self._try_acquire()
+                holder = self.try_acquire()
                 if holder is None:
                     return
                 lock_info = holder
-
-            if attempt < retry_count:
-                logger.debug(
-                    "Lock held by %s, retrying in %.1fs (%d/%d)",
-                    lock_info.locked_by,
-                    retry_delay,
-                    attempt + 1,
-                    retry_count,
-                )
-                time.sleep(retry_delay)
-
-        info = cast(LockInfo, lock_info)
-        if retry_count > 0:
-            raise LockTimeoutError(
-                locked_by=info.locked_by,
-                locked_at=info.locked_at,
-                expires_at=info.expires_at,
-                retries=retry_count,
-            )
-        raise LockError(
-            locked_by=info.locked_by,
-            locked_at=info.locked_at,
-            expires_at=info.expires_at,
-        )
+            delay = waiter.next_delay(lock_info)
+            if delay is None:
+                raise waiter.error(lock_info)
+            logger.debug("Lock held by %s, retrying in %.1fs (retry %d)", lock_info.locked_by, delay, waiter.retries)
+            time.sleep(delay)
 
     def release(self, *, force: bool = False) -> None:
         """Release the migration lock."""
+        if self._backend is not None:
+            self._backend.release(self._locked_by, force=force)
+            return
         if not force:
             current_lock = self._get_active_lock()
             if current_lock is None:
@@ -210,6 +373,101 @@ class MigrationLock:
         )
         logger.debug("Lock released by %s", locked_by)
 
+    def renew(self, client: Client | None = None) -> bool:
+        """Extend the lock by ``ttl`` seconds from now if this worker still holds it.
+
+        Args:
+            client: Client to renew with instead of the lock's client.
+
+        Returns:
+            Whether this worker holds the lock after the renewal.
+
+        """
+        if self._backend is not None:
+            return self._backend.renew(self._locked_by, self._ttl)
+        client = client or self._client
+        current_lock = self._get_active_lock(client)
+        if current_lock is None or current_lock.locked_by != self._locked_by:
+            return False
+        # The lock may expire and be taken over between the read and the insert. The insert only happens while
+        # the newest row is still the one read, so a renewal never takes a lock back from its new holder.
+        client.execute(
+            f"""
+            INSERT INTO {self._db}.{self._LOCK_TABLE}
+                (lock_id, locked_by, locked_at, expires_at, is_locked)
+            SELECT
+                %(lock_id)s,
+                %(locked_by)s,
+                now64(3),
+                now64(3) + INTERVAL %(ttl)s SECOND,
+                1
+            FROM (
+                SELECT argMax(
+                    (locked_by, locked_at, expires_at, is_locked),
+                    (locked_at, is_locked = 0, locked_by)
+                ) AS latest
+                FROM {self._db}.{self._LOCK_TABLE}
+                WHERE lock_id = %(lock_id)s
+            )
+            WHERE latest.1 = %(locked_by)s
+                AND latest.2 = toDateTime64(%(locked_at)s, 3)
+                AND latest.4 = 1
+                AND latest.3 > now64(3)
+            """,
+            {
+                "lock_id": self._LOCK_ID,
+                "locked_by": self._locked_by,
+                "locked_at": current_lock.locked_at.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                "ttl": self._ttl,
+            },
+            settings=self._settings,
+        )
+        current_lock = self._get_active_lock(client)
+        return current_lock is not None and current_lock.locked_by == self._locked_by
+
+    def check(self) -> None:
+        """Raise ``LockLostError`` if the heartbeat found the lock expired or taken over."""
+        if self.lost.is_set():
+            raise LockLostError(self._locked_by)
+
+    def _run_heartbeat(self, client: Client | None) -> None:
+        renewed = time.monotonic()
+        while not self._stop_event.wait(self._heartbeat_interval):
+            try:
+                held = self.renew(client)
+            except Exception as exc:
+                held = time.monotonic() - renewed < self._ttl
+                logger.warning("Failed to renew the migration lock: %s", exc)
+            else:
+                if held:
+                    renewed = time.monotonic()
+                    logger.debug("Lock renewed by %s", self._locked_by)
+            if not held:
+                logger.error("Migration lock of %s was lost, stopping before the next statement.", self._locked_by)
+                self.lost.set()
+                return
+
+    def start_heartbeat(self) -> None:
+        """Start renewing the lock in the background; ``__enter__`` calls it after acquiring."""
+        if self._heartbeat_client is None and self._backend is None:
+            return
+        self._stop_event.clear()
+        self.lost.clear()
+        self._heartbeat = threading.Thread(
+            target=self._run_heartbeat, args=(self._heartbeat_client,), name="migration-lock-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+    def stop_heartbeat(self) -> None:
+        """Stop the renewals and disconnect ``heartbeat_client``; ``__exit__`` calls it before releasing."""
+        if self._heartbeat is None:
+            return
+        self._stop_event.set()
+        self._heartbeat.join()
+        self._heartbeat = None
+        if self._heartbeat_client is not None:
+            self._heartbeat_client.disconnect()
+
     def is_locked(self) -> bool:
         """Check whether the migration lock is currently held."""
         return self._get_active_lock() is not None
@@ -218,27 +476,34 @@ class MigrationLock:
         """Return info about the active lock, or None if unlocked."""
         return self._get_active_lock()
 
-    def _get_active_lock(self) -> LockInfo | None:
-        rows = self._client.execute(
+    def _get_active_lock(self, client: Client | None = None) -> LockInfo | None:
+        if self._backend is not None:
+            return self._backend.get_active_lock()
+        # The newest row wins, as with FINAL, without merging parts. Rows inserted in the same millisecond are
+        # ordered so that every reader picks the same winner and a release beats the acquire it ends.
+        rows = (client or self._client).execute(
             f"""
-            SELECT
-                locked_by,
-                locked_at,
-                expires_at
-            FROM {self._db}.{self._LOCK_TABLE} FINAL
-            WHERE lock_id = %(lock_id)s
-                AND is_locked = 1
-                AND expires_at > now64(3)
+            SELECT latest.1, latest.2, latest.3, now64(3)
+            FROM (
+                SELECT argMax(
+                    (locked_by, locked_at, expires_at, is_locked),
+                    (locked_at, is_locked = 0, locked_by)
+                ) AS latest
+                FROM {self._db}.{self._LOCK_TABLE}
+                WHERE lock_id = %(lock_id)s
+            )
+            WHERE latest.4 = 1 AND latest.3 > now64(3)
             """,
             {"lock_id": self._LOCK_ID},
             settings=self._settings,
         )
         if not rows:
             return None
-        return LockInfo(locked_by=rows[0][0], locked_at=rows[0][1], expires_at=rows[0][2])
+        return LockInfo(locked_by=rows[0][0], locked_at=rows[0][1], expires_at=rows[0][2], checked_at=rows[0][3])
 
     def __enter__(self) -> MigrationLock:
-        self.acquire(retry_count=self._retry_count, retry_delay=self._retry_delay)
+        self.acquire(retry_count=self._retry_count, retry_delay=self._retry_delay, wait=self._wait)
+        self.start_heartbeat()
         return self
 
     def __exit__(
@@ -247,6 +512,10 @@ class MigrationLock:
         exc_val: BaseException | None,
         exc_tb: TracebackType | None,
     ) -> None:
+        try:
+            self.stop_heartbeat()
+        except Exception:
+            logger.exception("Failed to stop the migration lock heartbeat")
         try:
             self.release()
         except Exception:
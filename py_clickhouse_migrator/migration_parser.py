@@ -1,3 +1,4 @@
+import re
 from pathlib import Path
 from typing import Final, NamedTuple
 
@@ -6,6 +7,16 @@ from py_clickhouse_migrator.errors import MigrationParseError
 _UP_MARKER: Final[str] = "-- migrator:up"
 _DOWN_MARKER: Final[str] = "-- migrator:down"
 _STATEMENT_MARKER: Final[str] = "-- @stmt"
+_DEPENDS_MARKER: Final[str] = "-- migrator:depends"
+_SQUASHES_MARKER: Final[str] = "-- migrator:squashes"
+_STATEMENT_OPTION_RE: Final[re.Pattern[str]] = re.compile(r"([a-z_]+)=(\S+)\Z")
+_STATEMENT_OPTIONS: Final[frozenset[str]] = frozenset({"chunk_by", "table", "jobs"})
+_TABLE_RE: Final[re.Pattern[str]] = re.compile(
+    r"(?:(?P<database>[a-zA-Z_][a-zA-Z0-9_]*)\.)?(?P<table>[a-zA-Z_][a-zA-Z0-9_]*)\Z"
+)
+# Replaced in chunked statements by the quoted partition id and by the partition expression of each chunk.
+PARTITION_ID_PLACEHOLDER: Final[str] = "{partition_id}"
+PARTITION_PLACEHOLDER: Final[str] = "{partition}"
 
 
 class MigrationSections(NamedTuple):
@@ -13,11 +24,38 @@ class MigrationSections(NamedTuple):
     rollback: str
 
 
+class ChunkSpec(NamedTuple):
+    """Options of a ``-- @stmt chunk_by=partition table=[db.]table [jobs=N]`` block.
+
+    The statement runs once per partition of ``table``, at most ``jobs`` partitions at a time.
+    """
+
+    table: str
+    database: str = ""
+    jobs: int = 1
+
+
 class MigrationStatements(NamedTuple):
     up: list[str]
     rollback: list[str]
 
 
+class MigrationHeader(NamedTuple):
+    """Migration names listed above ``-- migrator:up``."""
+
+    # Migrations that must be applied first when migrations run in parallel.
+    depends: list[str]
+    # Migrations replaced by this snapshot, in filename order; see ``migrator squash``.
+    squashes: list[str]
+
+
+class MigrationChunks(NamedTuple):
+    """Chunk options of the chunked statements, by statement index in each section."""
+
+    up: dict[int, ChunkSpec]
+    rollback: dict[int, ChunkSpec]
+
+
 def _trim_section(lines: list[str]) -> str:
     start = 0
     end = len(lines)
@@ -69,28 +107,133 @@ def load_migration_sections(filepath: str) -> MigrationSections:
         raise MigrationParseError(f"Migration {filepath}: {exc}") from exc
 
 
+def load_migration_header(filepath: str) -> MigrationHeader:
+    """Return the migration names listed in ``-- migrator:depends`` and ``-- migrator:squashes`` lines.
+
+    Only lines above ``-- migrator:up`` are read. Names are separated by commas or spaces; ``.sql`` is appended
+    when missing.
+
+    Raises:
+        MigrationParseError: The file cannot be read, or a header line lists no names.
+
+    """
+    try:
+        lines = _load_migration_lines(filepath)
+    except OSError as exc:
+        raise MigrationParseError(f"Cannot load migration: {filepath}") from exc
+    up_lines = _find_marker_positions(lines, _UP_MARKER)
+    header = MigrationHeader(depends=[], squashes=[])
+    for line in lines[: up_lines[0] if up_lines else len(lines)]:
+        stripped_line = line.strip()
+        for marker, names in ((_DEPENDS_MARKER, header.depends), (_SQUASHES_MARKER, header.squashes)):
+            if stripped_line != marker and not stripped_line.startswith(f"{marker} "):
+                continue
+            found = [name for name in re.split(r"[,\s]+", stripped_line[len(marker) :]) if name]
+            if not found:
+                raise MigrationParseError(f"Migration {filepath}: '{marker}' must list at least one migration.")
+            names.extend(name if name.endswith(".sql") else f"{name}.sql" for name in found)
+    return header
+
+
+def format_squashes_header(names: list[str], width: int = 100) -> list[str]:
+    """Return ``-- migrator:squashes`` lines listing ``names``, wrapped at about ``width`` characters."""
+    lines: list[str] = []
+    current = _SQUASHES_MARKER
+    for name in names:
+        if len(current) + len(name) + 1 > width and current != _SQUASHES_MARKER:
+            lines.append(current)
+            current = _SQUASHES_MARKER
+        current = f"{current} {name}"
+    if current != _SQUASHES_MARKER:
+        lines.append(current)
+    return lines
+
+
+def format_statement_marker(chunk: ChunkSpec | None = None) -> str:
+    """Return the ``-- @stmt`` line for a statement block, with its chunk options."""
+    if chunk is None:
+        return _STATEMENT_MARKER
+    table = f"{chunk.database}.{chunk.table}" if chunk.database else chunk.table
+    jobs = f" jobs={chunk.jobs}" if chunk.jobs != 1 else ""
+    return f"{_STATEMENT_MARKER} chunk_by=partition table={table}{jobs}"
+
+
 def extract_migration_statements(sections: MigrationSections) -> MigrationStatements:
-    up_statements = _extract_statement_blocks(sections.up.splitlines(), _UP_MARKER)
-    rollback_statements = _extract_statement_blocks(sections.rollback.splitlines(), _DOWN_MARKER)
+    return parse_migration_statements(sections)[0]
+
+
+def parse_migration_statements(sections: MigrationSections) -> tuple[MigrationStatements, MigrationChunks]:
+    """Split both sections into statement blocks and collect the chunk options of chunked blocks."""
+    up_statements, up_chunks = _extract_chunked_statement_blocks(sections.up.splitlines(), _UP_MARKER)
+    rollback_statements, rollback_chunks = _extract_chunked_statement_blocks(
+        sections.rollback.splitlines(), _DOWN_MARKER
+    )
 
     if not up_statements:
         raise MigrationParseError(f"Must contain at least one non-empty '{_STATEMENT_MARKER}' block in '{_UP_MARKER}'.")
 
-    return MigrationStatements(up=up_statements, rollback=rollback_statements)
+    return (
+        MigrationStatements(up=up_statements, rollback=rollback_statements),
+        MigrationChunks(up=up_chunks, rollback=rollback_chunks),
+    )
+
+
+def _parse_statement_marker(stripped_line: str) -> tuple[bool, ChunkSpec | None]:
+    """Return whether the line starts a statement block, and the chunk options given on it.
+
+    Only a line whose every word is a known ``key=value`` option carries options. Any other text after the
+    marker keeps the meaning it had before chunk options existed: the line is part of the current statement.
+    """
+    if stripped_line == _STATEMENT_MARKER:
+        return True, None
+    if not stripped_line.startswith(_STATEMENT_MARKER) or not stripped_line[len(_STATEMENT_MARKER)].isspace():
+        return False, None
+    matches = [_STATEMENT_OPTION_RE.match(token) for token in stripped_line[len(_STATEMENT_MARKER) :].split()]
+    if not all(match is not None and match[1] in _STATEMENT_OPTIONS for match in matches):
+        return False, None
+    options = {match[1]: match[2] for match in matches if match is not None}
+    if options.get("chunk_by") != "partition":
+        raise MigrationParseError(f"'{_STATEMENT_MARKER}' options require chunk_by=partition: '{stripped_line}'.")
+    table = _TABLE_RE.match(options.get("table", ""))
+    if table is None:
+        raise MigrationParseError(f"chunk_by=partition requires table=[database.]table: '{stripped_line}'.")
+    jobs = options.get("jobs", "1")
+    if not jobs.isdigit() or int(jobs) < 1:
+        raise MigrationParseError(f"jobs must be a positive integer: '{stripped_line}'.")
+    return True, ChunkSpec(table=table["table"], database=table["database"] or "", jobs=int(jobs))
 
 
 def _extract_statement_blocks(lines: list[str], section_marker: str) -> list[str]:
+    return _extract_chunked_statement_blocks(lines, section_marker)[0]
+
+
+def _extract_chunked_statement_blocks(lines: list[str], section_marker: str) -> tuple[list[str], dict[int, ChunkSpec]]:
     statements: list[str] = []
+    chunks: dict[int, ChunkSpec] = {}
     current_block: list[str] | None = None
+    current_chunk: ChunkSpec | None = None
+
+    def close_block() -> None:
+        statement = _trim_section(current_block or [])
+        if not statement:
+            return
+        if current_chunk is not None:
+            if PARTITION_ID_PLACEHOLDER not in statement and PARTITION_PLACEHOLDER not in statement:
+                raise MigrationParseError(
+                    f"Chunked statement must reference {PARTITION_ID_PLACEHOLDER} or {PARTITION_PLACEHOLDER}: "
+                    f"{statement[:80]}"
+                )
+            chunks[len(statements)] = current_chunk
+        statements.append(statement)
 
     for line in lines:
         stripped_line = line.strip()
-        if stripped_line == _STATEMENT_MARKER:
+        is_marker, chunk = _parse_statement_marker(stripped_line)
+        if is_marker:
             if current_block is not None:
-                statement = _trim_section(current_block)
-                if statement:
-                    statements.append(statement)
+                close_block()
             current_block = []
+            current_chunk = chunk
             continue
 
         if current_block is None:
@@ -103,8 +246,6 @@ def _extract_statement_blocks(lines: list[str], section_marker: str) -> list[str
         current_block.append(line)
 
     if current_block is not None:
-        statement = _trim_section(current_block)
-        if statement:
-            statements.append(statement)
+        close_block()
 
-    return statements
+    return statements, chunks
@@ -1,18 +1,26 @@
 import datetime as dt
 import logging
+import multiprocessing
 import os
 import re
 import time
-from dataclasses import dataclass
+import threading
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
 from enum import StrEnum
 from functools import cached_property
-from typing import Final, NamedTuple
+from typing import Final, NamedTuple, cast
+from uuid import uuid4
 
 import click
 from clickhouse_driver import Client
 from clickhouse_driver.errors import ServerException
 
-from py_clickhouse_migrator.checksum import compute_checksum_from_statements
+from py_clickhouse_migrator.cache import CACHE_FILENAME, FileSignature, MigrationCache, get_file_signature
+from py_clickhouse_migrator.checksum import compute_checksum_from_statements, compute_statement_checksum
+from py_clickhouse_migrator.chunks import VALIDATION_PARTITION, Partition, list_partitions, render_chunk
+from py_clickhouse_migrator.dependencies import MigrationNode, plan_dependencies
 from py_clickhouse_migrator.errors import (
     BaselineError,
     ChecksumMismatchError,
@@ -23,22 +31,47 @@ from py_clickhouse_migrator.errors import (
     MigrationParseError,
     MigrationDirectoryNotFoundError,
     MissingDatabaseUrlError,
+    SchemaCloneError,
 )
+
+# File helpers live in files.py so offline CLI commands do not import the driver; re-exported from here.
+from py_clickhouse_migrator.files import (
+    DEFAULT_MIGRATIONS_DIR,
+    MIGRATION_TEMPLATE,  # noqa: F401
+    create_migration_file,  # noqa: F401
+    create_migrations_dir,  # noqa: F401
+    make_migration_filename,  # noqa: F401
+)
+from py_clickhouse_migrator.lock import MigrationLock
 from py_clickhouse_migrator.migration_parser import (
+    ChunkSpec,
+    MigrationChunks,
+    MigrationHeader,
     MigrationSections,
     MigrationStatements,
-    extract_migration_statements,
+    parse_migration_statements,
+    load_migration_header,
     load_migration_sections,
 )
+from py_clickhouse_migrator.mutations import MutationWaiter, find_mutation_target
+from py_clickhouse_migrator.progress import StatementMonitor
+from py_clickhouse_migrator.schema import plan_schema, read_schema, run_planned, strip_database
+from py_clickhouse_migrator.throttle import LoadThrottle, ThrottleConfig
+from py_clickhouse_migrator.timings import InstrumentedClient, QueryTimings, format_bytes
 
 logger = logging.getLogger("py_clickhouse_migrator")
 
 SQL = str
 ClickHouseSettings = dict[str, str | int]
+# Opens a client for a database url; anything with the ``execute`` and ``disconnect`` methods of ``Client`` works.
+ClientFactory = Callable[[str], Client]
 
 _SQL_IDENTIFIER_RE: Final[re.Pattern[str]] = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*\Z")  # cluster name, db name
 _UNKNOWN_DATABASE_CODE: Final[int] = 81
-_MIGRATION_NAME_RE: Final[re.Pattern[str]] = re.compile(r"[a-zA-Z0-9_]+\Z")  # migration name suffix in filename
+_PROGRESS_TABLE: Final[str] = "db_migrations_progress"
+_STATS_TABLE: Final[str] = "db_migrations_stats"
+_CHUNKS_TABLE: Final[str] = "db_migrations_chunks"
+_UNKNOWN_TABLE_CODE: Final[int] = 60
 
 _CLUSTER_SETTINGS: ClickHouseSettings = {
     "insert_quorum": "auto",
@@ -46,16 +79,6 @@ _CLUSTER_SETTINGS: ClickHouseSettings = {
 }
 
 
-MIGRATION_TEMPLATE: str = """-- migrator:up
--- @stmt
-
-
--- migrator:down
--- @stmt
-"""
-DEFAULT_MIGRATIONS_DIR: str = "./db/migrations"
-
-
 class ChecksumMismatch(NamedTuple):
     name: str
     stored: str
@@ -67,6 +90,62 @@ class ShowMigrationsResult(NamedTuple):
     warning: str
 
 
+class SchemaClone(NamedTuple):
+    # Objects in the order they were created.
+    objects: list[str]
+    # Migrations copied into ``db_migrations``, in apply order.
+    migrations: list[str]
+
+
+class LedgerRow(NamedTuple):
+    name: str
+    kind: str
+    checksum: str
+    dt: dt.datetime
+
+
+class StatementRun(NamedTuple):
+    query_id: str
+    duration_ms: int
+    # ``query_id`` of each partition query of a chunked statement, ``<query_id>-<partition_id>``.
+    chunk_query_ids: tuple[str, ...] = ()
+
+
+class MigrationStats(NamedTuple):
+    """Execution stats of one applied migration, from ``db_migrations_stats``.
+
+    Server-side counters are summed over the statements found in ``system.query_log``; memory is the peak of
+    a single statement. They are zero when the query log was not readable.
+    """
+
+    name: str
+    started_at: dt.datetime
+    duration_ms: int
+    resumed_from: int
+    statement_duration_ms: list[int]
+    read_rows: int = 0
+    read_bytes: int = 0
+    written_rows: int = 0
+    written_bytes: int = 0
+    peak_memory_usage: int = 0
+
+
+class _QueryMetrics(NamedTuple):
+    read_rows: int
+    read_bytes: int
+    written_rows: int
+    written_bytes: int
+    memory_usage: int
+
+
+class _MigrationRun(NamedTuple):
+    name: str
+    started_at: dt.datetime
+    duration_ms: int
+    resumed_from: int
+    statements: list[StatementRun]
+
+
 class MigrationDirection(StrEnum):
     UP = "up"
     ROLLBACK = "rollback"
@@ -77,6 +156,65 @@ class MigrationKind(StrEnum):
     BASELINE = "baseline"
 
 
+class LedgerSnapshot(NamedTuple):
+    """Rows of ``db_migrations`` read with a single query, ordered by apply time."""
+
+    rows: list[LedgerRow]
+
+    @property
+    def applied_names(self) -> list[str]:
+        return [row.name for row in self.rows]
+
+    @property
+    def baseline_names(self) -> set[str]:
+        return {row.name for row in self.rows if row.kind == MigrationKind.BASELINE}
+
+    @property
+    def checksums(self) -> list[tuple[str, str]]:
+        """Return ``(name, checksum)`` pairs of executed (non-baseline) migrations."""
+        return [(row.name, row.checksum) for row in self.rows if row.kind == MigrationKind.MIGRATION]
+
+
+def _format_duration(ms: int) -> str:
+    if ms < 1000:
+        return f"{ms}ms"
+    if ms < 60_000:
+        return f"{ms / 1000:.1f}s"
+    minutes, seconds = divmod(ms // 1000, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+def format_migration_stats(stats: list[MigrationStats]) -> str:
+    """Render ``show --stats`` output: one line per migration with duration, slowest statement and resources."""
+    lines = [click.style("Slowest migrations:", bold=True)]
+    if not stats:
+        lines.append("  no stats recorded yet")
+    for item in stats:
+        line = (
+            f"  {item.name}  {click.style(_format_duration(item.duration_ms), fg='yellow')}"
+            f"  started {item.started_at:%Y-%m-%d %H:%M:%S}"
+        )
+        if item.statement_duration_ms:
+            slowest = max(range(len(item.statement_duration_ms)), key=item.statement_duration_ms.__getitem__)
+            line += (
+                f"  {len(item.statement_duration_ms)} statement(s), slowest #{item.resumed_from + slowest + 1}"
+                f" {_format_duration(item.statement_duration_ms[slowest])}"
+            )
+        if item.resumed_from:
+            line += f"  resumed at #{item.resumed_from + 1}"
+        if item.read_rows or item.written_rows or item.peak_memory_usage:
+            line += (
+                f"  read {item.read_rows} rows/{format_bytes(item.read_bytes)}"
+                f"  written {item.written_rows} rows/{format_bytes(item.written_bytes)}"
+                f"  peak memory {format_bytes(item.peak_memory_usage)}"
+            )
+        lines.append(line)
+    return "\n".join(lines)
+
+
 @dataclass
 class Migration:
     name: str
@@ -85,12 +223,16 @@ class Migration:
     kind: str = MigrationKind.MIGRATION
 
     @cached_property
-    def _statements(self) -> MigrationStatements:
+    def _parsed(self) -> tuple[MigrationStatements, MigrationChunks]:
         try:
-            return extract_migration_statements(MigrationSections(up=self.up, rollback=self.rollback))
+            return parse_migration_statements(MigrationSections(up=self.up, rollback=self.rollback))
         except MigrationParseError as exc:
             raise InvalidMigrationError(f"Migration {self.name}: {exc}") from exc
 
+    @property
+    def _statements(self) -> MigrationStatements:
+        return self._parsed[0]
+
     @property
     def up_statements(self) -> list[SQL]:
         return self._statements.up
@@ -99,54 +241,150 @@ class Migration:
     def rollback_statements(self) -> list[SQL]:
         return self._statements.rollback
 
+    @property
+    def up_chunks(self) -> dict[int, ChunkSpec]:
+        return self._parsed[1].up
+
+    @property
+    def rollback_chunks(self) -> dict[int, ChunkSpec]:
+        return self._parsed[1].rollback
+
     @property
     def is_baseline(self) -> bool:
         return self.kind == MigrationKind.BASELINE
 
 
-def create_migrations_dir(migrations_dir: str = DEFAULT_MIGRATIONS_DIR) -> None:
-    """Create the migrations directory if it doesn't exist."""
-    os.makedirs(migrations_dir, exist_ok=True)
-    logger.info("Migrations directory %s successfully initialized.", migrations_dir)
+def _compute_file_checksum(name: str, filepath: str) -> str:
+    try:
+        sections = load_migration_sections(filepath)
+        migration = Migration(
+            name=name,
+            up=sections.up,
+            rollback=sections.rollback,
+        )
+        return compute_checksum_from_statements(
+            migration.up_statements,
+            migration.rollback_statements,
+        )
+    except (MigrationParseError, InvalidMigrationError) as exc:
+        raise InvalidMigrationError(str(exc)) from exc
 
 
-def make_migration_filename(name: str = "") -> str:
-    """Generate a timestamped migration filename."""
-    if name and not _MIGRATION_NAME_RE.match(name):
-        raise ValueError(f"Invalid migration name: '{name}'. Use only letters, digits, and underscores.")
-    filename = dt.datetime.now().strftime("%Y%m%d%H%M%S")
-    if name:
-        filename += f"_{name}"
-    filename += ".sql"
-    return filename
+def _load_migration(migrations_dir: str, filename: str) -> Migration:
+    try:
+        sections = load_migration_sections(f"{migrations_dir}/{filename}")
+    except (MigrationParseError, InvalidMigrationError) as exc:
+        raise InvalidMigrationError(str(exc)) from exc
+    return Migration(name=filename, up=sections.up, rollback=sections.rollback)
+
+
+def create_client(
+    database_url: str,
+    client_factory: ClientFactory | None = None,
+    send_receive_timeout: int = 600,
+    timings: QueryTimings | None = None,
+) -> Client:
+    """Open a ClickHouse client the way ``Migrator`` does.
+
+    Args:
+        database_url: ClickHouse url.
+        client_factory: Opens the connection instead of ``Client.from_url``; ``send_receive_timeout`` is not
+            applied to its clients.
+        send_receive_timeout: Client socket timeout in seconds.
+        timings: Records count, latency and size of every query sent by the client.
+
+    """
+    if client_factory is not None:
+        client = client_factory(database_url)
+    else:
+        client = Client.from_url(database_url)
+        client.connection.send_receive_timeout = send_receive_timeout
+    if timings is not None:
+        return cast(Client, InstrumentedClient(client, timings))
+    return client
+
 
+def _get_db_name(database_url: str) -> str:
+    db_name: str = database_url.rsplit("/", 1)[-1]
+    if "?" in db_name:
+        db_name = db_name[: db_name.find("?")]
+    return db_name
 
-def create_migration_file(migrations_dir: str = DEFAULT_MIGRATIONS_DIR, name: str = "") -> str:
-    """Create a new migration file from template. Returns the filepath."""
-    if not name:
-        logger.warning("Migration name is recommended: py-clickhouse-migrator new <name>")
 
-    filename = make_migration_filename(name)
-    filepath = os.path.join(migrations_dir, filename)
+def _list_sql_migration_filenames(migrations_dir: str) -> list[str]:
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(MIGRATION_TEMPLATE)
+        return sorted(file for file in os.listdir(migrations_dir) if file.endswith(".sql"))
     except FileNotFoundError:
         raise MigrationDirectoryNotFoundError(
-            f"Migration directory {migrations_dir} not found.\nMake sure you run 'init' first."
+            f"Migration directory {migrations_dir} not found.\n"
+            "Run 'migrator init' first or specify a migrations directory with the --path flag or "
+            "the CLICKHOUSE_MIGRATE_DIR environment variable."
         ) from None
 
-    logger.info("Migration %s has been created.", filepath)
-    return filepath
+
+class MigrationFiles:
+    """Migration files of one directory, listed and read once.
+
+    Shared between migrators that apply the same migrations to several databases. A ``Migrator`` without
+    ``files`` re-reads the directory on every call instead.
+
+    Args:
+        migrations_dir: Directory containing ``.sql`` migration files.
+
+    """
+
+    def __init__(self, migrations_dir: str = DEFAULT_MIGRATIONS_DIR) -> None:
+        self.migrations_dir: str = migrations_dir
+        self._lock = threading.Lock()
+        self._names: list[str] | None = None
+        self._migrations: dict[str, Migration] = {}
+
+    def list_names(self) -> list[str]:
+        with self._lock:
+            if self._names is None:
+                self._names = _list_sql_migration_filenames(self.migrations_dir)
+            return list(self._names)
+
+    def load(self, filename: str) -> Migration:
+        with self._lock:
+            migration = self._migrations.get(filename)
+            if migration is None:
+                migration = _load_migration(self.migrations_dir, filename)
+                self._migrations[filename] = migration
+            return migration
 
 
 class Migrator(object):
     """ClickHouse schema migration manager.
 
+    Set ``lock`` to the ``MigrationLock`` held while migrating to stop before the next statement or partition
+    chunk once its heartbeat loses the lock.
+
     Args:
         cluster: ClickHouse cluster name for replicated operations.
         connect_retries: Number of connection retry attempts on startup.
         connect_retries_interval: Seconds between connection retries.
+        use_cache: Cache checksums of applied migration files in the migrations directory.
+        jobs: Number of workers for checksum validation (processes) and preflight validation (connections).
+        wait_mutations: Wait for mutations spawned by ``ALTER TABLE`` statements before running the next statement.
+        mutation_timeout: Seconds to wait for the mutations of one statement.
+        cache: Cache instance to use instead of opening one in ``migrations_dir``; lets several migrators share it.
+        files: Migration files read once and shared between migrators. The directory is re-read on each call
+            when not set.
+        client_factory: Opens the connections instead of ``Client.from_url``, e.g. to run against an in-memory
+            stand-in server. ``send_receive_timeout`` is not applied to clients it returns.
+        timings: Records count, latency and size of every query sent by this migrator's clients.
+        record_stats: Store duration and ``system.query_log`` counters of applied migrations in
+            ``db_migrations_stats``. Costs a ``SYSTEM FLUSH LOGS``, a ``system.query_log`` read and an insert at
+            the end of each ``up`` that applies migrations.
+        progress_interval: Log rows and bytes processed, rate and ETA of running migration statements every this
+            many seconds; 0 disables it.
+        statement_timeout: Seconds a single migration statement may run before it is cancelled; 0 means no
+            limit. Unlike ``send_receive_timeout`` it is not reset by progress packets.
+        throttle: Server load limits; before each statement and partition chunk the migrator waits while
+            ``system.metrics``, ``system.merges`` or ``system.mutations`` report more load than allowed.
+        parallel: Number of migrations ``up`` applies at once, each on its own connection. Above 1, a migration
+            starts once the migrations it depends on are applied; see ``plan_migrations``.
 
     """
 
@@ -158,6 +396,19 @@ class Migrator(object):
         connect_retries: int = 0,
         connect_retries_interval: int = 1,
         send_receive_timeout: int = 600,
+        use_cache: bool = True,
+        jobs: int = 1,
+        wait_mutations: bool = False,
+        mutation_timeout: int = 3600,
+        cache: MigrationCache | None = None,
+        files: MigrationFiles | None = None,
+        client_factory: ClientFactory | None = None,
+        timings: QueryTimings | None = None,
+        record_stats: bool = False,
+        progress_interval: float = 0,
+        statement_timeout: float = 0,
+        throttle: ThrottleConfig | None = None,
+        parallel: int = 1,
     ) -> None:
         if not database_url:
             raise MissingDatabaseUrlError(
@@ -171,11 +422,56 @@ class Migrator(object):
         self._connect_retries: int = connect_retries
         self._connect_retries_interval: int = connect_retries_interval
         self._settings: ClickHouseSettings = _CLUSTER_SETTINGS.copy() if self.cluster else {}
-        self.ch_client: Client = Client.from_url(database_url)
-        self.ch_client.connection.send_receive_timeout = send_receive_timeout
+        self.jobs: int = jobs
+        self._server_version: str | None = None
+        if cache is None and use_cache:
+            cache = MigrationCache(os.path.join(migrations_dir, CACHE_FILENAME))
+        self._cache: MigrationCache | None = cache
+        self._files: MigrationFiles | None = files
+        self._send_receive_timeout: int = send_receive_timeout
+        self._client_factory: ClientFactory | None = client_factory
+        self.timings: QueryTimings | None = timings
+        self.record_stats: bool = record_stats
+        self.ch_client: Client = self.create_client()
+        self._mutation_waiter: MutationWaiter | None = (
+            MutationWaiter(self.ch_client, timeout=mutation_timeout, cluster=cluster, settings=self._settings)
+            if wait_mutations
+            else None
+        )
+        self._progress_interval: float = progress_interval
+        self._statement_timeout: float = statement_timeout
+        self.parallel: int = parallel
+        self.lock: MigrationLock | None = None
+        # Parallel migrations check the load from their worker threads while ch_client records finished ones.
+        self._throttle_client: Client | None = self.create_client() if throttle is not None and parallel > 1 else None
+        self._throttle: LoadThrottle | None = (
+            LoadThrottle(self._throttle_client or self.ch_client, throttle, settings=self._settings)
+            if throttle is not None
+            else None
+        )
         self.health_check()
         self.check_migrations_table()
 
+    def create_client(self, database_url: str = "") -> Client:
+        """Open a new ClickHouse client with the migrator's connection settings.
+
+        Args:
+            database_url: Database to connect to; this migrator's database when empty.
+
+        """
+        return create_client(
+            database_url or self.database_url,
+            client_factory=self._client_factory,
+            send_receive_timeout=self._send_receive_timeout,
+            timings=self.timings,
+        )
+
+    def close(self) -> None:
+        """Disconnect ``ch_client`` and the connection the load throttle of a parallel ``up`` polls with."""
+        self.ch_client.disconnect()
+        if self._throttle_client is not None:
+            self._throttle_client.disconnect()
+
     def check_migrations_table(self) -> None:
         on_cluster = f"ON CLUSTER {self.cluster}" if self.cluster else ""
         engine = (
@@ -195,6 +491,66 @@ class Migrator(object):
         """
         self.ch_client.execute(migrator_table, settings=self._settings)
 
+    def check_progress_table(self) -> None:
+        on_cluster = f"ON CLUSTER {self.cluster}" if self.cluster else ""
+        engine = (
+            "ReplicatedMergeTree('/clickhouse/tables/{uuid}/{shard}', '{replica}')" if self.cluster else "MergeTree()"
+        )
+        progress_table: SQL = f"""
+        CREATE TABLE IF NOT EXISTS {_PROGRESS_TABLE} {on_cluster} (
+            name String,
+            statement_index UInt32,
+            checksum String,
+            dt DateTime64 DEFAULT now()
+        )
+        Engine {engine}
+        ORDER BY (name, statement_index)
+        """
+        self.ch_client.execute(progress_table, settings=self._settings)
+
+    def check_chunks_table(self) -> None:
+        on_cluster = f"ON CLUSTER {self.cluster}" if self.cluster else ""
+        engine = (
+            "ReplicatedMergeTree('/clickhouse/tables/{uuid}/{shard}', '{replica}')" if self.cluster else "MergeTree()"
+        )
+        chunks_table: SQL = f"""
+        CREATE TABLE IF NOT EXISTS {_CHUNKS_TABLE} {on_cluster} (
+            name String,
+            statement_index UInt32,
+            checksum String,
+            partition_id String,
+            dt DateTime64 DEFAULT now()
+        )
+        Engine {engine}
+        ORDER BY (name, statement_index, partition_id)
+        """
+        self.ch_client.execute(chunks_table, settings=self._settings)
+
+    def check_stats_table(self) -> None:
+        on_cluster = f"ON CLUSTER {self.cluster}" if self.cluster else ""
+        engine = (
+            "ReplicatedMergeTree('/clickhouse/tables/{uuid}/{shard}', '{replica}')" if self.cluster else "MergeTree()"
+        )
+        stats_table: SQL = f"""
+        CREATE TABLE IF NOT EXISTS {_STATS_TABLE} {on_cluster} (
+            name String,
+            started_at DateTime64(3),
+            duration_ms UInt64,
+            resumed_from UInt32,
+            statement_query_ids Array(String),
+            statement_duration_ms Array(UInt64),
+            read_rows UInt64,
+            read_bytes UInt64,
+            written_rows UInt64,
+            written_bytes UInt64,
+            peak_memory_usage UInt64,
+            dt DateTime64 DEFAULT now()
+        )
+        Engine {engine}
+        ORDER BY (name, started_at)
+        """
+        self.ch_client.execute(stats_table, settings=self._settings)
+
     def health_check(self) -> None:
         for attempt in range(self._connect_retries + 1):
             try:
@@ -219,13 +575,10 @@ class Migrator(object):
                 time.sleep(self._connect_retries_interval)
 
     def get_db_name(self) -> str:
-        db_name: str = self.database_url.rsplit("/", 1)[-1]
-        if "?" in db_name:
-            db_name = db_name[: db_name.find("?")]
-        return db_name
+        return _get_db_name(self.database_url)
 
-    def check_integrity(self, allow_dirty: bool = False) -> None:
-        mismatches = self.validate_checksums()
+    def check_integrity(self, allow_dirty: bool = False, ledger: LedgerSnapshot | None = None) -> None:
+        mismatches = self.validate_checksums(ledger=ledger)
         if not mismatches:
             return
         if allow_dirty:
@@ -240,7 +593,9 @@ class Migrator(object):
             "Run 'migrator repair' to update checksums, or use --allow-dirty to skip this check."
         )
 
-    def up(self, n: int | None = None, dry_run: bool = False, allow_dirty: bool = False, validate: bool = True) -> None:
+    def up(
+        self, n: int | None = None, dry_run: bool = False, allow_dirty: bool = False, validate: bool = True
+    ) -> list[str]:
         """Apply pending migrations.
 
         Args:
@@ -249,32 +604,215 @@ class Migrator(object):
             allow_dirty: Skip checksum validation for modified files.
             validate: Run preflight validation before apply or dry-run output.
 
+        Returns:
+            Names of the applied migrations; empty for a dry run.
+
         """
-        self.check_integrity(allow_dirty=allow_dirty)
-        migrations: list[Migration] = self.get_migrations_for_apply(n)
+        ledger = self.load_ledger()
+        self.check_integrity(allow_dirty=allow_dirty, ledger=ledger)
+        migrations: list[Migration] = self.get_migrations_for_apply(n, ledger=ledger)
         if not migrations:
             logger.info("There are no migrations to apply.")
+        snapshots = [migration for migration in migrations if migration.is_baseline]
+        if snapshots:
+            migrations = [migration for migration in migrations if not migration.is_baseline]
         if validate:
             self.validate_migrations(migrations, direction=MigrationDirection.UP)
-        for i, migration in enumerate(migrations):
+        plan: dict[str, tuple[str, ...]] = {}
+        if len(migrations) > 1 and self.parallel > 1:
+            plan = self.plan_migrations(migrations)
+        applied: list[str] = []
+        progress: dict[str, dict[int, str]] = {}
+        runs: list[_MigrationRun] = []
+        if migrations and not dry_run:
+            self.check_progress_table()
+            if any(migration.up_chunks for migration in migrations):
+                self.check_chunks_table()
+            if self.record_stats:
+                self.check_stats_table()
+            progress = self.load_statement_progress()
+        for snapshot in snapshots:
             if dry_run:
-                if i > 0:
-                    click.echo("")
-                click.echo(click.style(f"-- {migration.name} (up)", fg="cyan", bold=True))
-                click.echo(migration.up.strip())
+                click.echo(
+                    click.style(f"-- {snapshot.name} (recorded as applied, replaces applied migrations)", fg="cyan")
+                )
                 continue
-            checksum = compute_checksum_from_statements(
-                migration.up_statements,
-                migration.rollback_statements,
+            self.save_baselined_migrations([snapshot.name])
+            applied.append(snapshot.name)
+            logger.info(
+                "%s replaces migrations that are already applied, recorded without running it [✔]", snapshot.name
             )
-            self.apply_migration(migration.up_statements)
-            self.save_applied_migration(
-                name=migration.name,
-                up=migration.up,
-                rollback=migration.rollback,
-                checksum=checksum,
+        try:
+            if plan and not dry_run:
+                applied += self._up_parallel(migrations, plan, progress, runs)
+                return applied
+            for i, migration in enumerate(migrations):
+                if dry_run:
+                    if i > 0:
+                        click.echo("")
+                    after = f", after {', '.join(plan[migration.name])}" if plan.get(migration.name) else ""
+                    click.echo(click.style(f"-- {migration.name} (up{after})", fg="cyan", bold=True))
+                    click.echo(migration.up.strip())
+                    continue
+                completed = progress.get(migration.name, {})
+                run = self._apply_up(migration, completed)
+                self._record_applied(migration, run, completed)
+                runs.append(run)
+                applied.append(migration.name)
+        finally:
+            if runs and self.record_stats:
+                self._save_migration_stats(runs)
+        return applied
+
+    def plan_migrations(self, migrations: list[Migration]) -> dict[str, tuple[str, ...]]:
+        """Return, for each pending migration, the pending migrations it waits for in a parallel ``up``.
+
+        Dependencies come from ``-- migrator:depends`` lines and from the tables, views and dictionaries the
+        statements touch; see ``py_clickhouse_migrator.dependencies.plan_dependencies``.
+
+        Raises:
+            InvalidMigrationError: A migration file cannot be read or depends on an unknown or later migration.
+
+        """
+        nodes = [
+            MigrationNode(migration.name, migration.up_statements, self._load_header(migration.name).depends)
+            for migration in migrations
+        ]
+        plan = plan_dependencies(nodes, known=set(self._get_sql_migration_filenames()))
+        for name, waits in plan.items():
+            if waits:
+                logger.debug("%s waits for %s.", name, ", ".join(waits))
+        return plan
+
+    def _load_header(self, name: str) -> MigrationHeader:
+        try:
+            return load_migration_header(os.path.join(self.migrations_dir, name))
+        except MigrationParseError as exc:
+            raise InvalidMigrationError(str(exc)) from exc
+
+    def squashed_names(self) -> set[str]:
+        """Return the migrations replaced by the snapshot files in the migrations directory."""
+        return {
+            name for filename in self._get_sql_migration_filenames() for name in self._load_header(filename).squashes
+        }
+
+    def _apply_up(self, migration: Migration, completed: dict[int, str], client: Client | None = None) -> _MigrationRun:
+        start = self._get_resume_index(migration, completed)
+        started_at = dt.datetime.now(dt.UTC).replace(tzinfo=None)
+        started = time.monotonic()
+        statements = self.apply_migration(
+            migration.up_statements, name=migration.name, start=start, chunks=migration.up_chunks, client=client
+        )
+        duration_ms = round((time.monotonic() - started) * 1000)
+        return _MigrationRun(migration.name, started_at, duration_ms, start, statements)
+
+    def _record_applied(self, migration: Migration, run: _MigrationRun, completed: dict[int, str]) -> None:
+        """Record an applied migration in the ledger and drop its resume checkpoints."""
+        checksum = compute_checksum_from_statements(
+            migration.up_statements,
+            migration.rollback_statements,
+        )
+        self.save_applied_migration(
+            name=migration.name,
+            up=migration.up,
+            rollback=migration.rollback,
+            checksum=checksum,
+        )
+        if completed or len(migration.up_statements) - run.resumed_from > 1:
+            self.clear_statement_progress(migration.name)
+        if migration.up_chunks:
+            self.clear_chunk_progress(migration.name)
+        logger.info("%s applied [✔]", migration.name)
+
+    def _up_parallel(
+        self,
+        migrations: list[Migration],
+        plan: dict[str, tuple[str, ...]],
+        progress: dict[str, dict[int, str]],
+        runs: list[_MigrationRun],
+    ) -> list[str]:
+        """Apply ``migrations`` on up to ``parallel`` connections, each once the migrations in its ``plan`` are done.
+
+        Finished migrations are recorded in ``db_migrations`` in file order: one that finishes early waits until
+        all migrations before it are recorded. The first failure stops starting new migrations; the running ones
+        finish, the finished ones are recorded (in file order, after the gap), and the failure is raised.
+
+        Returns:
+            Names of the applied migrations, in file order.
+
+        """
+        logger.info("Applying %d migrations, up to %d at a time.", len(migrations), self.parallel)
+        local = threading.local()
+        clients: list[Client] = []
+
+        def apply(migration: Migration) -> _MigrationRun:
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = self.create_client()
+                clients.append(client)
+            return self._apply_up(migration, progress.get(migration.name, {}), client=client)
+
+        waiting = list(migrations)
+        running: dict[Future[_MigrationRun], Migration] = {}
+        finished: dict[str, _MigrationRun] = {}
+        error: Exception | None = None
+        recorded = 0
+        applied: list[str] = []
+
+        def record(migration: Migration) -> None:
+            run = finished[migration.name]
+            self._record_applied(migration, run, progress.get(migration.name, {}))
+            runs.append(run)
+            applied.append(migration.name)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+                while True:
+                    if error is None:
+                        for migration in [m for m in waiting if all(name in finished for name in plan[m.name])]:
+                            waiting.remove(migration)
+                            running[executor.submit(apply, migration)] = migration
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        migration = running.pop(future)
+                        try:
+                            finished[migration.name] = future.result()
+                        except Exception as exc:
+                            if error is not None:
+                                logger.error("%s failed: %s", migration.name, exc)
+                            error = error or exc
+                    while recorded < len(migrations) and migrations[recorded].name in finished:
+                        record(migrations[recorded])
+                        recorded += 1
+        finally:
+            for client in clients:
+                client.disconnect()
+        if error is not None:
+            for migration in migrations[recorded:]:
+                if migration.name in finished:
+                    record(migration)
+            if waiting:
+                logger.warning("Not started after the failure: %s.", ", ".join(m.name for m in waiting))
+            raise error
+        return applied
+
+    def _get_resume_index(self, migration: Migration, completed: dict[int, str]) -> int:
+        """Return the index of the first statement without a matching progress checkpoint."""
+        statements = migration.up_statements
+        start = 0
+        while start < len(statements) and completed.get(start) == compute_statement_checksum(statements[start]):
+            start += 1
+        if len(completed) > start:
+            logger.warning(
+                "Progress of %s does not match the current file after statement %d, resuming from there.",
+                migration.name,
+                start,
             )
-            logger.info("%s applied [✔]", migration.name)
+        if start:
+            logger.info("Resuming %s from statement %d/%d.", migration.name, start + 1, len(statements))
+        return start
 
     def rollback(self, number: int = 1, dry_run: bool = False, validate: bool = True) -> None:
         """Rollback applied migrations in reverse order."""
@@ -288,66 +826,468 @@ class Migrator(object):
                 click.echo(click.style(f"-- {migration.name} (rollback)", fg="yellow", bold=True))
                 click.echo(migration.rollback.strip())
                 continue
-            self.apply_migration(migration.rollback_statements)
+            self.apply_migration(migration.rollback_statements, chunks=migration.rollback_chunks)
             self.delete_migration(name=migration.name)
             logger.info("%s rolled back [✔].", migration.name)
 
-    def apply_migration(self, queries: list[SQL]) -> None:
-        for query in queries:
+    def apply_migration(
+        self,
+        queries: list[SQL],
+        name: str = "",
+        start: int = 0,
+        chunks: dict[int, ChunkSpec] | None = None,
+        client: Client | None = None,
+    ) -> list[StatementRun]:
+        """Execute queries in order, starting from ``start``.
+
+        When ``name`` is given, every completed query except the last one is checkpointed in the progress table,
+        so a failed migration resumes from the first unfinished statement on the next run, and each query is
+        tagged with a ``query_id`` so its server-side stats can be found in ``system.query_log``.
+        With ``wait_mutations`` enabled, the mutations a query spawns must finish before the next query runs.
+        With ``progress_interval`` or ``statement_timeout`` set, queries run through a ``StatementMonitor``.
+        With ``throttle`` set, each query waits until the server load is within the limits.
+        With ``lock`` set, ``LockLostError`` is raised before the first query after the lock was lost.
+
+        Args:
+            queries: Statements to execute.
+            name: Migration name used for checkpoints; nothing is checkpointed when empty.
+            start: Index of the first statement to execute.
+            chunks: Chunk options by statement index; these statements run once per partition.
+            client: Client to run the queries, checkpoints and mutation waits with instead of ``ch_client``.
+
+        Returns:
+            ``query_id`` and duration of each executed query, including the mutation wait.
+
+        """
+        executed: list[StatementRun] = []
+        for index in range(start, len(queries)):
+            query = queries[index]
+            label = f"{name} statement {index + 1}/{len(queries)}" if name else f"statement {index + 1}/{len(queries)}"
+            spec = (chunks or {}).get(index)
+            if self.lock is not None:
+                self.lock.check()
+            if self._throttle is not None and spec is None:
+                self._throttle.wait(label)
+            waiter = self._mutation_waiter
+            target = find_mutation_target(query, default_db=self.get_db_name()) if waiter is not None else None
+            # Mutations already running on the table were started by someone else and are not waited for.
+            earlier = waiter.pending_ids(target, client=client) if waiter is not None and target is not None else ()
+            started = time.monotonic()
+            query_id = f"migrator-{uuid4().hex}" if name or waiter is not None else ""
+            chunk_query_ids: tuple[str, ...] = ()
+            if spec is not None:
+                chunk_query_ids = self._apply_chunked_statement(query, spec, name, index, query_id, label, client)
+            elif not query_id:
+                self._execute_statement(query, label=label, client=client)
+            else:
+                self._execute_statement(query, query_id=query_id, label=label, client=client)
+            if waiter is not None and target is not None:
+                waiter.wait(target, query_id=query_id, client=client, ignore=earlier)
+            executed.append(StatementRun(query_id, round((time.monotonic() - started) * 1000), chunk_query_ids))
+            if name and index < len(queries) - 1:
+                self.save_statement_progress(name=name, index=index, statement=query, client=client)
+        return executed
+
+    def _execute_statement(
+        self, query: SQL, query_id: str | None = None, label: str = "", client: Client | None = None
+    ) -> None:
+        client = client or self.ch_client
+        try:
+            if self._progress_interval or self._statement_timeout:
+                monitor = StatementMonitor(
+                    client, report_interval=self._progress_interval, timeout=self._statement_timeout
+                )
+                monitor.execute(query, query_id=query_id or "", label=label)
+            elif query_id is None:
+                client.execute(query)
+            else:
+                client.execute(query, query_id=query_id)
+        except ServerException as exc:
+            raise InvalidMigrationError(f"Query {query} raise error: {exc}") from exc
+
+    def _apply_chunked_statement(
+        self,
+        query: SQL,
+        spec: ChunkSpec,
+        name: str,
+        index: int,
+        query_id: str,
+        label: str,
+        client: Client | None = None,
+    ) -> tuple[str, ...]:
+        """Run ``query`` once per partition of the chunk table, ``spec.jobs`` partitions at a time.
+
+        With a migration ``name``, every finished partition is checkpointed in ``db_migrations_chunks``, so a
+        failed statement only re-runs the partitions that did not finish. The first failure stops scheduling
+        new partitions and is raised once the running ones are done.
+
+        Returns:
+            ``query_id`` of each executed partition query.
+
+        """
+        main_client = client or self.ch_client
+        partitions = list_partitions(
+            main_client, spec, default_db=self.get_db_name(), cluster=self.cluster, settings=self._settings
+        )
+        checksum = compute_statement_checksum(query)
+        done = self.load_chunk_progress(name, index, checksum, client=main_client) if name else set()
+        pending = [partition for partition in partitions if partition.partition_id not in done]
+        if done:
+            logger.info("%s: %d/%d partition(s) already done.", label, len(partitions) - len(pending), len(partitions))
+        if not partitions:
+            logger.warning("%s: %s has no partitions, nothing to run.", label, spec.table)
+        failed = threading.Event()
+        local = threading.local()
+        clients: list[Client] = []
+        workers = min(spec.jobs, len(pending))
+
+        def run(partition: Partition) -> str:
+            if failed.is_set():
+                return ""
+            client = main_client
+            if workers > 1:
+                client = getattr(local, "client", None)
+                if client is None:
+                    client = local.client = self.create_client()
+                    clients.append(client)
+            chunk_query_id = f"{query_id}-{partition.partition_id}" if query_id else ""
+            chunk_label = f"{label} partition {partition.partition_id}"
             try:
-                self.ch_client.execute(query)
-            except ServerException as exc:
-                raise InvalidMigrationError(f"Query {query} raise error: {exc}") from exc
+                if self.lock is not None:
+                    self.lock.check()
+                if self._throttle is not None:
+                    self._throttle.wait(chunk_label)
+                self._execute_statement(
+                    render_chunk(query, partition), query_id=chunk_query_id or None, label=chunk_label, client=client
+                )
+            except Exception:
+                failed.set()
+                raise
+            if name:
+                self.save_chunk_progress(name, index, checksum, partition.partition_id, client=client)
+            logger.debug("%s: partition %s done.", label, partition.partition_id)
+            return chunk_query_id
+
+        try:
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(run, partition) for partition in pending]
+                results = [future.result() for future in futures]
+            else:
+                results = [run(partition) for partition in pending]
+        finally:
+            for client in clients:
+                client.disconnect()
+        if pending:
+            logger.info("%s: %d partition(s) done.", label, len(pending))
+        return tuple(result for result in results if result)
+
+    def load_statement_progress(self) -> dict[str, dict[int, str]]:
+        """Return checkpointed statement checksums by migration name and statement index."""
+        progress: dict[str, dict[int, str]] = {}
+        for name, index, checksum in self.ch_client.execute(
+            f"SELECT name, statement_index, checksum FROM {_PROGRESS_TABLE}",
+            settings=self._settings,
+        ):
+            progress.setdefault(name, {})[index] = checksum
+        return progress
+
+    def save_statement_progress(self, name: str, index: int, statement: SQL, client: Client | None = None) -> None:
+        (client or self.ch_client).execute(
+            f"INSERT INTO {_PROGRESS_TABLE} (name, statement_index, checksum) VALUES",
+            [[name, index, compute_statement_checksum(statement)]],
+            settings=self._settings,
+        )
+
+    def clear_statement_progress(self, name: str) -> None:
+        settings: ClickHouseSettings = {**self._settings, "mutations_sync": "1"}
+        self.ch_client.execute(
+            f"DELETE FROM {_PROGRESS_TABLE} WHERE name = %(name)s",
+            {"name": name},
+            settings=settings,
+        )
+
+    def load_chunk_progress(self, name: str, index: int, checksum: str, client: Client | None = None) -> set[str]:
+        """Return the partition ids already done for one chunked statement with the given checksum."""
+        rows = (client or self.ch_client).execute(
+            f"""
+            SELECT partition_id FROM {_CHUNKS_TABLE}
+            WHERE name = %(name)s AND statement_index = %(index)s AND checksum = %(checksum)s
+            """,
+            {"name": name, "index": index, "checksum": checksum},
+            settings=self._settings,
+        )
+        return {row[0] for row in rows}
 
-    def validate_statements(self, statements: list[SQL]) -> None:
+    def save_chunk_progress(
+        self, name: str, index: int, checksum: str, partition_id: str, client: Client | None = None
+    ) -> None:
+        (client or self.ch_client).execute(
+            f"INSERT INTO {_CHUNKS_TABLE} (name, statement_index, checksum, partition_id) VALUES",
+            [[name, index, checksum, partition_id]],
+            settings=self._settings,
+        )
+
+    def clear_chunk_progress(self, name: str) -> None:
+        settings: ClickHouseSettings = {**self._settings, "mutations_sync": "1"}
+        self.ch_client.execute(
+            f"DELETE FROM {_CHUNKS_TABLE} WHERE name = %(name)s",
+            {"name": name},
+            settings=settings,
+        )
+
+    def _save_migration_stats(self, runs: list[_MigrationRun]) -> None:
+        # Stats are informational: failing to record them must not fail or mask the outcome of the migration run.
+        try:
+            metrics = self._load_query_log_metrics(
+                [
+                    query_id
+                    for run in runs
+                    for stmt in run.statements
+                    for query_id in (stmt.query_id, *stmt.chunk_query_ids)
+                ]
+            )
+            rows = []
+            for run in runs:
+                found = [
+                    metrics[query_id]
+                    for stmt in run.statements
+                    for query_id in (stmt.query_id, *stmt.chunk_query_ids)
+                    if query_id in metrics
+                ]
+                rows.append(
+                    [
+                        run.name,
+                        run.started_at,
+                        run.duration_ms,
+                        run.resumed_from,
+                        [stmt.query_id for stmt in run.statements],
+                        [stmt.duration_ms for stmt in run.statements],
+                        sum(item.read_rows for item in found),
+                        sum(item.read_bytes for item in found),
+                        sum(item.written_rows for item in found),
+                        sum(item.written_bytes for item in found),
+                        max((item.memory_usage for item in found), default=0),
+                    ]
+                )
+            self.ch_client.execute(
+                f"""
+                INSERT INTO {_STATS_TABLE} (
+                    name, started_at, duration_ms, resumed_from, statement_query_ids, statement_duration_ms,
+                    read_rows, read_bytes, written_rows, written_bytes, peak_memory_usage
+                ) VALUES
+                """,
+                rows,
+                settings=self._settings,
+            )
+        except Exception as exc:
+            logger.warning("Could not record migration stats: %s", exc)
+
+    def _load_query_log_metrics(self, query_ids: list[str]) -> dict[str, _QueryMetrics]:
+        if not query_ids:
+            return {}
+        try:
+            # The query log is flushed every few seconds; flushing needs the SYSTEM FLUSH LOGS grant.
+            self.ch_client.execute("SYSTEM FLUSH LOGS")
+        except ServerException as exc:
+            logger.debug("Cannot flush system logs: %s", exc)
+        try:
+            rows = self.ch_client.execute(
+                """
+                SELECT query_id, read_rows, read_bytes, written_rows, written_bytes, memory_usage
+                FROM system.query_log
+                WHERE event_date >= yesterday() AND type = 'QueryFinish' AND query_id IN %(query_ids)s
+                """,
+                {"query_ids": tuple(query_ids)},
+            )
+        except ServerException as exc:
+            if exc.code == _UNKNOWN_TABLE_CODE:
+                logger.debug("system.query_log does not exist, recording durations only")
+            else:
+                logger.warning("Cannot read system.query_log, recording durations only: %s", exc)
+            return {}
+        return {row[0]: _QueryMetrics(*row[1:]) for row in rows}
+
+    def get_migration_stats(self, limit: int | None = 10, ledger: LedgerSnapshot | None = None) -> list[MigrationStats]:
+        """Return stats of the latest apply of each currently applied migration, slowest first.
+
+        Args:
+            limit: Maximum number of migrations to return. All if None.
+            ledger: Ledger snapshot used to skip rolled back migrations. Read from ClickHouse if None.
+
+        """
+        try:
+            rows = self.ch_client.execute(
+                f"""
+                SELECT
+                    name, started_at, duration_ms, resumed_from, statement_duration_ms,
+                    read_rows, read_bytes, written_rows, written_bytes, peak_memory_usage
+                FROM {_STATS_TABLE}
+                ORDER BY started_at DESC
+                LIMIT 1 BY name
+                """,
+                settings=self._settings,
+            )
+        except ServerException as exc:
+            if exc.code == _UNKNOWN_TABLE_CODE:
+                return []
+            raise
+        applied = set(self.get_applied_migrations_names(ledger=ledger))
+        stats = sorted(
+            (MigrationStats(row[0], row[1], row[2], row[3], list(row[4]), *row[5:]) for row in rows),
+            key=lambda item: item.duration_ms,
+            reverse=True,
+        )
+        stats = [item for item in stats if item.name in applied]
+        return stats[:limit] if limit is not None else stats
+
+    def get_server_version(self) -> str:
+        if self._server_version is None:
+            self._server_version = str(self.ch_client.execute("SELECT version()")[0][0])
+        return self._server_version
+
+    def validate_statements(self, statements: list[SQL], client: Client | None = None) -> None:
+        """Validate statements with ``EXPLAIN AST``, reporting every statement that fails.
+
+        Statements that already passed validation on the same server version are skipped when the cache is enabled.
+        """
+        client = client or self.ch_client
+        cache = self._cache
+        errors: list[str] = []
+        first_exc: ServerException | None = None
         for stmt in statements:
+            validation_key = ""
+            if cache is not None:
+                validation_key = f"{self.get_server_version()}:{compute_statement_checksum(stmt)}"
+                if cache.is_validated(validation_key):
+                    logger.debug("Skipping previously validated statement: %s", stmt[:80])
+                    continue
             try:
-                self.ch_client.execute(f"EXPLAIN AST {stmt}", settings=self._settings)
+                client.execute(f"EXPLAIN AST {stmt}", settings=self._settings)
             except ServerException as exc:
-                raise InvalidStatementError(f"Query:\n{stmt[:500]}\n\nClickHouse error:\n{exc}") from exc
+                errors.append(f"Query:\n{stmt[:500]}\n\nClickHouse error:\n{exc}")
+                first_exc = first_exc or exc
+                continue
+            if cache is not None:
+                cache.set_validated(validation_key)
+        if errors:
+            raise InvalidStatementError("\n\n".join(errors)) from first_exc
 
     def validate_migrations(self, migrations: list[Migration], direction: MigrationDirection) -> None:
-        for migration in migrations:
-            statements = (
-                migration.up_statements if direction is MigrationDirection.UP else migration.rollback_statements
-            )
+        """Validate all migrations before anything is executed.
+
+        With ``jobs > 1`` statements are validated concurrently, each worker thread using its own connection, so a
+        single migration with many statements is spread over the workers too. All failures are reported together
+        in a single ``InvalidMigrationError``, grouped by migration in file order.
+        """
+        if self._cache is not None and migrations:
+            self.get_server_version()
+        pairs = [
+            (migration.name, statement)
+            for migration in migrations
+            for statement in self._validation_statements(migration, direction)
+        ]
+        workers = min(self.jobs, len(pairs))
+        if workers > 1:
+            local = threading.local()
+            clients: list[Client] = []
+
+            def validate(pair: tuple[str, SQL]) -> str:
+                client = getattr(local, "client", None)
+                if client is None:
+                    client = local.client = self.create_client()
+                    clients.append(client)
+                return self._validate_statement(pair[1], client)
+
             try:
-                self.validate_statements(statements=statements)
-            except InvalidStatementError as exc:
-                raise InvalidMigrationError(f"Validation failed for migration {migration.name}.\n\n{exc}") from exc
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(validate, pairs))
+            finally:
+                for client in clients:
+                    client.disconnect()
+        else:
+            results = [self._validate_statement(statement, self.ch_client) for _, statement in pairs]
+
+        if self._cache is not None:
+            self._cache.save()
+        errors: dict[str, list[str]] = {}
+        for (name, _), error in zip(pairs, results):
+            if error:
+                errors.setdefault(name, []).append(error)
+        if errors:
+            raise InvalidMigrationError(
+                "\n\n".join(
+                    f"Validation failed for migration {name}.\n\n" + "\n\n".join(messages)
+                    for name, messages in errors.items()
+                )
+            )
+
+    @staticmethod
+    def _validation_statements(migration: Migration, direction: MigrationDirection) -> list[SQL]:
+        if direction is MigrationDirection.UP:
+            statements, chunks = migration.up_statements, migration.up_chunks
+        else:
+            statements, chunks = migration.rollback_statements, migration.rollback_chunks
+        # Partition placeholders are not valid SQL; chunked statements are checked with a sample partition.
+        return [
+            render_chunk(stmt, VALIDATION_PARTITION) if index in chunks else stmt
+            for index, stmt in enumerate(statements)
+        ]
 
-    def get_migrations_for_apply(self, number: int | None = None) -> list[Migration]:
-        filenames: list[str] = self.get_unapplied_migration_names()
+    def _validate_statement(self, statement: SQL, client: Client) -> str:
+        try:
+            self.validate_statements(statements=[statement], client=client)
+        except InvalidStatementError as exc:
+            return str(exc)
+        return ""
+
+    def get_migrations_for_apply(
+        self, number: int | None = None, ledger: LedgerSnapshot | None = None
+    ) -> list[Migration]:
+        if ledger is None:
+            ledger = self.load_ledger()
+        filenames: list[str] = self.get_unapplied_migration_names(ledger=ledger)
 
         if number:
             filenames = filenames[:number]
 
-        result: list[Migration] = []
-        for filename in filenames:
-            filepath = f"{self.migrations_dir}/{filename}"
-            try:
-                sections = load_migration_sections(filepath)
-                result.append(
-                    Migration(
-                        name=filename,
-                        up=sections.up,
-                        rollback=sections.rollback,
-                    )
-                )
-            except (MigrationParseError, InvalidMigrationError) as exc:
-                raise InvalidMigrationError(str(exc)) from exc
+        if self._files is not None:
+            migrations = [self._files.load(filename) for filename in filenames]
+        else:
+            migrations = [_load_migration(self.migrations_dir, filename) for filename in filenames]
+        return self._mark_applied_snapshots(migrations, ledger)
+
+    def _mark_applied_snapshots(self, migrations: list[Migration], ledger: LedgerSnapshot) -> list[Migration]:
+        """Turn pending snapshots whose migrations are already applied into baseline entries.
 
-        return result
+        A snapshot written by ``migrator squash`` lists the migrations it replaces, and their files are gone. Where
+        the last of them is applied, the snapshot is recorded without running it. Headers are only read when
+        applied migrations are missing from the directory, so databases that never saw a squash pay nothing.
+
+        Raises:
+            InvalidMigrationError: Only some of the migrations a snapshot replaces are applied.
+
+        """
+        applied = set(ledger.applied_names)
+        if not migrations or applied <= set(self._get_sql_migration_filenames()):
+            return migrations
+        marked: list[Migration] = []
+        for migration in migrations:
+            squashes = self._load_header(migration.name).squashes
+            if squashes and squashes[-1] in applied:
+                migration = replace(migration, kind=MigrationKind.BASELINE)
+            elif applied.intersection(squashes):
+                raise InvalidMigrationError(
+                    f"Snapshot {migration.name} replaces migrations up to {squashes[-1]}, but only some of them are "
+                    "applied here. Apply the rest from the original files before switching to the snapshot."
+                )
+            marked.append(migration)
+        return marked
 
     def _get_sql_migration_filenames(self) -> list[str]:
-        try:
-            return sorted(file for file in os.listdir(self.migrations_dir) if file.endswith(".sql"))
-        except FileNotFoundError:
-            raise MigrationDirectoryNotFoundError(
-                f"Migration directory {self.migrations_dir} not found.\n"
-                "Run 'migrator init' first or specify a migrations directory with the --path flag or "
-                "the CLICKHOUSE_MIGRATE_DIR environment variable."
-            ) from None
+        if self._files is not None:
+            return self._files.list_names()
+        return _list_sql_migration_filenames(self.migrations_dir)
 
     def baseline(self) -> list[str]:
         if self.get_applied_migrations_names():
@@ -357,16 +1297,104 @@ class Migrator(object):
             self.save_baselined_migrations(filenames)
         return filenames
 
-    def get_unapplied_migration_names(self) -> list[str]:
+    def clone_schema(self, source_url: str, dry_run: bool = False) -> SchemaClone:
+        """Create the tables, dictionaries and views of a reference database here and copy its migration ledger.
+
+        Objects are read from ``system.tables`` of the reference database, stripped of its name, and created on up
+        to ``jobs`` connections: tables first, then dictionaries and views, each after the objects it names. The
+        ``db_migrations`` rows are copied with their apply times once all objects exist, so this database ends at
+        the same HEAD without running any migration. Nothing is recorded when an object fails.
+
+        Args:
+            source_url: Url of the reference database.
+            dry_run: Print the statements without executing them or copying the ledger.
+
+        Raises:
+            SchemaCloneError: This database has applied migrations or objects of the reference database, the
+                reference database has no ``db_migrations`` table, or the migrator runs on a cluster.
+
+        """
+        if self.cluster:
+            # The stored CREATE statements run on one replica while the copied ledger rows replicate to all of them.
+            raise SchemaCloneError(
+                "clone-schema does not support --cluster: the objects would be created on one replica only. "
+                "Clone each replica's database without --cluster and ensure replicated tables use {uuid} paths."
+            )
+        if self.get_applied_migrations_names():
+            raise SchemaCloneError("clone-schema requires an empty db_migrations table.")
+        source_db = _get_db_name(source_url)
+        source = self.create_client(source_url)
+        try:
+            try:
+                ledger = source.execute(
+                    "SELECT name, kind, up, rollback, dt, checksum FROM db_migrations ORDER BY dt",
+                    settings=self._settings,
+                )
+            except ServerException as exc:
+                if exc.code != _UNKNOWN_TABLE_CODE:
+                    raise
+                raise SchemaCloneError(f"Database {source_db} has no db_migrations table to copy.") from exc
+            objects = read_schema(source, source_db, settings=self._settings)
+        finally:
+            source.disconnect()
+        existing = {obj.name for obj in read_schema(self.ch_client, self.get_db_name(), settings=self._settings)}
+        clashes = [obj.name for obj in objects if obj.name in existing]
+        if clashes:
+            raise SchemaCloneError(
+                f"Database {self.get_db_name()} already has {len(clashes)} object(s) of {source_db}, starting with "
+                f"{clashes[0]}. Clone into a database without them."
+            )
+        statements = {obj.name: strip_database(obj.create_query, source_db) for obj in objects}
+        names = [row[0] for row in ledger]
+        if dry_run:
+            for i, obj in enumerate(objects):
+                if i:
+                    click.echo("")
+                click.echo(click.style(f"-- {obj.name} ({obj.kind.lower()})", fg="cyan", bold=True))
+                click.echo(statements[obj.name])
+            return SchemaClone([obj.name for obj in objects], names)
+
+        local = threading.local()
+        clients: list[Client] = []
+
+        def create(name: str) -> None:
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = self.create_client()
+                clients.append(client)
+            client.execute(statements[name], settings=self._settings)
+            logger.info("Created %s.", name)
+
+        try:
+            created = run_planned(plan_schema(objects), create, workers=self.jobs)
+        finally:
+            for client in clients:
+                client.disconnect()
+        if ledger:
+            self.ch_client.execute(
+                "INSERT INTO db_migrations (name, kind, up, rollback, dt, checksum) VALUES",
+                [list(row) for row in ledger],
+                settings=self._settings,
+            )
+        return SchemaClone(created, names)
+
+    def get_unapplied_migration_names(self, ledger: LedgerSnapshot | None = None) -> list[str]:
         filenames = self._get_sql_migration_filenames()
-        applied_migrations: list[str] = self.get_applied_migrations_names()
+        applied_migrations: list[str] = self.get_applied_migrations_names(ledger=ledger)
         return sorted(list(set(filenames) - set(applied_migrations)))
 
-    def get_applied_migrations_names(self) -> list[str]:
-        return [
-            row[0]
-            for row in self.ch_client.execute("SELECT name FROM db_migrations ORDER BY dt", settings=self._settings)
-        ]
+    def get_applied_migrations_names(self, ledger: LedgerSnapshot | None = None) -> list[str]:
+        if ledger is None:
+            ledger = self.load_ledger()
+        return ledger.applied_names
+
+    def load_ledger(self) -> LedgerSnapshot:
+        """Read all ``db_migrations`` rows in one round trip."""
+        rows = self.ch_client.execute(
+            "SELECT name, kind, checksum, dt FROM db_migrations ORDER BY dt",
+            settings=self._settings,
+        )
+        return LedgerSnapshot([LedgerRow(*row) for row in rows])
 
     def get_migrations_for_rollback(self, number: int = 1) -> list[Migration]:
         return [
@@ -404,52 +1432,85 @@ class Migrator(object):
         )
 
     def delete_migration(self, name: str) -> None:
+        """Remove a migration from the ledger with its statement and partition checkpoints.
+
+        Checkpoints left by a run that stopped between recording the migration and clearing them would otherwise
+        make the next apply skip statements that the rollback undid.
+        """
         settings: ClickHouseSettings = {**self._settings, "mutations_sync": "1"}
         self.ch_client.execute(
             "DELETE FROM db_migrations WHERE name = %(name)s",
             {"name": name},
             settings=settings,
         )
+        for clear in (self.clear_statement_progress, self.clear_chunk_progress):
+            try:
+                clear(name)
+            except ServerException as exc:
+                if exc.code != _UNKNOWN_TABLE_CODE:
+                    raise
+
+    def validate_checksums(self, ledger: LedgerSnapshot | None = None) -> list[ChecksumMismatch]:
+        if ledger is None:
+            ledger = self.load_ledger()
+        stored_checksums = [(name, checksum) for name, checksum in ledger.checksums if checksum]
+        actual_checksums = self._get_file_checksums([name for name, _ in stored_checksums])
+        mismatches: list[ChecksumMismatch] = [
+            ChecksumMismatch(name, stored_checksum, actual_checksums[name])
+            for name, stored_checksum in stored_checksums
+            if actual_checksums[name] != stored_checksum
+        ]
+        if any(not mismatch.actual for mismatch in mismatches):
+            # Files replaced by a snapshot are gone on purpose.
+            squashed = self.squashed_names()
+            mismatches = [mismatch for mismatch in mismatches if mismatch.actual or mismatch.name not in squashed]
+        if self._cache is not None:
+            self._cache.save()
+        return mismatches
 
-    def validate_checksums(self) -> list[ChecksumMismatch]:
-        rows: list[tuple[str, str]] = self.ch_client.execute(
-            """
-            SELECT name, checksum
-            FROM db_migrations
-            WHERE kind = %(kind)s
-            ORDER BY dt
-            """,
-            {"kind": MigrationKind.MIGRATION.value},
-            settings=self._settings,
-        )
-        mismatches: list[ChecksumMismatch] = []
-        for name, stored_checksum in rows:
-            if not stored_checksum:
-                continue
-            filepath = f"{self.migrations_dir}/{name}"
-            if not os.path.exists(filepath):
-                mismatches.append(ChecksumMismatch(name, stored_checksum, ""))
-                continue
+    def _get_file_checksums(self, names: list[str]) -> dict[str, str]:
+        """Return checksums of migration files by name; missing files map to an empty string."""
+        checksums: dict[str, str] = {}
+        signatures: dict[str, FileSignature] = {}
+        for name in names:
             try:
-                sections = load_migration_sections(filepath)
-                migration = Migration(
-                    name=name,
-                    up=sections.up,
-                    rollback=sections.rollback,
-                )
-                actual_checksum = compute_checksum_from_statements(
-                    migration.up_statements,
-                    migration.rollback_statements,
+                signature = get_file_signature(f"{self.migrations_dir}/{name}")
+            except FileNotFoundError:
+                checksums[name] = ""
+                continue
+            cached_checksum = self._cache.get_checksum(name, signature) if self._cache is not None else None
+            if cached_checksum is not None:
+                checksums[name] = cached_checksum
+            else:
+                signatures[name] = signature
+
+        computed_names = list(signatures)
+        filepaths = [f"{self.migrations_dir}/{name}" for name in computed_names]
+        if self.jobs > 1 and len(computed_names) > 1:
+            workers = min(self.jobs, len(computed_names))
+            # Fan-out and parallel up run migrators on threads; forking a multi-threaded process can copy locks
+            # held by other threads (driver sockets, logging) into the workers, so they are spawned instead.
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                computed = list(
+                    executor.map(
+                        _compute_file_checksum,
+                        computed_names,
+                        filepaths,
+                        chunksize=max(1, len(computed_names) // (workers * 4)),
+                    )
                 )
-            except (MigrationParseError, InvalidMigrationError) as exc:
-                raise InvalidMigrationError(str(exc)) from exc
-            if actual_checksum != stored_checksum:
-                mismatches.append(ChecksumMismatch(name, stored_checksum, actual_checksum))
-        return mismatches
+        else:
+            computed = [_compute_file_checksum(name, filepath) for name, filepath in zip(computed_names, filepaths)]
+
+        for name, checksum in zip(computed_names, computed):
+            checksums[name] = checksum
+            if self._cache is not None:
+                self._cache.set_checksum(name, signatures[name], checksum)
+        return checksums
 
-    def repair(self) -> list[str]:
+    def repair(self, ledger: LedgerSnapshot | None = None) -> list[str]:
         """Update stored checksums to match current migration files."""
-        mismatches = self.validate_checksums()
+        mismatches = self.validate_checksums(ledger=ledger)
         if not mismatches:
             logger.info("Nothing to repair.")
             return []
@@ -467,23 +1528,23 @@ class Migrator(object):
             repaired.append(name)
         return repaired
 
-    def show_migrations(self, show_all: bool = False) -> ShowMigrationsResult:
-        """Return formatted migration status and integrity warnings."""
-        applied_names = self.get_applied_migrations_names()[::-1]
-        unapplied_names = self.get_unapplied_migration_names()
+    def show_migrations(self, show_all: bool = False, ledger: LedgerSnapshot | None = None) -> ShowMigrationsResult:
+        """Return formatted migration status and integrity warnings.
+
+        Args:
+            show_all: List all applied and pending migrations instead of the latest five of each.
+            ledger: Ledger snapshot to show, e.g. shared with ``get_migration_stats``. Read from ClickHouse if None.
+
+        """
+        ledger = ledger or self.load_ledger()
+        applied_names = ledger.applied_names[::-1]
+        unapplied_names = self.get_unapplied_migration_names(ledger=ledger)
         total_applied = len(applied_names)
         total_pending = len(unapplied_names)
-        baseline_names = {
-            row[0]
-            for row in self.ch_client.execute(
-                "SELECT name FROM db_migrations WHERE kind = %(kind)s ORDER BY dt",
-                {"kind": MigrationKind.BASELINE.value},
-                settings=self._settings,
-            )
-        }
+        baseline_names = ledger.baseline_names
 
         mismatch_map: dict[str, str] = {}
-        for name, _, actual in self.validate_checksums():
+        for name, _, actual in self.validate_checksums(ledger=ledger):
             mismatch_map[name] = "missing" if not actual else "modified"
 
         lines: list[str] = [click.style("Applied:", bold=True)]
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections.abc import Collection
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+from py_clickhouse_migrator.errors import MutationFailedError, MutationTimeoutError
+
+if TYPE_CHECKING:
+    from clickhouse_driver import Client
+
+logger = logging.getLogger("py_clickhouse_migrator")
+
+ClickHouseSettings = dict[str, str | int]
+
+_IDENTIFIER: Final[str] = r"(?:`[^`]+`|\"[^\"]+\"|[a-zA-Z_][a-zA-Z0-9_]*)"
+_ALTER_TABLE_RE: Final[re.Pattern[str]] = re.compile(
+    rf"\A(?:\s*--[^\n]*\n)*\s*ALTER\s+TABLE\s+(?:(?P<db>{_IDENTIFIER})\.)?(?P<table>{_IDENTIFIER})"
+    rf"(?:\s+ON\s+CLUSTER\s+{_IDENTIFIER})?\s+(?P<commands>.*)\Z",
+    re.IGNORECASE | re.DOTALL,
+)
+# ALTER commands that are executed as background mutations instead of metadata-only changes.
+_MUTATION_COMMAND_RE: Final[re.Pattern[str]] = re.compile(
+    r"\b(?:UPDATE|DELETE\s+(?:IN\s+PARTITION\b.*?\s+)?WHERE|MODIFY\s+(?:COLUMN|TTL|STATISTICS)|MATERIALIZE"
+    r"|DROP\s+(?:COLUMN|INDEX|PROJECTION|STATISTICS)|CLEAR\s+(?:COLUMN|INDEX|PROJECTION)|RENAME\s+COLUMN"
+    r"|APPLY\s+DELETED\s+MASK)\b",
+    re.IGNORECASE | re.DOTALL,
+)
+_POLL_INTERVAL: Final[float] = 1.0
+# ClickHouse retries a failed mutation in the background, so a failure reason is only final once it stays.
+_FAILURE_TIMEOUT: Final[float] = 60.0
+
+
+class MutationTarget(NamedTuple):
+    database: str
+    table: str
+
+
+class _MutationState(NamedTuple):
+    mutation_id: str
+    command: str
+    parts_to_do: int
+    latest_fail_reason: str
+
+
+def _unquote(identifier: str) -> str:
+    if identifier[:1] in ("`", '"'):
+        return identifier[1:-1]
+    return identifier
+
+
+def find_mutation_target(statement: str, default_db: str) -> MutationTarget | None:
+    """Return the table an ``ALTER TABLE`` statement mutates, or None for statements that do not spawn mutations."""
+    match = _ALTER_TABLE_RE.match(statement)
+    if match is None or not _MUTATION_COMMAND_RE.search(match["commands"]):
+        return None
+    database = _unquote(match["db"]) if match["db"] else default_db
+    return MutationTarget(database=database, table=_unquote(match["table"]))
+
+
+class MutationWaiter:
+    """Polls ``system.mutations`` until mutations on a table are done.
+
+    Waiting by polling keeps each query short, so long mutations are not bound by the client
+    ``send_receive_timeout`` the way ``mutations_sync`` is.
+
+    Args:
+        timeout: Seconds to wait for the mutations of one statement.
+        poll_interval: Seconds between ``system.mutations`` reads.
+        cluster: ClickHouse cluster name; mutations are read from all replicas.
+        failure_timeout: Seconds a mutation may keep reporting a failure reason, while ClickHouse retries it,
+            before the wait fails.
+
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        timeout: float = 3600,
+        poll_interval: float = _POLL_INTERVAL,
+        cluster: str = "",
+        settings: ClickHouseSettings | None = None,
+        failure_timeout: float = _FAILURE_TIMEOUT,
+    ) -> None:
+        self._client = client
+        self._timeout = timeout
+        self._failure_timeout = failure_timeout
+        self._poll_interval = poll_interval
+        self._source = f"clusterAllReplicas('{cluster}', system.mutations)" if cluster else "system.mutations"
+        self._settings: ClickHouseSettings = settings or {}
+
+    def get_pending(self, target: MutationTarget, client: Client | None = None) -> list[_MutationState]:
+        rows = (client or self._client).execute(
+            f"""
+            SELECT mutation_id, any(command), max(parts_to_do), any(latest_fail_reason)
+            FROM {self._source}
+            WHERE database = %(database)s AND table = %(table)s AND NOT is_done
+            GROUP BY mutation_id
+            ORDER BY mutation_id
+            """,
+            {"database": target.database, "table": target.table},
+            settings=self._settings,
+        )
+        return [_MutationState(*row) for row in rows]
+
+    def pending_ids(self, target: MutationTarget, client: Client | None = None) -> frozenset[str]:
+        """Return the ids of the unfinished mutations on ``target``, e.g. to ignore them in ``wait``."""
+        return frozenset(state.mutation_id for state in self.get_pending(target, client=client))
+
+    def wait(
+        self,
+        target: MutationTarget,
+        query_id: str = "",
+        client: Client | None = None,
+        ignore: Collection[str] = (),
+    ) -> None:
+        """Block until ``target`` has no unfinished mutations other than ``ignore``.
+
+        Args:
+            target: Table to wait for.
+            query_id: ``query_id`` of the statement that started the mutations, for the error messages.
+            client: Client to poll with instead of the waiter's own, e.g. from another thread.
+            ignore: Ids of mutations that were pending before the statement ran and are not waited for.
+
+        Raises:
+            MutationFailedError: A mutation kept reporting a failure reason for ``failure_timeout`` seconds, or
+                still reported one at the ``timeout``.
+            MutationTimeoutError: Mutations are still running after ``timeout`` seconds.
+
+        """
+        started = time.monotonic()
+        source = f" (query {query_id})" if query_id else ""
+        last_parts: int | None = None
+        failing_since: dict[str, float] = {}
+        while True:
+            pending = [state for state in self.get_pending(target, client=client) if state.mutation_id not in ignore]
+            if not pending:
+                if last_parts is not None:
+                    logger.info("Mutations on %s.%s done.", target.database, target.table)
+                return
+            elapsed = time.monotonic() - started
+            failed = [state for state in pending if state.latest_fail_reason]
+            for state in failed:
+                if state.mutation_id not in failing_since:
+                    logger.warning(
+                        "Mutation %s on %s.%s failed, ClickHouse will retry it: %s",
+                        state.mutation_id,
+                        target.database,
+                        target.table,
+                        state.latest_fail_reason,
+                    )
+            failing_since = {state.mutation_id: failing_since.get(state.mutation_id, elapsed) for state in failed}
+            for state in failed:
+                failing_for = elapsed - failing_since[state.mutation_id]
+                if failing_for >= self._failure_timeout or elapsed >= self._timeout:
+                    raise MutationFailedError(
+                        f"Mutation {state.mutation_id} on {target.database}.{target.table}{source} failed "
+                        f"for {failing_for:.0f}s: {state.latest_fail_reason}\nCommand: {state.command}\n"
+                        f"Use KILL MUTATION WHERE mutation_id = '{state.mutation_id}' to cancel it."
+                    )
+            parts = sum(state.parts_to_do for state in pending)
+            if elapsed >= self._timeout:
+                ids = ", ".join(state.mutation_id for state in pending)
+                raise MutationTimeoutError(
+                    f"Mutations on {target.database}.{target.table}{source} are not done after "
+                    f"{self._timeout:g}s: {ids} ({parts} part(s) left).\n"
+                    "They keep running in the background; re-run after they finish or raise --mutation-timeout."
+                )
+            if parts != last_parts:
+                logger.info(
+                    "Waiting for %d mutation(s) on %s.%s: %d part(s) left, %.0fs elapsed.",
+                    len(pending),
+                    target.database,
+                    target.table,
+                    parts,
+                    elapsed,
+                )
+                last_parts = parts
+            time.sleep(min(self._poll_interval, max(self._timeout - elapsed, 0)))
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+from clickhouse_driver.errors import Error, ServerException
+
+from py_clickhouse_migrator.errors import StatementTimeoutError
+from py_clickhouse_migrator.timings import format_bytes
+
+if TYPE_CHECKING:
+    from clickhouse_driver import Client
+
+logger = logging.getLogger("py_clickhouse_migrator")
+
+_TIMEOUT_EXCEEDED_CODE: Final[int] = 159
+_QUERY_PREVIEW_LENGTH: Final[int] = 200
+
+
+class StatementProgress(NamedTuple):
+    """Totals of the progress packets received for one running statement."""
+
+    read_rows: int
+    read_bytes: int
+    total_rows: int
+    written_rows: int
+    written_bytes: int
+    elapsed: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read_rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """Seconds left until all ``total_rows`` are read at the current rate, None when unknown."""
+        rate = self.rows_per_second
+        if not self.total_rows or not rate or self.read_rows >= self.total_rows:
+            return None
+        return (self.total_rows - self.read_rows) / rate
+
+
+def format_count(count: float) -> str:
+    for unit in ("", "k", "M", "B"):
+        if abs(count) < 1000:
+            return f"{count:.0f}{unit}" if not unit else f"{count:.1f}{unit}"
+        count /= 1000
+    return f"{count:.1f}T"
+
+
+def format_seconds(seconds: float) -> str:
+    seconds = round(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m{seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m"
+
+
+def format_progress(progress: StatementProgress) -> str:
+    """Render rows and bytes processed, rate and ETA, e.g. ``1.2M/4.0M rows (30.0%), 96.0MiB read, ...``."""
+    rows = format_count(progress.read_rows)
+    if progress.total_rows:
+        percent = min(progress.read_rows / progress.total_rows, 1.0) * 100
+        rows = f"{rows}/{format_count(progress.total_rows)} rows ({percent:.1f}%)"
+    else:
+        rows = f"{rows} rows"
+    parts = [rows, f"{format_bytes(progress.read_bytes)} read"]
+    if progress.written_rows:
+        parts.append(f"{format_count(progress.written_rows)} rows written")
+    parts.append(f"{format_count(progress.rows_per_second)} rows/s")
+    eta = progress.eta
+    if eta is not None:
+        parts.append(f"ETA {format_seconds(eta)}")
+    parts.append(f"{format_seconds(progress.elapsed)} elapsed")
+    return ", ".join(parts)
+
+
+def _preview(query: str) -> str:
+    query = " ".join(query.split())
+    return query if len(query) <= _QUERY_PREVIEW_LENGTH else query[: _QUERY_PREVIEW_LENGTH - 3] + "..."
+
+
+class StatementMonitor:
+    """Runs statements with ``execute_with_progress``, logging their progress and enforcing a time limit.
+
+    Progress packets keep arriving while ClickHouse reads and writes rows, so long ``INSERT ... SELECT`` backfills
+    report rows, bytes, rate and ETA instead of running silently until they finish or ``send_receive_timeout``
+    closes the socket.
+
+    The time limit is enforced twice: the statement is sent with ``max_execution_time`` so the server aborts it
+    even when no progress packets arrive, and the client cancels it once a packet arrives after the limit.
+
+    Args:
+        client: Client the statements are sent with.
+        report_interval: Seconds between progress log lines; 0 disables them.
+        timeout: Seconds a single statement may run; 0 means no limit.
+        clock: Monotonic clock, replaceable in tests.
+
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        report_interval: float = 5.0,
+        timeout: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._client = client
+        self._report_interval = report_interval
+        self._timeout = timeout
+        self._clock = clock
+
+    def execute(self, query: str, query_id: str = "", label: str = "") -> StatementProgress:
+        """Execute ``query`` and return its final progress.
+
+        Args:
+            query: Statement to execute.
+            query_id: ClickHouse ``query_id`` to send; generated by the server when empty.
+            label: Prefix of the progress log lines, e.g. the migration name and statement number.
+
+        Raises:
+            StatementTimeoutError: The statement ran longer than ``timeout`` seconds and was cancelled.
+
+        """
+        settings = {"max_execution_time": math.ceil(self._timeout)} if self._timeout else None
+        started = self._clock()
+        next_report = started + self._report_interval
+        progress = StatementProgress(0, 0, 0, 0, 0, 0.0)
+        try:
+            result = self._client.execute_with_progress(query, settings=settings, query_id=query_id or None)
+            for _ in result:
+                now = self._clock()
+                progress = self._snapshot(result, now - started)
+                if self._timeout and progress.elapsed >= self._timeout:
+                    self._cancel()
+                    raise self._timeout_error(query, query_id, progress)
+                if self._report_interval and now >= next_report:
+                    logger.info("%s%s", f"{label}: " if label else "", format_progress(progress))
+                    next_report = now + self._report_interval
+            result.get_result()
+            return self._snapshot(result, self._clock() - started)
+        except ServerException as exc:
+            if exc.code == _TIMEOUT_EXCEEDED_CODE and self._timeout:
+                raise self._timeout_error(query, query_id, progress) from exc
+            raise
+
+    @staticmethod
+    def _snapshot(result: object, elapsed: float) -> StatementProgress:
+        totals = getattr(result, "progress_totals", None)
+        return StatementProgress(
+            read_rows=getattr(totals, "rows", 0),
+            read_bytes=getattr(totals, "bytes", 0),
+            total_rows=getattr(totals, "total_rows", 0),
+            written_rows=getattr(totals, "written_rows", 0),
+            written_bytes=getattr(totals, "written_bytes", 0),
+            elapsed=elapsed,
+        )
+
+    def _cancel(self) -> None:
+        try:
+            self._client.cancel()
+        except (Error, OSError) as exc:
+            # The server may answer the cancel with an exception packet; the connection is reopened on next use.
+            logger.debug("Cancel of a timed out statement failed: %s", exc)
+            self._client.disconnect()
+
+    def _timeout_error(self, query: str, query_id: str, progress: StatementProgress) -> StatementTimeoutError:
+        source = f" (query {query_id})" if query_id else ""
+        return StatementTimeoutError(
+            f"Statement did not finish in {self._timeout:g}s and was cancelled{source}: {_preview(query)}\n"
+            f"Progress at cancel: {format_progress(progress)}.\n"
+            "Rows it already inserted are kept. Raise --statement-timeout, or make the statement idempotent and "
+            "re-run to resume the migration from it."
+        )
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import logging
+import re
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+from py_clickhouse_migrator.dependencies import MigrationNode, plan_dependencies
+
+if TYPE_CHECKING:
+    from clickhouse_driver import Client
+
+logger = logging.getLogger("py_clickhouse_migrator")
+
+ClickHouseSettings = dict[str, str | int]
+
+# Migrator service tables are created by the migrator itself and are never part of the application schema.
+SERVICE_TABLES: Final[frozenset[str]] = frozenset(
+    {"db_migrations", "db_migrations_progress", "db_migrations_stats", "db_migrations_chunks", "_migrations_lock"}
+)
+_VIEW_ENGINES: Final[frozenset[str]] = frozenset({"View", "MaterializedView", "LiveView", "WindowView"})
+_SAFE_NAME_RE: Final[re.Pattern[str]] = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*\Z")
+# Dictionaries after the tables they read from, views after the tables and dictionaries they select from.
+_SCHEMA_QUERY: Final[str] = f"""
+SELECT name, engine, create_table_query
+FROM system.tables
+WHERE database = %(database)s AND NOT is_temporary AND NOT startsWith(name, '.inner')
+ORDER BY
+    multiIf(engine = 'Dictionary', 1, engine IN ({", ".join(f"'{engine}'" for engine in sorted(_VIEW_ENGINES))}), 2, 0),
+    metadata_modification_time,
+    name
+"""
+
+
+class SchemaObject(NamedTuple):
+    name: str
+    engine: str
+    create_query: str
+
+    @property
+    def kind(self) -> str:
+        """Return the keyword used to drop the object: ``TABLE``, ``DICTIONARY`` or ``VIEW``."""
+        if self.engine == "Dictionary":
+            return "DICTIONARY"
+        return "VIEW" if self.engine in _VIEW_ENGINES else "TABLE"
+
+
+def read_schema(client: Client, database: str, settings: ClickHouseSettings | None = None) -> list[SchemaObject]:
+    """Return the tables, dictionaries and views of ``database`` in creation order, without service tables.
+
+    Tables come first, then dictionaries, then views; each group by metadata modification time. Inner tables of
+    materialized views are left out, as their view creates them.
+    """
+    rows = client.execute(_SCHEMA_QUERY, {"database": database}, settings=settings or {})
+    return [SchemaObject(*row) for row in rows if row[0] not in SERVICE_TABLES]
+
+
+def quote_name(name: str) -> str:
+    return name if _SAFE_NAME_RE.match(name) else "`" + name.replace("\\", "\\\\").replace("`", "\\`") + "`"
+
+
+def strip_database(query: str, database: str) -> str:
+    """Remove ``database.`` qualifiers so the statement creates objects in the database it runs in."""
+    return re.sub(rf"(?<![\w.`])(?:{re.escape(database)}|`{re.escape(database)}`)\.", "", query)
+
+
+def plan_schema(objects: list[SchemaObject]) -> dict[str, tuple[str, ...]]:
+    """Return the objects each object must be created after.
+
+    Dictionaries and views wait for all tables. Within the tables, and within the dictionaries and views,
+    objects wait for the earlier ones they name, as inferred for ``up --parallel``.
+    """
+    known = {obj.name for obj in objects}
+    tables = [MigrationNode(obj.name, [obj.create_query], []) for obj in objects if obj.kind == "TABLE"]
+    others = [MigrationNode(obj.name, [obj.create_query], []) for obj in objects if obj.kind != "TABLE"]
+    plan = plan_dependencies(tables, known)
+    # Tables no other table waits for; waiting for them covers the rest.
+    depended = {name for waits in plan.values() for name in waits}
+    last_tables = tuple(node.name for node in tables if node.name not in depended)
+    for name, waits in plan_dependencies(others, known).items():
+        plan[name] = waits or last_tables
+    return plan
+
+
+def run_planned(plan: dict[str, tuple[str, ...]], run: Callable[[str], None], workers: int) -> list[str]:
+    """Call ``run`` for every name in ``plan`` on up to ``workers`` threads, each after the names it waits for.
+
+    The first failure stops starting new work; running calls finish and the failure is raised.
+
+    Returns:
+        Names in the order they finished.
+
+    """
+    waiting = list(plan)
+    running: dict[Future[None], str] = {}
+    finished: list[str] = []
+    error: Exception | None = None
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            if error is None:
+                done_names = set(finished)
+                for name in [name for name in waiting if done_names.issuperset(plan[name])]:
+                    waiting.remove(name)
+                    running[executor.submit(run, name)] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                except Exception as exc:
+                    if error is not None:
+                        logger.error("%s failed: %s", name, exc)
+                    error = error or exc
+                else:
+                    finished.append(name)
+    if error is not None:
+        raise error
+    return finished
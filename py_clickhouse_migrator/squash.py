@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import logging
+import os
+from collections.abc import Collection
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+from py_clickhouse_migrator.errors import MigrationDirectoryNotFoundError, MigrationParseError, SquashError
+from py_clickhouse_migrator.migration_parser import (
+    format_squashes_header,
+    format_statement_marker,
+    load_migration_header,
+    load_migration_sections,
+    parse_migration_statements,
+)
+from py_clickhouse_migrator.schema import quote_name, read_schema, strip_database
+
+if TYPE_CHECKING:
+    from clickhouse_driver import Client
+
+logger = logging.getLogger("py_clickhouse_migrator")
+
+SNAPSHOT_SUFFIX: Final[str] = "_squashed"
+
+
+class Snapshot(NamedTuple):
+    filename: str
+    content: str
+    # Migration files the snapshot replaces; ``write_snapshot`` deletes them.
+    replaced: list[str]
+    # Every migration the snapshot stands for, including those of replaced snapshots, in filename order.
+    squashes: list[str]
+
+
+def snapshot_filename(target: str) -> str:
+    """Return the snapshot filename for ``target``; it sorts right after ``target``, before later migrations."""
+    return f"{target.removesuffix('.sql')}{SNAPSHOT_SUFFIX}.sql"
+
+
+def _select_replaced(migrations_dir: str, target: str) -> tuple[list[str], list[str]]:
+    """Return the files up to ``target`` and every migration they stand for."""
+    try:
+        filenames = sorted(file for file in os.listdir(migrations_dir) if file.endswith(".sql"))
+    except FileNotFoundError:
+        raise MigrationDirectoryNotFoundError(f"Migration directory {migrations_dir} not found.") from None
+    if target not in filenames:
+        raise SquashError(f"Migration {target} not found in {migrations_dir}.")
+    replaced = filenames[: filenames.index(target) + 1]
+    if len(replaced) < 2:
+        raise SquashError(f"Nothing to squash: {target} is the first migration.")
+    filename = snapshot_filename(target)
+    if filename in filenames:
+        raise SquashError(f"{filename} already exists.")
+    squashes: list[str] = []
+    for name in replaced:
+        try:
+            squashes.extend(load_migration_header(os.path.join(migrations_dir, name)).squashes)
+        except MigrationParseError as exc:
+            raise SquashError(str(exc)) from exc
+        squashes.append(name)
+    return replaced, list(dict.fromkeys(squashes))
+
+
+def _render(squashes: list[str], source: str, up: list[str], rollback: list[str]) -> str:
+    lines = [
+        f"-- Snapshot of {len(squashes)} migrations up to {squashes[-1]}, generated by 'migrator squash' {source}.",
+        f"-- Databases where {squashes[-1]} is applied record it without running it.",
+        *format_squashes_header(squashes),
+        "",
+        "-- migrator:up",
+    ]
+    for block in up:
+        lines += [block, ""]
+    lines.append("-- migrator:down")
+    for block in rollback:
+        lines += [block, ""]
+    return "\n".join(lines).rstrip("\n") + "\n"
+
+
+def squash_migration_files(migrations_dir: str, target: str) -> Snapshot:
+    """Build a snapshot from the statements of all migration files up to ``target``.
+
+    Up statements keep their order and chunk options; rollback sections run in reverse migration order.
+
+    Raises:
+        SquashError: ``target`` is missing, is the first migration, or a file cannot be parsed.
+
+    """
+    target = target if target.endswith(".sql") else f"{target}.sql"
+    replaced, squashes = _select_replaced(migrations_dir, target)
+    up: list[str] = []
+    rollbacks: list[list[str]] = []
+    for name in replaced:
+        try:
+            sections = load_migration_sections(os.path.join(migrations_dir, name))
+            statements, chunks = parse_migration_statements(sections)
+        except MigrationParseError as exc:
+            raise SquashError(f"Migration {name}: {exc}") from exc
+        up += [f"{format_statement_marker(chunks.up.get(i))}\n{sql}" for i, sql in enumerate(statements.up)]
+        rollbacks.append(
+            [f"{format_statement_marker(chunks.rollback.get(i))}\n{sql}" for i, sql in enumerate(statements.rollback)]
+        )
+    rollback = [block for blocks in reversed(rollbacks) for block in blocks]
+    content = _render(squashes, "from the migration files", up, rollback)
+    return Snapshot(snapshot_filename(target), content, replaced, squashes)
+
+
+def squash_database_schema(
+    client: Client, database: str, migrations_dir: str, target: str, applied: Collection[str]
+) -> Snapshot:
+    """Build a snapshot from ``SHOW CREATE`` of the tables, dictionaries and views of a reference database.
+
+    Create-then-drop churn and superseded ``ALTER``s disappear, because only the resulting schema is kept.
+    Data inserted by migrations is not part of the snapshot.
+
+    Args:
+        client: Client connected to the reference database.
+        database: Name of the reference database; its qualifiers are removed from the statements.
+        migrations_dir: Directory containing ``.sql`` migration files.
+        target: Last migration to squash.
+        applied: Migrations applied in the reference database.
+
+    Raises:
+        SquashError: The reference database does not have exactly the migrations up to ``target`` applied, or
+            has no tables.
+
+    """
+    target = target if target.endswith(".sql") else f"{target}.sql"
+    replaced, squashes = _select_replaced(migrations_dir, target)
+    applied_set = set(applied)
+    missing = [name for name in replaced if name not in applied_set]
+    if missing:
+        raise SquashError(
+            f"Database {database} is not at {target}: {len(missing)} migration(s) up to it are not applied, "
+            f"starting with {missing[0]}."
+        )
+    extra = sorted(applied_set - set(squashes))
+    if extra:
+        raise SquashError(
+            f"Database {database} has migrations after {target} applied ({', '.join(extra[:3])}"
+            f"{', ...' if len(extra) > 3 else ''}); their changes would end up in the snapshot."
+        )
+    objects = read_schema(client, database)
+    if not objects:
+        raise SquashError(f"Database {database} has no tables to snapshot.")
+    up = [f"{format_statement_marker()}\n{strip_database(obj.create_query, database)}" for obj in objects]
+    rollback = [
+        f"{format_statement_marker()}\nDROP {obj.kind} IF EXISTS {quote_name(obj.name)}" for obj in reversed(objects)
+    ]
+    content = _render(squashes, f"from the schema of database {database}", up, rollback)
+    return Snapshot(snapshot_filename(target), content, replaced, squashes)
+
+
+def write_snapshot(migrations_dir: str, snapshot: Snapshot) -> str:
+    """Write the snapshot file, delete the files it replaces, and return the snapshot path."""
+    filepath = os.path.join(migrations_dir, snapshot.filename)
+    with open(filepath, "x", encoding="utf-8") as f:
+        f.write(snapshot.content)
+    for name in snapshot.replaced:
+        os.remove(os.path.join(migrations_dir, name))
+    logger.info("Squashed %d migration file(s) into %s.", len(snapshot.replaced), filepath)
+    return filepath
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+from py_clickhouse_migrator.errors import ThrottleTimeoutError
+
+if TYPE_CHECKING:
+    from clickhouse_driver import Client
+
+logger = logging.getLogger("py_clickhouse_migrator")
+
+ClickHouseSettings = dict[str, str | int]
+
+# --throttle keys and the ThrottleConfig field each one sets.
+_SPEC_KEYS: Final[dict[str, str]] = {
+    "queries": "max_queries",
+    "background_tasks": "max_background_tasks",
+    "merges": "max_merges",
+    "mutations": "max_mutations",
+}
+_LOAD_QUERY: Final[str] = """
+SELECT
+    (SELECT toUInt64(value) FROM system.metrics WHERE metric = 'Query'),
+    (SELECT toUInt64(value) FROM system.metrics WHERE metric = 'BackgroundMergesAndMutationsPoolTask'),
+    (SELECT count() FROM system.merges),
+    (SELECT count() FROM system.mutations WHERE NOT is_done)
+"""
+
+
+class ThrottleConfig(NamedTuple):
+    """Server load limits checked before each migration statement and partition chunk; 0 disables a limit.
+
+    ``max_queries`` does not count the throttle check itself.
+    """
+
+    max_queries: int = 0
+    max_background_tasks: int = 0
+    max_merges: int = 0
+    max_mutations: int = 0
+    poll_interval: float = 5.0
+    timeout: float = 3600.0
+
+
+class ServerLoad(NamedTuple):
+    queries: int
+    background_tasks: int
+    merges: int
+    mutations: int
+
+
+def parse_throttle_spec(value: str, timeout: float = 3600.0) -> ThrottleConfig:
+    """Parse ``queries=50,merges=10`` style limits.
+
+    Raises:
+        ValueError: Unknown key, missing ``=``, or a limit that is not a positive integer.
+
+    """
+    limits: dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        key, sep, number = item.partition("=")
+        field = _SPEC_KEYS.get(key.strip())
+        if not sep or field is None:
+            raise ValueError(f"Invalid throttle limit '{item}'. Use {', '.join(f'{key}=N' for key in _SPEC_KEYS)}.")
+        if not number.strip().isdigit() or int(number) < 1:
+            raise ValueError(f"Throttle limit '{item}' must be a positive integer.")
+        limits[field] = int(number)
+    if not limits:
+        raise ValueError("Throttle needs at least one limit, e.g. queries=50,merges=10.")
+    return ThrottleConfig(timeout=timeout, **limits)
+
+
+class LoadThrottle:
+    """Pauses migration work while the server is busier than the configured limits.
+
+    Load is read with a single query from ``system.metrics``, ``system.merges`` and ``system.mutations`` of the
+    server the migrator is connected to. After a check within the limits, further checks are skipped for
+    ``poll_interval`` seconds, so short statements and small chunks do not each pay a round trip. Safe to call
+    from several threads; they share one check.
+
+    Args:
+        client: Client the load query is sent with.
+        config: Limits, poll interval and the longest total pause for one check.
+        settings: Settings sent with the load query.
+        clock: Monotonic clock, replaceable in tests.
+        sleep: Sleep function, replaceable in tests.
+
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        config: ThrottleConfig,
+        settings: ClickHouseSettings | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._client = client
+        self._config = config
+        self._settings: ClickHouseSettings = settings or {}
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._ok_until = float("-inf")
+        self.paused_seconds = 0.0
+
+    def read_load(self) -> ServerLoad:
+        row = self._client.execute(_LOAD_QUERY, settings=self._settings)[0]
+        queries, background_tasks, merges, mutations = (int(value or 0) for value in row)
+        return ServerLoad(max(queries - 1, 0), background_tasks, merges, mutations)
+
+    def exceeded(self, load: ServerLoad) -> list[str]:
+        """Return a description of every limit ``load`` is over."""
+        config = self._config
+        checks = (
+            ("queries", load.queries, config.max_queries),
+            ("background tasks", load.background_tasks, config.max_background_tasks),
+            ("merges", load.merges, config.max_merges),
+            ("mutations", load.mutations, config.max_mutations),
+        )
+        return [f"{name} {value} > {limit}" for name, value, limit in checks if limit and value > limit]
+
+    def wait(self, label: str = "") -> float:
+        """Block until the server load is within the limits and return the seconds spent waiting.
+
+        Args:
+            label: What is about to run, for the log lines.
+
+        Raises:
+            ThrottleTimeoutError: The load stayed over the limits for ``timeout`` seconds.
+
+        """
+        with self._lock:
+            started = self._clock()
+            if started < self._ok_until:
+                return 0.0
+            reported = False
+            while True:
+                over = self.exceeded(self.read_load())
+                now = self._clock()
+                if not over:
+                    self._ok_until = now + self._config.poll_interval
+                    waited = now - started
+                    if reported:
+                        logger.info("Server load is back under the limits after %.0fs, resuming.", waited)
+                    self.paused_seconds += waited
+                    return waited
+                if now - started >= self._config.timeout:
+                    raise ThrottleTimeoutError(
+                        f"Server load stayed over the throttle limits for {self._config.timeout:g}s"
+                        f"{f' before {label}' if label else ''}: {', '.join(over)}.\n"
+                        "Re-run when the server is less busy, or raise the limits or --throttle-timeout."
+                    )
+                if not reported:
+                    logger.info("Throttling%s: %s.", f" before {label}" if label else "", ", ".join(over))
+                    reported = True
+                self._sleep(self._config.poll_interval)
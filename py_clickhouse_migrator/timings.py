@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
+from enum import StrEnum
+from typing import TYPE_CHECKING, Any, Final
+
+if TYPE_CHECKING:
+    from clickhouse_driver import Client
+
+# Upper bounds of the latency histogram buckets in seconds; the last bucket is unbounded.
+LATENCY_BUCKETS: Final[tuple[float, ...]] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+_SERVICE_TABLES: Final[frozenset[str]] = frozenset(
+    {"db_migrations", "db_migrations_progress", "db_migrations_chunks", "db_migrations_stats", "_migrations_lock"}
+)
+_SERVICE_QUERIES: Final[frozenset[str]] = frozenset({"SELECT 1", "SELECT version()"})
+_LITERAL_OR_COMMENT_RE: Final[re.Pattern[str]] = re.compile(r"'(?:[^'\\]|\\.)*'|--[^\n]*|/\*.*?\*/", re.DOTALL)
+# First table named after INTO, TABLE, FROM or JOIN. Table functions and subqueries in FROM are skipped, except
+# the cluster functions wrapping the system tables the migrator reads on a cluster.
+_TARGET_RE: Final[re.Pattern[str]] = re.compile(
+    r"\b(?:INTO|TABLE)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(?P<target>(?:\w+\.)?\w+)\b"
+    r"|\b(?:FROM|JOIN)\s+(?:cluster(?:AllReplicas)?\s*\(\s*''\s*,\s*)?(?P<source>(?:\w+\.)?\w+)\b(?!\s*\()",
+    re.IGNORECASE,
+)
+
+
+class QueryCategory(StrEnum):
+    SERVICE = "service"
+    LEDGER_READ = "ledger read"
+    LEDGER_WRITE = "ledger write"
+    PROGRESS = "progress"
+    LOCK = "lock"
+    VALIDATION = "validation"
+    MUTATION_WAIT = "mutation wait"
+    THROTTLE = "throttle"
+    STATS = "stats"
+    USER_DDL = "user DDL"
+
+
+_TABLE_CATEGORIES: Final[dict[str, QueryCategory]] = {
+    "_migrations_lock": QueryCategory.LOCK,
+    "system.tables": QueryCategory.SERVICE,
+    "system.metrics": QueryCategory.THROTTLE,
+    "system.merges": QueryCategory.THROTTLE,
+    "system.mutations": QueryCategory.MUTATION_WAIT,
+    "db_migrations_stats": QueryCategory.STATS,
+    "system.query_log": QueryCategory.STATS,
+    "db_migrations_progress": QueryCategory.PROGRESS,
+    "db_migrations_chunks": QueryCategory.PROGRESS,
+    "system.parts": QueryCategory.PROGRESS,
+}
+
+
+def classify_query(query: str) -> QueryCategory:
+    """Return the category of a query sent by the migrator, based on its leading keyword and target table.
+
+    Comments and string literals are ignored, so a statement that only mentions a service table in either is
+    counted as user DDL.
+    """
+    query = " ".join(_LITERAL_OR_COMMENT_RE.sub(_blank_literal_or_comment, query).split())
+    keyword = query.partition(" ")[0].upper()
+    if keyword == "EXPLAIN":
+        return QueryCategory.VALIDATION
+    if query in _SERVICE_QUERIES:
+        return QueryCategory.SERVICE
+    if query.upper() == "SYSTEM FLUSH LOGS":
+        return QueryCategory.STATS
+    match = _TARGET_RE.search(query)
+    if match is None:
+        return QueryCategory.USER_DDL
+    table = (match["target"] or match["source"]).lower()
+    if not table.startswith("system."):
+        table = table.rpartition(".")[2]
+    if keyword == "CREATE" and table in _SERVICE_TABLES:
+        return QueryCategory.SERVICE
+    if table == "db_migrations":
+        return QueryCategory.LEDGER_READ if keyword == "SELECT" else QueryCategory.LEDGER_WRITE
+    return _TABLE_CATEGORIES.get(table, QueryCategory.USER_DDL)
+
+
+def _blank_literal_or_comment(match: re.Match[str]) -> str:
+    return "''" if match.group().startswith("'") else " "
+
+
+@dataclass
+class CategoryStats:
+    """Aggregated timings of one query category.
+
+    ``histogram[i]`` counts queries that took at most ``LATENCY_BUCKETS[i]`` seconds (and more than the
+    previous bound); the last element counts the slower ones.
+    """
+
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    histogram: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    @property
+    def avg_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+
+class QueryTimings:
+    """Thread-safe collector of per-category query counts, latencies and sizes.
+
+    Pass one instance to ``Migrator(timings=...)``; every query sent through the migrator's clients, including
+    ``MigrationLock`` queries on ``migrator.ch_client``, is recorded. One instance may be shared by several
+    migrators.
+    """
+
+    def __init__(self) -> None:
+        self._stats: dict[QueryCategory, CategoryStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, query: str, seconds: float, bytes_sent: int = 0, bytes_received: int = 0, failed: bool = False
+    ) -> None:
+        category = classify_query(query)
+        with self._lock:
+            stats = self._stats.setdefault(category, CategoryStats())
+            stats.count += 1
+            stats.errors += failed
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            stats.histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def stats(self) -> dict[QueryCategory, CategoryStats]:
+        """Return a snapshot of the stats per category, in ``QueryCategory`` order."""
+        with self._lock:
+            return {
+                category: replace(self._stats[category], histogram=list(self._stats[category].histogram))
+                for category in QueryCategory
+                if category in self._stats
+            }
+
+    @property
+    def count(self) -> int:
+        with self._lock:
+            return sum(stats.count for stats in self._stats.values())
+
+    @property
+    def total_seconds(self) -> float:
+        with self._lock:
+            return sum(stats.total_seconds for stats in self._stats.values())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def format_report(self) -> str:
+        stats = self.stats()
+        total = sum(item.total_seconds for item in stats.values())
+        lines = [
+            f"Query timings: {sum(item.count for item in stats.values())} queries, {total:.3f}s",
+            f"  {'category':<14}{'count':>7}{'errors':>8}{'total':>10}{'avg':>10}{'max':>10}{'sent':>10}{'recv':>10}",
+        ]
+        for category, item in stats.items():
+            lines.append(
+                f"  {category:<14}{item.count:>7}{item.errors:>8}{item.total_seconds:>9.3f}s"
+                f"{item.avg_seconds * 1000:>8.1f}ms{item.max_seconds * 1000:>8.1f}ms"
+                f"{format_bytes(item.bytes_sent):>10}{format_bytes(item.bytes_received):>10}"
+            )
+        lines.append("  latency histogram:")
+        for category, item in stats.items():
+            buckets = " ".join(
+                f"{_format_bucket(index)}:{count}" for index, count in enumerate(item.histogram) if count
+            )
+            lines.append(f"    {category:<14}{buckets}")
+        return "\n".join(lines)
+
+
+def _format_bucket(index: int) -> str:
+    if index == len(LATENCY_BUCKETS):
+        return f">{LATENCY_BUCKETS[-1]:g}s"
+    bound = LATENCY_BUCKETS[index]
+    return f"<={bound * 1000:g}ms" if bound < 1 else f"<={bound:g}s"
+
+
+def format_bytes(size: int) -> str:
+    if size < 1024:
+        return f"{size}B"
+    value = size / 1024
+    for unit in ("KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}GiB"
+
+
+class InstrumentedClient:
+    """Wraps a ClickHouse ``Client`` and records every ``execute`` in a ``QueryTimings``.
+
+    ``bytes_sent`` counts the query text and ``bytes_received`` the uncompressed result size reported by the
+    server, when the client exposes it. Other attributes are forwarded to the wrapped client.
+
+    Args:
+        client: Client to wrap.
+        timings: Collector the queries are recorded in.
+
+    """
+
+    def __init__(self, client: Client, timings: QueryTimings) -> None:
+        self.client = client
+        self.timings = timings
+
+    def execute(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = self.client.execute(query, *args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._record(query, started, failed)
+
+    def execute_with_progress(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        """Start ``query`` like ``Client.execute_with_progress``; it is recorded once its result is consumed."""
+        started = time.perf_counter()
+        try:
+            result = self.client.execute_with_progress(query, *args, **kwargs)
+        except Exception:
+            self._record(query, started, failed=True)
+            raise
+        return _TimedProgressResult(result, lambda failed: self._record(query, started, failed))
+
+    def _record(self, query: str, started: float, failed: bool) -> None:
+        elapsed = time.perf_counter() - started
+        profile_info = getattr(getattr(self.client, "last_query", None), "profile_info", None)
+        self.timings.record(
+            query,
+            elapsed,
+            bytes_sent=len(query.encode()),
+            bytes_received=0 if failed else int(getattr(profile_info, "bytes", 0) or 0),
+            failed=failed,
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+
+class _TimedProgressResult:
+    """Proxy of a ``ProgressQueryResult`` that reports the end of the query, successful or not, exactly once."""
+
+    def __init__(self, result: Any, on_done: Callable[[bool], None]) -> None:
+        self._result = result
+        self._on_done: Callable[[bool], None] | None = on_done
+
+    def _done(self, failed: bool) -> None:
+        if self._on_done is not None:
+            self._on_done(failed)
+            self._on_done = None
+
+    def __iter__(self) -> _TimedProgressResult:
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            return next(self._result)
+        except StopIteration:
+            self._done(failed=False)
+            raise
+        except Exception:
+            self._done(failed=True)
+            raise
+
+    def get_result(self) -> Any:
+        try:
+            result = self._result.get_result()
+        except Exception:
+            self._done(failed=True)
+            raise
+        self._done(failed=False)
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._result, name)
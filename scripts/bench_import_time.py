@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNS = 15
+OFFLINE = (
+    "from py_clickhouse_migrator.cli import main; main(['--path', {path!r}, 'new', 'bench'], standalone_mode=False)"
+)
+FULL = "import py_clickhouse_migrator.cli, py_clickhouse_migrator.migrator"
+
+
+def _median_seconds(code: str) -> float:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as path:
+        baseline = _median_seconds("pass")
+        offline = _median_seconds(OFFLINE.format(path=path))
+        full = _median_seconds(FULL)
+    print(f"interpreter startup:         {baseline * 1000:7.1f} ms")
+    print(f"'migrator new' (offline):    {offline * 1000:7.1f} ms")
+    print(f"cli + migrator (driver):     {full * 1000:7.1f} ms")
+    print(f"offline / full import cost:  {(offline - baseline) / (full - baseline):7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,20 @@ from __future__ import annotations
 
 import os
 import shutil
-from collections.abc import Generator
+from collections.abc import Callable, Generator
+from pathlib import Path
+from typing import Any
 
 import pytest
 from clickhouse_driver import Client
 
 from py_clickhouse_migrator.migrator import Migrator, create_migrations_dir
 
+from tests.fake_clickhouse import FakeClickHouse
 from tests.helpers import create_test_migration, table_exists
 
 DB_URL = "clickhouse://default@localhost:19000/test"
+FAKE_URL = "clickhouse://default@localhost:9000/test"
 
 
 @pytest.fixture(scope="session")
@@ -25,6 +29,22 @@ def migrator(test_db: str) -> Generator[Migrator]:
     yield migrator
 
 
+@pytest.fixture(scope="function")
+def fake_migrator(tmp_path: Path) -> Callable[..., Migrator]:
+    """Return a factory of migrators connected to a ``FakeClickHouse``.
+
+    The factory takes the server and ``Migrator`` keyword arguments. Migrations are read from ``tmp_path`` and
+    the migration cache is off unless ``migrations_dir`` or ``use_cache`` say otherwise.
+    """
+
+    def make(server: FakeClickHouse, database_url: str = FAKE_URL, **kwargs: Any) -> Migrator:
+        kwargs.setdefault("migrations_dir", str(tmp_path))
+        kwargs.setdefault("use_cache", False)
+        return Migrator(database_url, client_factory=server.connect, **kwargs)  # type: ignore[arg-type]
+
+    return make
+
+
 @pytest.fixture(scope="session")
 def ch_client(test_db: str) -> Generator[Client]:
     client: Client = Client.from_url(test_db)
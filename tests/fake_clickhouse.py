@@ -0,0 +1,410 @@
+from __future__ import annotations
+
+import datetime as dt
+import re
+import threading
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any
+from urllib.parse import urlsplit
+
+from clickhouse_driver.errors import ServerException
+
+UNKNOWN_TABLE_CODE = 60
+UNKNOWN_DATABASE_CODE = 81
+SERVER_VERSION = "24.8.1.1"
+
+_CREATE_TABLE_RE = re.compile(r"^CREATE TABLE IF NOT EXISTS (?:\w+\.)?(\w+)")
+_INSERT_COLUMNS_RE = re.compile(r"^INSERT INTO (?:\w+\.)?(\w+) \(([^)]*)\) VALUES$")
+_LOCK_INSERT_RE = re.compile(r"^INSERT INTO (?:\w+\.)?_migrations_lock .*, (?P<is_locked>[01])$")
+
+
+@dataclass
+class _LedgerRow:
+    name: str
+    kind: str
+    up: str
+    rollback: str
+    dt: dt.datetime
+    checksum: str
+
+
+@dataclass
+class _LockRow:
+    lock_id: str
+    locked_by: str
+    locked_at: dt.datetime
+    expires_at: dt.datetime
+    is_locked: int
+
+
+@dataclass
+class _Database:
+    tables: set[str] = field(default_factory=set)
+    ledger: list[_LedgerRow] = field(default_factory=list)
+    progress: dict[tuple[str, int], str] = field(default_factory=dict)
+    locks: dict[str, _LockRow] = field(default_factory=dict)
+    statements: list[str] = field(default_factory=list)
+    stats: list[dict[str, Any]] = field(default_factory=list)
+    chunks: set[tuple[str, int, str, str]] = field(default_factory=set)
+    partitions: dict[str, list[str]] = field(default_factory=dict)
+    schema: list[tuple[str, str, str]] = field(default_factory=list)
+    last_dt: dt.datetime = dt.datetime.min
+
+
+def _normalize(query: str) -> str:
+    return " ".join(query.split())
+
+
+def _utcnow() -> dt.datetime:
+    return dt.datetime.now(dt.UTC).replace(tzinfo=None)
+
+
+class FakeClickHouse:
+    """In-memory stand-in for a ClickHouse server, for offline load tests and benchmarks.
+
+    Serves the queries ``Migrator`` and ``MigrationLock`` send for ``db_migrations``, ``db_migrations_progress``,
+    ``db_migrations_chunks`` and ``_migrations_lock``, and ``system.parts`` for the partitions registered with
+    ``add_partitions``, ``system.tables`` for the objects registered with ``add_schema_object``, and
+    ``system.metrics`` load checks with the values set by ``set_load``; any other
+    statement is recorded per database and succeeds. Statements sent with a
+    ``query_id`` appear in ``system.query_log`` with ``read_bytes`` and ``memory_usage`` equal to their length,
+    and one read row. ``execute_with_progress`` yields the packets registered with ``progress_on`` before running
+    the statement. Every ``execute`` is one
+    round trip and sleeps ``latency`` seconds outside the server lock, so concurrent clients overlap like they
+    would against a real server.
+
+    Args:
+        databases: Databases that exist on the server; connecting to any other fails like ClickHouse does.
+        latency: Seconds added to every round trip.
+        clock: Returns the server time used for ``now()`` and lock expiry.
+
+    """
+
+    def __init__(
+        self,
+        databases: Sequence[str] = ("default",),
+        latency: float = 0.0,
+        clock: Callable[[], dt.datetime] = _utcnow,
+    ) -> None:
+        self.latency = latency
+        self.clock = clock
+        self.databases: dict[str, _Database] = {name: _Database() for name in databases}
+        self.queries: list[tuple[str, str]] = []
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._failures: dict[str, int] = {}
+        self._progress: dict[str, list[dict[str, int]]] = {}
+        self.query_log: dict[str, tuple[int, int, int, int, int]] = {}
+        # Running queries (including the check itself), background pool tasks, merges, unfinished mutations.
+        self.load: tuple[int, int, int, int] = (1, 0, 0, 0)
+        self._lock = threading.Lock()
+
+    def connect(self, database_url: str) -> FakeClient:
+        """Open a client for the database in ``database_url``; usable as ``Migrator(client_factory=...)``."""
+        with self._lock:
+            self.connections += 1
+        return FakeClient(self, urlsplit(database_url).path.strip("/") or "default")
+
+    def create_database(self, name: str) -> None:
+        with self._lock:
+            self.databases.setdefault(name, _Database())
+
+    def add_partitions(self, database: str, table: str, partition_ids: Sequence[str]) -> None:
+        """Make ``system.parts`` report active parts for ``partition_ids`` of ``database.table``."""
+        with self._lock:
+            self.databases[database].partitions[table] = list(partition_ids)
+
+    def add_schema_object(self, database: str, name: str, engine: str, create_query: str) -> None:
+        """Make ``system.tables`` list ``name``; objects are returned in the order they were added."""
+        with self._lock:
+            self.databases[database].schema.append((name, engine, create_query))
+
+    def set_load(self, queries: int = 0, background_tasks: int = 0, merges: int = 0, mutations: int = 0) -> None:
+        """Set the load reported to throttle checks; ``queries`` excludes the check query itself."""
+        self.load = (queries + 1, background_tasks, merges, mutations)
+
+    def fail_on(self, fragment: str, code: int = 62) -> None:
+        """Make statements containing ``fragment`` raise a ``ServerException`` with ``code``."""
+        self._failures[fragment] = code
+
+    def clear_failures(self) -> None:
+        self._failures.clear()
+
+    def progress_on(self, fragment: str, packets: Sequence[dict[str, int]]) -> None:
+        """Send ``packets`` (``Progress`` fields such as ``rows``) before statements containing ``fragment``."""
+        self._progress[fragment] = list(packets)
+
+    def progress_packets(self, query: str) -> list[dict[str, int]]:
+        sql = _normalize(query)
+        return next((packets for fragment, packets in self._progress.items() if fragment in sql), [])
+
+    @property
+    def round_trips(self) -> int:
+        return len(self.queries)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.queries.clear()
+            self.connections = 0
+            self.max_in_flight = 0
+
+    def applied_names(self, database: str = "default") -> list[str]:
+        return [row.name for row in sorted(self.databases[database].ledger, key=lambda row: row.dt)]
+
+    def statements(self, database: str = "default") -> list[str]:
+        return list(self.databases[database].statements)
+
+    def execute(self, database: str, query: str, params: Any = None, query_id: str = "") -> list[tuple[Any, ...]]:
+        sql = _normalize(query)
+        with self._lock:
+            self.queries.append((database, sql))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            with self._lock:
+                db = self.databases.get(database)
+                if db is None:
+                    raise ServerException(f"Database {database} does not exist", code=UNKNOWN_DATABASE_CODE)
+                result = self._dispatch(db, sql, params)
+                if query_id:
+                    self.query_log[query_id] = (1, len(sql), 0, 0, len(sql))
+                return result
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _dispatch(self, db: _Database, sql: str, params: Any) -> list[tuple[Any, ...]]:
+        if sql == "SELECT 1":
+            return [(1,)]
+        if sql == "SELECT version()":
+            return [(SERVER_VERSION,)]
+        if sql == "SELECT name FROM system.databases ORDER BY name":
+            return [(name,) for name in sorted(self.databases)]
+        if "system.metrics" in sql:
+            return [self.load]
+        if sql.startswith(("EXPLAIN ", "KILL ")) or sql == "SYSTEM FLUSH LOGS" or "system.mutations" in sql:
+            return []
+        if "system.parts" in sql:
+            partitions = self.databases[params["database"]].partitions.get(params["table"], [])
+            return [(partition_id, partition_id) for partition_id in sorted(partitions)]
+        if "system.tables" in sql and "create_table_query" in sql:
+            return list(self.databases[params["database"]].schema)
+        if "system.query_log" in sql:
+            return [
+                (query_id, *self.query_log[query_id]) for query_id in params["query_ids"] if query_id in self.query_log
+            ]
+        match = _CREATE_TABLE_RE.match(sql)
+        if match:
+            db.tables.add(match[1])
+            return []
+        if "_migrations_lock" in sql:
+            self._require_table(db, "_migrations_lock")
+            return self._lock_query(db, sql, params)
+        if "db_migrations_stats" in sql:
+            self._require_table(db, "db_migrations_stats")
+            return self._stats_query(db, sql, params)
+        if "db_migrations_chunks" in sql:
+            self._require_table(db, "db_migrations_chunks")
+            return self._chunks_query(db, sql, params)
+        if "db_migrations_progress" in sql:
+            self._require_table(db, "db_migrations_progress")
+            return self._progress_query(db, sql, params)
+        if "db_migrations" in sql:
+            self._require_table(db, "db_migrations")
+            return self._ledger_query(db, sql, params)
+        for fragment, code in self._failures.items():
+            if fragment in sql:
+                raise ServerException(f"Injected failure for statement containing {fragment!r}", code=code)
+        db.statements.append(sql)
+        return []
+
+    @staticmethod
+    def _require_table(db: _Database, table: str) -> None:
+        if table not in db.tables:
+            raise ServerException(f"Table {table} does not exist", code=UNKNOWN_TABLE_CODE)
+
+    def _next_dt(self, db: _Database) -> dt.datetime:
+        # DateTime64(3) default: millisecond precision, kept strictly increasing so ORDER BY dt is stable.
+        now = self.clock()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        db.last_dt = max(now, db.last_dt + dt.timedelta(milliseconds=1))
+        return db.last_dt
+
+    def _ledger_query(self, db: _Database, sql: str, params: Any) -> list[tuple[Any, ...]]:
+        ledger = sorted(db.ledger, key=lambda row: row.dt)
+        if sql == "SELECT name, kind, checksum, dt FROM db_migrations ORDER BY dt":
+            return [(row.name, row.kind, row.checksum, row.dt) for row in ledger]
+        if sql == "SELECT name, kind, up, rollback, dt, checksum FROM db_migrations ORDER BY dt":
+            return [(row.name, row.kind, row.up, row.rollback, row.dt, row.checksum) for row in ledger]
+        if sql.startswith("SELECT name, up, rollback, kind FROM db_migrations WHERE kind"):
+            rows = [row for row in reversed(ledger) if row.kind == params["kind"]][: params["number"]]
+            return [(row.name, row.up, row.rollback, row.kind) for row in rows]
+        if sql.startswith("INSERT INTO db_migrations"):
+            match = _INSERT_COLUMNS_RE.match(sql)
+            assert match is not None, sql
+            columns = [column.strip() for column in match[2].split(",")]
+            for values in params:
+                row = dict(zip(columns, values))
+                db.ledger.append(
+                    _LedgerRow(
+                        name=row["name"],
+                        kind=row.get("kind", "migration"),
+                        up=row.get("up", ""),
+                        rollback=row.get("rollback", ""),
+                        dt=row.get("dt") or self._next_dt(db),
+                        checksum=row.get("checksum", ""),
+                    )
+                )
+            return []
+        if sql.startswith("DELETE FROM db_migrations WHERE name"):
+            db.ledger = [row for row in db.ledger if row.name != params["name"]]
+            return []
+        if sql.startswith("ALTER TABLE db_migrations UPDATE checksum"):
+            for row in db.ledger:
+                if row.name == params["name"]:
+                    row.checksum = params["checksum"]
+            return []
+        raise NotImplementedError(f"FakeClickHouse does not support: {sql}")
+
+    def _progress_query(self, db: _Database, sql: str, params: Any) -> list[tuple[Any, ...]]:
+        if sql.startswith("SELECT name, statement_index, checksum"):
+            return [(name, index, checksum) for (name, index), checksum in sorted(db.progress.items())]
+        if sql.startswith("INSERT INTO"):
+            for name, index, checksum in params:
+                db.progress[(name, index)] = checksum
+            return []
+        if sql.startswith("DELETE FROM"):
+            db.progress = {key: value for key, value in db.progress.items() if key[0] != params["name"]}
+            return []
+        raise NotImplementedError(f"FakeClickHouse does not support: {sql}")
+
+    def _chunks_query(self, db: _Database, sql: str, params: Any) -> list[tuple[Any, ...]]:
+        if sql.startswith("SELECT partition_id"):
+            key = (params["name"], params["index"], params["checksum"])
+            return [(chunk[3],) for chunk in sorted(db.chunks) if chunk[:3] == key]
+        if sql.startswith("INSERT INTO"):
+            db.chunks.update((name, index, checksum, partition_id) for name, index, checksum, partition_id in params)
+            return []
+        if sql.startswith("DELETE FROM"):
+            db.chunks = {chunk for chunk in db.chunks if chunk[0] != params["name"]}
+            return []
+        raise NotImplementedError(f"FakeClickHouse does not support: {sql}")
+
+    def _stats_query(self, db: _Database, sql: str, params: Any) -> list[tuple[Any, ...]]:
+        if sql.startswith("INSERT INTO"):
+            match = _INSERT_COLUMNS_RE.match(sql)
+            assert match is not None, sql
+            columns = [column.strip() for column in match[2].split(",")]
+            db.stats.extend(dict(zip(columns, values)) for values in params)
+            return []
+        if sql.startswith("SELECT name, started_at, duration_ms"):
+            columns = [column.strip() for column in sql[len("SELECT ") : sql.index(" FROM")].split(",")]
+            latest: dict[str, dict[str, Any]] = {}
+            for row in sorted(db.stats, key=lambda row: row["started_at"], reverse=True):
+                latest.setdefault(row["name"], row)
+            return [tuple(row[column] for column in columns) for row in latest.values()]
+        raise NotImplementedError(f"FakeClickHouse does not support: {sql}")
+
+    def _lock_query(self, db: _Database, sql: str, params: Any) -> list[tuple[Any, ...]]:
+        now = self.clock()
+        if sql.startswith("INSERT INTO") and "latest.2 = toDateTime64" in sql:
+            # Renewal: inserted only while the newest row is still the one the caller read.
+            row = db.locks.get(params["lock_id"])
+            locked_at = row.locked_at.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] if row is not None else ""
+            if row is None or row.locked_by != params["locked_by"] or locked_at != params["locked_at"]:
+                return []
+            if not row.is_locked or row.expires_at <= now:
+                return []
+            db.locks[params["lock_id"]] = _LockRow(
+                params["lock_id"], params["locked_by"], now, now + dt.timedelta(seconds=params["ttl"]), 1
+            )
+            return []
+        match = _LOCK_INSERT_RE.match(sql)
+        if match:
+            is_locked = int(match["is_locked"])
+            ttl = dt.timedelta(seconds=params["ttl"]) if is_locked else dt.timedelta()
+            # argMax over locked_at: the newest row per lock_id wins.
+            db.locks[params["lock_id"]] = _LockRow(params["lock_id"], params["locked_by"], now, now + ttl, is_locked)
+            return []
+        if sql.startswith("SELECT engine_full FROM system.tables"):
+            return [("ReplacingMergeTree(locked_at) ORDER BY lock_id TTL toDateTime(expires_at) + toIntervalDay(1)",)]
+        if sql.startswith("SELECT latest.1, latest.2, latest.3"):
+            row = db.locks.get(params["lock_id"])
+            if row is None or not row.is_locked or row.expires_at <= now:
+                return []
+            return [(row.locked_by, row.locked_at, row.expires_at, now)]
+        raise NotImplementedError(f"FakeClickHouse does not support: {sql}")
+
+
+class FakeClient:
+    """Client connected to one database of a ``FakeClickHouse``, with the ``Client`` methods the migrator uses."""
+
+    def __init__(self, server: FakeClickHouse, database: str) -> None:
+        self.server = server
+        self.database = database
+        self.connection = SimpleNamespace(send_receive_timeout=0)
+        self.connected = True
+
+    def execute(
+        self,
+        query: str,
+        params: Any = None,
+        settings: dict[str, Any] | None = None,
+        query_id: str | None = None,
+        **kwargs: Any,
+    ) -> list[tuple[Any, ...]]:
+        return self.server.execute(self.database, query, params, query_id=query_id or "")
+
+    def execute_with_progress(
+        self,
+        query: str,
+        params: Any = None,
+        settings: dict[str, Any] | None = None,
+        query_id: str | None = None,
+        **kwargs: Any,
+    ) -> FakeProgressResult:
+        return FakeProgressResult(
+            self.server.progress_packets(query),
+            lambda: self.server.execute(self.database, query, params, query_id=query_id or ""),
+        )
+
+    def cancel(self) -> None:
+        pass
+
+    def disconnect(self) -> None:
+        self.connected = False
+
+
+class FakeProgressResult:
+    """Iterates progress packets like ``ProgressQueryResult``; the statement runs after the last packet."""
+
+    def __init__(self, packets: Sequence[dict[str, int]], run: Callable[[], list[tuple[Any, ...]]]) -> None:
+        self.progress_totals = SimpleNamespace(rows=0, bytes=0, total_rows=0, written_rows=0, written_bytes=0)
+        self._packets = iter(packets)
+        self._run: Callable[[], list[tuple[Any, ...]]] | None = run
+        self._result: list[tuple[Any, ...]] = []
+
+    def __iter__(self) -> FakeProgressResult:
+        return self
+
+    def __next__(self) -> tuple[int, int]:
+        packet = next(self._packets, None)
+        if packet is None:
+            if self._run is not None:
+                run, self._run = self._run, None
+                self._result = run()
+            raise StopIteration
+        for key, value in packet.items():
+            setattr(self.progress_totals, key, getattr(self.progress_totals, key) + value)
+        return self.progress_totals.rows, self.progress_totals.total_rows
+
+    def get_result(self) -> list[tuple[Any, ...]]:
+        for _ in self:
+            pass
+        return self._result
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+
+from kazoo.exceptions import BadVersionError, NodeExistsError, NoNodeError
+from kazoo.protocol.states import ZnodeStat
+
+
+@dataclass
+class _Node:
+    value: bytes
+    ctime: int
+    mtime: int
+    version: int
+    ephemeral_owner: int
+
+
+class FakeKeeper:
+    """In-memory stand-in for ClickHouse Keeper, serving the node operations ``KeeperLockBackend`` uses.
+
+    Each ``connect`` opens a session. Ephemeral nodes are deleted when their session is stopped or expired,
+    like a real server does after the session timeout.
+    """
+
+    def __init__(self) -> None:
+        self.nodes: dict[str, _Node] = {}
+        self._sessions = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def connect(self) -> FakeKazooClient:
+        return FakeKazooClient(self, next(self._sessions))
+
+    def new_session(self) -> int:
+        return next(self._sessions)
+
+    def end_session(self, session: int) -> None:
+        with self._lock:
+            for path in [path for path, node in self.nodes.items() if node.ephemeral_owner == session]:
+                del self.nodes[path]
+
+
+class FakeKazooClient:
+    """Session of a ``FakeKeeper`` with the ``KazooClient`` methods ``KeeperLockBackend`` uses."""
+
+    def __init__(self, server: FakeKeeper, session: int) -> None:
+        self.server = server
+        self.session = session
+
+    @property
+    def client_id(self) -> tuple[int, bytes]:
+        return self.session, b""
+
+    def expire_session(self) -> None:
+        """Drop the session and reconnect with a new one, as after a network partition longer than its timeout."""
+        self.server.end_session(self.session)
+        self.session = self.server.new_session()
+
+    def stop(self) -> None:
+        self.server.end_session(self.session)
+
+    def _node(self, path: str) -> _Node:
+        node = self.server.nodes.get(path)
+        if node is None:
+            raise NoNodeError(path)
+        return node
+
+    def create(self, path: str, value: bytes = b"", ephemeral: bool = False, makepath: bool = False) -> str:
+        with self.server._lock:
+            if path in self.server.nodes:
+                raise NodeExistsError(path)
+            now = int(time.time() * 1000)
+            self.server.nodes[path] = _Node(value, now, now, 0, self.session if ephemeral else 0)
+            return path
+
+    def get(self, path: str) -> tuple[bytes, ZnodeStat]:
+        with self.server._lock:
+            node = self._node(path)
+            stat = ZnodeStat(0, 0, node.ctime, node.mtime, node.version, 0, 0, node.ephemeral_owner, 0, 0, 0)
+            return node.value, stat
+
+    def set(self, path: str, value: bytes, version: int = -1) -> None:
+        with self.server._lock:
+            node = self._node(path)
+            if version not in (-1, node.version):
+                raise BadVersionError(path)
+            node.value = value
+            node.mtime = int(time.time() * 1000)
+            node.version += 1
+
+    def delete(self, path: str, version: int = -1) -> None:
+        with self.server._lock:
+            node = self._node(path)
+            if version not in (-1, node.version):
+                raise BadVersionError(path)
+            del self.server.nodes[path]
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from py_clickhouse_migrator.aio import AsyncMigrationLock, AsyncMigrator
+from py_clickhouse_migrator.lock import LockError, LockInfo, LockLostError, LockTimeoutError, MigrationLock
+from py_clickhouse_migrator.migrator import Migrator
+from tests.fake_clickhouse import FakeClickHouse
+from tests.helpers import render_test_migration_content
+
+URL = "clickhouse://default@localhost:9000/test"
+HOLDER = LockInfo(locked_by="other", locked_at=dt.datetime(2026, 1, 1), expires_at=dt.datetime(2026, 1, 1, 0, 10))
+
+
+def test_async_migrator_delegates_to_migrator() -> None:
+    migrator = MagicMock()
+    migrator.up.return_value = ["001.sql"]
+
+    async def run() -> list[str]:
+        async with AsyncMigrator(migrator) as async_migrator:
+            applied = await async_migrator.up(n=2, validate=False)
+            await async_migrator.rollback(number=1)
+            await async_migrator.show_migrations(show_all=True)
+            return applied
+
+    assert asyncio.run(run()) == ["001.sql"]
+    migrator.up.assert_called_once_with(n=2, dry_run=False, allow_dirty=False, validate=False)
+    migrator.rollback.assert_called_once_with(number=1, dry_run=False, validate=True)
+    migrator.show_migrations.assert_called_once_with(show_all=True, ledger=None)
+    migrator.close.assert_called_once_with()
+
+
+def test_async_migrator_runs_calls_on_its_own_thread() -> None:
+    migrator = MagicMock()
+    threads: list[str] = []
+
+    def up(**kwargs: object) -> list[str]:
+        threads.append(threading.current_thread().name)
+        return []
+
+    migrator.up.side_effect = up
+
+    async def run() -> AsyncMigrator:
+        async with AsyncMigrator(migrator) as async_migrator:
+            await async_migrator.up()
+            await async_migrator.up()
+        return async_migrator
+
+    async_migrator = asyncio.run(run())
+    assert threads == ["py_clickhouse_migrator_0"] * 2
+    with pytest.raises(RuntimeError, match="shutdown"):
+        async_migrator._executor.submit(print)
+
+
+def test_async_migrator_leaves_passed_executor_running() -> None:
+    migrator = MagicMock()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="app") as executor:
+        migrator.up.side_effect = lambda **kwargs: [threading.current_thread().name]
+
+        async def run() -> list[str]:
+            async with AsyncMigrator(migrator, executor=executor) as async_migrator:
+                return await async_migrator.up()
+
+        assert asyncio.run(run()) == ["app_0"]
+        assert executor.submit(lambda: 1).result() == 1
+
+
+def test_async_migrator_create_builds_migrator_off_loop() -> None:
+    with patch("py_clickhouse_migrator.aio.Migrator") as mock_cls:
+        async_migrator = asyncio.run(AsyncMigrator.create(database_url="clickhouse://localhost/db", jobs=2))
+
+    mock_cls.assert_called_once_with(database_url="clickhouse://localhost/db", jobs=2)
+    assert async_migrator.migrator is mock_cls.return_value
+
+
+def test_async_migrators_run_concurrently() -> None:
+    migrators = [MagicMock() for _ in range(3)]
+    started = 0
+    all_started = asyncio.Event()
+
+    async def run() -> None:
+        loop = asyncio.get_running_loop()
+
+        def up(**kwargs: object) -> list[str]:
+            nonlocal started
+            started += 1
+            if started == len(migrators):
+                loop.call_soon_threadsafe(all_started.set)
+            asyncio.run_coroutine_threadsafe(asyncio.wait_for(all_started.wait(), 5), loop).result()
+            return []
+
+        for migrator in migrators:
+            migrator.up.side_effect = up
+        await asyncio.gather(*(AsyncMigrator(migrator).up() for migrator in migrators))
+
+    asyncio.run(run())
+    assert started == 3
+
+
+def _make_lock(**kwargs: object) -> tuple[AsyncMigrationLock, MagicMock]:
+    sync_lock = MagicMock()
+    lock = AsyncMigrationLock(client=MagicMock(), db="test", **kwargs)  # type: ignore[arg-type]
+    lock._lock = sync_lock
+    return lock, sync_lock
+
+
+def test_async_lock_acquire_and_release() -> None:
+    lock, sync_lock = _make_lock()
+    sync_lock.get_lock_info.return_value = None
+    sync_lock.try_acquire.return_value = None
+
+    async def run() -> None:
+        async with lock:
+            pass
+
+    asyncio.run(run())
+    sync_lock.try_acquire.assert_called_once_with()
+    sync_lock.release.assert_called_once_with(force=False)
+
+
+def test_async_lock_held_raises() -> None:
+    lock, sync_lock = _make_lock()
+    sync_lock.get_lock_info.return_value = HOLDER
+
+    with pytest.raises(LockError, match="held by other"):
+        asyncio.run(lock.acquire())
+    sync_lock.try_acquire.assert_not_called()
+
+
+def test_async_lock_retries_with_asyncio_sleep() -> None:
+    lock, sync_lock = _make_lock()
+    sync_lock.get_lock_info.return_value = HOLDER
+
+    with (
+        patch("py_clickhouse_migrator.aio.asyncio.sleep", new_callable=AsyncMock) as mock_sleep,
+        pytest.raises(LockTimeoutError, match="Timed out after 2 retries"),
+    ):
+        asyncio.run(lock.acquire(retry_count=2, retry_delay=0.5))
+
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.5, 0.5]
+    assert sync_lock.get_lock_info.call_count == 3
+
+
+def test_async_lock_creates_sync_lock_lazily() -> None:
+    with patch("py_clickhouse_migrator.aio.MigrationLock") as mock_cls:
+        mock_cls.return_value.is_locked.return_value = False
+        lock = AsyncMigrationLock(client=MagicMock(), db="test", ttl=60, cluster="main")
+        mock_cls.assert_not_called()
+        assert asyncio.run(lock.is_locked()) is False
+
+    mock_cls.assert_called_once()
+    assert mock_cls.call_args.kwargs["cluster"] == "main"
+    assert mock_cls.call_args.kwargs["ttl"] == 60
+
+
+def test_async_up_stops_when_lock_is_lost(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    (tmp_path / "001.sql").write_text(render_test_migration_content("SELECT 2", ""))
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server)
+    other = MigrationLock(server.connect(URL), db="test")  # type: ignore[arg-type]
+
+    async def run() -> None:
+        async with AsyncMigrator(migrator) as async_migrator:
+            async with async_migrator.lock(ttl=60, heartbeat_interval=0.01) as lock:
+                assert migrator.lock is not None
+                other.release(force=True)
+                other.acquire()
+                while not lock.lost:
+                    await asyncio.sleep(0.01)
+                with pytest.raises(LockLostError):
+                    await async_migrator.up(validate=False)
+            assert migrator.lock is None
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert server.applied_names("test") == []
+    assert other.get_lock_info().locked_by == other._locked_by  # type: ignore[union-attr]
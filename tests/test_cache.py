@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from clickhouse_driver.errors import ServerException
+
+from py_clickhouse_migrator.cache import CACHE_FILENAME, FileSignature, MigrationCache, get_file_signature
+from py_clickhouse_migrator.checksum import compute_checksum
+from py_clickhouse_migrator.errors import InvalidMigrationError
+from py_clickhouse_migrator.migrator import Migration, MigrationDirection, Migrator
+from tests.helpers import render_test_migration_content, render_test_migration_section
+
+FAKE_URL = "clickhouse://default@localhost:9000/test"
+OLD_MTIME_NS = 1_600_000_000_000_000_000
+APPLIED_AT = dt.datetime(2026, 1, 1)
+
+
+def _write_migration(directory: Path, name: str, up: str, rollback: str = "SELECT 1") -> str:
+    filepath = directory / name
+    filepath.write_text(render_test_migration_content(up, rollback), encoding="utf-8")
+    os.utime(filepath, ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+    return str(filepath)
+
+
+def _make_migrator(migrations_dir: str, use_cache: bool = True) -> Migrator:
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", return_value=MagicMock()),
+        patch.object(Migrator, "check_migrations_table"),
+    ):
+        return Migrator(database_url=FAKE_URL, migrations_dir=migrations_dir, use_cache=use_cache)
+
+
+# --- MigrationCache ---
+
+
+def test_cache_roundtrip(tmp_path: Path) -> None:
+    filepath = _write_migration(tmp_path, "001.sql", "SELECT 1")
+    signature = get_file_signature(filepath)
+
+    cache = MigrationCache(str(tmp_path / CACHE_FILENAME))
+    assert cache.get_checksum("001.sql", signature) is None
+    cache.set_checksum("001.sql", signature, "abc")
+    cache.save()
+
+    reloaded = MigrationCache(str(tmp_path / CACHE_FILENAME))
+    assert reloaded.get_checksum("001.sql", signature) == "abc"
+
+
+@pytest.mark.parametrize(
+    "changed",
+    [
+        FileSignature(size=2, mtime_ns=OLD_MTIME_NS, inode=3),
+        FileSignature(size=1, mtime_ns=OLD_MTIME_NS + 1, inode=3),
+        FileSignature(size=1, mtime_ns=OLD_MTIME_NS, inode=4),
+    ],
+)
+def test_cache_invalidated_by_signature_change(tmp_path: Path, changed: FileSignature) -> None:
+    cache = MigrationCache(str(tmp_path / CACHE_FILENAME))
+    cache.set_checksum("001.sql", FileSignature(size=1, mtime_ns=OLD_MTIME_NS, inode=3), "abc")
+
+    assert cache.get_checksum("001.sql", changed) is None
+
+
+def test_cache_skips_recently_modified_files(tmp_path: Path) -> None:
+    filepath = tmp_path / "001.sql"
+    filepath.write_text("content", encoding="utf-8")
+    signature = get_file_signature(str(filepath))
+
+    cache = MigrationCache(str(tmp_path / CACHE_FILENAME))
+    cache.set_checksum("001.sql", signature, "abc")
+
+    assert cache.get_checksum("001.sql", signature) is None
+
+
+def test_cache_save_keeps_only_used_entries(tmp_path: Path) -> None:
+    path = str(tmp_path / CACHE_FILENAME)
+    signature = FileSignature(size=1, mtime_ns=OLD_MTIME_NS, inode=3)
+    cache = MigrationCache(path)
+    cache.set_checksum("001.sql", signature, "aaa")
+    cache.set_checksum("002.sql", signature, "bbb")
+    cache.save()
+
+    cache = MigrationCache(path)
+    assert cache.get_checksum("002.sql", signature) == "bbb"
+    cache.save()
+
+    with open(path, encoding="utf-8") as f:
+        assert list(json.load(f)["entries"]) == ["002.sql"]
+
+
+@pytest.mark.parametrize("content", ["not json", '{"version": 0, "entries": {}}', '{"version": 1}', "[]"])
+def test_cache_ignores_unreadable_file(tmp_path: Path, content: str) -> None:
+    path = tmp_path / CACHE_FILENAME
+    path.write_text(content, encoding="utf-8")
+
+    cache = MigrationCache(str(path))
+
+    assert cache.get_checksum("001.sql", FileSignature(size=1, mtime_ns=OLD_MTIME_NS, inode=3)) is None
+
+
+def test_cache_save_ignores_unwritable_directory(tmp_path: Path) -> None:
+    cache = MigrationCache(str(tmp_path / "missing" / CACHE_FILENAME))
+    cache.set_checksum("001.sql", FileSignature(size=1, mtime_ns=OLD_MTIME_NS, inode=3), "abc")
+
+    cache.save()
+
+    assert not (tmp_path / "missing").exists()
+
+
+# --- Migrator.validate_checksums ---
+
+
+def test_validate_checksums_uses_cache_for_unchanged_files(tmp_path: Path) -> None:
+    up = "CREATE TABLE t (id Int32) ENGINE = MergeTree ORDER BY id"
+    _write_migration(tmp_path, "001.sql", up)
+    checksum = compute_checksum(render_test_migration_section(up), render_test_migration_section("SELECT 1"))
+
+    migrator = _make_migrator(str(tmp_path))
+    migrator.ch_client.execute.return_value = [("001.sql", "migration", checksum, APPLIED_AT)]
+    assert migrator.validate_checksums() == []
+    assert (tmp_path / CACHE_FILENAME).exists()
+
+    migrator = _make_migrator(str(tmp_path))
+    migrator.ch_client.execute.return_value = [("001.sql", "migration", checksum, APPLIED_AT)]
+    with patch("py_clickhouse_migrator.migrator.load_migration_sections") as mock_load:
+        assert migrator.validate_checksums() == []
+    mock_load.assert_not_called()
+
+
+def test_validate_checksums_detects_change_after_caching(tmp_path: Path) -> None:
+    up = "CREATE TABLE t (id Int32) ENGINE = MergeTree ORDER BY id"
+    _write_migration(tmp_path, "001.sql", up)
+    checksum = compute_checksum(render_test_migration_section(up), render_test_migration_section("SELECT 1"))
+
+    migrator = _make_migrator(str(tmp_path))
+    migrator.ch_client.execute.return_value = [("001.sql", "migration", checksum, APPLIED_AT)]
+    assert migrator.validate_checksums() == []
+
+    _write_migration(tmp_path, "001.sql", "CREATE TABLE t (id Int32, name String) ENGINE = MergeTree ORDER BY id")
+    mismatches = migrator.validate_checksums()
+
+    assert [mismatch.name for mismatch in mismatches] == ["001.sql"]
+
+
+def test_validate_checksums_without_cache_does_not_write_file(tmp_path: Path) -> None:
+    _write_migration(tmp_path, "001.sql", "SELECT 1")
+
+    migrator = _make_migrator(str(tmp_path), use_cache=False)
+    migrator.ch_client.execute.return_value = [("001.sql", "migration", "stored", APPLIED_AT)]
+    migrator.validate_checksums()
+
+    assert not (tmp_path / CACHE_FILENAME).exists()
+
+
+def test_validate_checksums_in_parallel_keeps_ledger_order(tmp_path: Path) -> None:
+    rows = []
+    for index in range(6):
+        name = f"00{index}.sql"
+        _write_migration(tmp_path, name, f"SELECT {index}")
+        rows.append((name, "migration", "stored" if index % 2 else "", APPLIED_AT))
+
+    migrator = _make_migrator(str(tmp_path), use_cache=False)
+    migrator.jobs = 3
+    migrator.ch_client.execute.return_value = rows[::-1]
+    parallel = migrator.validate_checksums()
+
+    migrator.jobs = 1
+    sequential = migrator.validate_checksums()
+
+    assert [mismatch.name for mismatch in parallel] == ["005.sql", "003.sql", "001.sql"]
+    assert parallel == sequential
+
+
+def test_parallel_checksums_spawn_worker_processes(tmp_path: Path) -> None:
+    for index in range(3):
+        _write_migration(tmp_path, f"00{index}.sql", f"SELECT {index}")
+    migrator = _make_migrator(str(tmp_path), use_cache=False)
+    migrator.jobs = 2
+    migrator.ch_client.execute.return_value = [
+        (f"00{index}.sql", "migration", "stored", APPLIED_AT) for index in range(3)
+    ]
+
+    with patch("py_clickhouse_migrator.migrator.ProcessPoolExecutor", wraps=ProcessPoolExecutor) as mock_pool:
+        migrator.validate_checksums()
+
+    assert mock_pool.call_args.kwargs["mp_context"].get_start_method() == "spawn"
+
+
+# --- validation cache ---
+
+
+def test_cache_validated_keys_roundtrip(tmp_path: Path) -> None:
+    path = str(tmp_path / CACHE_FILENAME)
+    cache = MigrationCache(path)
+    assert not cache.is_validated("24.3:abc")
+    cache.set_validated("24.3:abc")
+    cache.save()
+
+    reloaded = MigrationCache(path)
+    assert reloaded.is_validated("24.3:abc")
+    assert not reloaded.is_validated("24.4:abc")
+
+
+def test_cache_validation_save_keeps_checksum_entries(tmp_path: Path) -> None:
+    path = str(tmp_path / CACHE_FILENAME)
+    signature = FileSignature(size=1, mtime_ns=OLD_MTIME_NS, inode=3)
+    cache = MigrationCache(path)
+    cache.set_checksum("001.sql", signature, "aaa")
+    cache.save()
+
+    cache = MigrationCache(path)
+    cache.set_validated("24.3:abc")
+    cache.save()
+
+    assert MigrationCache(path).get_checksum("001.sql", signature) == "aaa"
+
+
+def _explain_calls(migrator: Migrator) -> list[str]:
+    return [call.args[0] for call in migrator.ch_client.execute.call_args_list if call.args[0].startswith("EXPLAIN")]
+
+
+def test_validate_statements_skips_previously_validated(tmp_path: Path) -> None:
+    migrator = _make_migrator(str(tmp_path))
+    migrator.ch_client.execute.return_value = [("24.3.1.1",)]
+    migrator.validate_migrations(
+        [Migration(name="001.sql", up="-- @stmt\nSELECT 1", rollback="")], direction=MigrationDirection.UP
+    )
+    assert _explain_calls(migrator) == ["EXPLAIN AST SELECT 1"]
+
+    migrator = _make_migrator(str(tmp_path))
+    migrator.ch_client.execute.return_value = [("24.3.1.1",)]
+    migrator.validate_migrations(
+        [Migration(name="001.sql", up="-- @stmt\nSELECT 1\n-- @stmt\nSELECT 2", rollback="")],
+        direction=MigrationDirection.UP,
+    )
+    assert _explain_calls(migrator) == ["EXPLAIN AST SELECT 2"]
+
+
+def test_validate_statements_revalidates_on_server_version_change(tmp_path: Path) -> None:
+    migration = Migration(name="001.sql", up="-- @stmt\nSELECT 1", rollback="")
+    migrator = _make_migrator(str(tmp_path))
+    migrator.ch_client.execute.return_value = [("24.3.1.1",)]
+    migrator.validate_migrations([migration], direction=MigrationDirection.UP)
+
+    migrator = _make_migrator(str(tmp_path))
+    migrator.ch_client.execute.return_value = [("24.8.1.1",)]
+    migrator.validate_migrations([migration], direction=MigrationDirection.UP)
+
+    assert _explain_calls(migrator) == ["EXPLAIN AST SELECT 1"]
+
+
+def test_validate_statements_does_not_cache_failures(tmp_path: Path) -> None:
+    def execute(query: str, settings: object = None) -> list[tuple[str]]:
+        if query.startswith("EXPLAIN"):
+            raise ServerException("Syntax error", code=62)
+        return [("24.3.1.1",)]
+
+    migration = Migration(name="001.sql", up="-- @stmt\nSELECT FROM", rollback="")
+    for _ in range(2):
+        migrator = _make_migrator(str(tmp_path))
+        migrator.ch_client.execute.side_effect = execute
+        with pytest.raises(InvalidMigrationError):
+            migrator.validate_migrations([migration], direction=MigrationDirection.UP)
+        assert _explain_calls(migrator) == ["EXPLAIN AST SELECT FROM"]
@@ -7,7 +7,7 @@ import pytest
 from click.testing import CliRunner
 from clickhouse_driver import Client
 
-from py_clickhouse_migrator.checksum import compute_checksum, normalize_content
+from py_clickhouse_migrator.checksum import compute_checksum, compute_statement_checksum, normalize_content
 from py_clickhouse_migrator.errors import ChecksumMismatchError, InvalidMigrationError
 from py_clickhouse_migrator.migrator import (
     DEFAULT_MIGRATIONS_DIR,
@@ -99,6 +99,13 @@ def test_checksum_no_collision_on_concatenation() -> None:
     )
 
 
+def test_statement_checksum_ignores_whitespace_changes() -> None:
+    assert compute_statement_checksum("SELECT 1;   \r\n\nSELECT 2;") == compute_statement_checksum(
+        "SELECT 1;\nSELECT 2;"
+    )
+    assert compute_statement_checksum("SELECT 1;") != compute_statement_checksum("SELECT 2;")
+
+
 # --- checksum save ---
 
 
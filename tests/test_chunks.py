@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from py_clickhouse_migrator.chunks import Partition, render_chunk
+from py_clickhouse_migrator.errors import InvalidMigrationError, MigrationParseError
+from py_clickhouse_migrator.migration_parser import ChunkSpec, MigrationSections, parse_migration_statements
+from py_clickhouse_migrator.migrator import Migrator
+from tests.fake_clickhouse import FakeClickHouse
+
+BACKFILL = "INSERT INTO events_v2 SELECT * FROM events WHERE _partition_id = {partition_id}"
+MIGRATION = f"""-- migrator:up
+-- @stmt
+CREATE TABLE events_v2 AS events
+
+-- @stmt chunk_by=partition table=events jobs=2
+{BACKFILL}
+
+-- migrator:down
+-- @stmt chunk_by=partition table=events_v2
+ALTER TABLE events_v2 DROP PARTITION {{partition}}
+"""
+
+
+def _parse(up: str, rollback: str = "") -> tuple[list[str], dict[int, ChunkSpec]]:
+    statements, chunks = parse_migration_statements(MigrationSections(up=up, rollback=rollback))
+    return statements.up, chunks.up
+
+
+def test_parse_chunked_statement() -> None:
+    statements, chunks = _parse(
+        "-- @stmt\n\n-- @stmt\nSELECT 1\n-- @stmt   chunk_by=partition  table=analytics.events\n"
+        "INSERT INTO t SELECT * FROM events WHERE _partition_id = {partition_id}"
+    )
+
+    assert statements == ["SELECT 1", "INSERT INTO t SELECT * FROM events WHERE _partition_id = {partition_id}"]
+    assert chunks == {1: ChunkSpec(table="events", database="analytics", jobs=1)}
+
+
+@pytest.mark.parametrize(
+    ("marker", "error"),
+    [
+        ("-- @stmt table=events", "require chunk_by=partition"),
+        ("-- @stmt chunk_by=month table=events", "require chunk_by=partition"),
+        ("-- @stmt chunk_by=partition", "requires table="),
+        ("-- @stmt chunk_by=partition table=a.b.c", "requires table="),
+        ("-- @stmt chunk_by=partition table=events jobs=0", "jobs must be a positive integer"),
+    ],
+)
+def test_parse_invalid_chunk_options(marker: str, error: str) -> None:
+    with pytest.raises(MigrationParseError, match=error):
+        _parse(f"{marker}\nINSERT INTO t SELECT * FROM events WHERE _partition_id = {{partition_id}}")
+
+
+@pytest.mark.parametrize(
+    "line", ["-- @stmt users table", "-- @stmt chunk_by=partition table=events retries=3", "-- @stmt note: jobs=2"]
+)
+def test_statement_marker_with_other_text_stays_in_statement(line: str) -> None:
+    statements, chunks = _parse(f"-- @stmt\nSELECT 1\n{line}\nFROM users")
+
+    assert statements == [f"SELECT 1\n{line}\nFROM users"]
+    assert chunks == {}
+
+
+def test_parse_chunked_statement_requires_placeholder() -> None:
+    with pytest.raises(MigrationParseError, match="must reference"):
+        _parse("-- @stmt chunk_by=partition table=events\nINSERT INTO t SELECT * FROM events")
+
+
+def test_render_chunk() -> None:
+    statement = "ALTER TABLE t DELETE IN PARTITION {partition} WHERE _partition_id = {partition_id}"
+
+    assert render_chunk(statement, Partition("2024'01", "('a', 1)")) == (
+        "ALTER TABLE t DELETE IN PARTITION ('a', 1) WHERE _partition_id = '2024\\'01'"
+    )
+
+
+@pytest.fixture
+def server() -> FakeClickHouse:
+    server = FakeClickHouse(databases=["test"])
+    server.add_partitions("test", "events", ["202401", "202402", "202403"])
+    return server
+
+
+@pytest.fixture
+def migrator(server: FakeClickHouse, fake_migrator: Callable[..., Migrator], tmp_path: Path) -> Migrator:
+    (tmp_path / "001_backfill.sql").write_text(MIGRATION, encoding="utf-8")
+    return fake_migrator(server, record_stats=True)
+
+
+def _backfills(server: FakeClickHouse) -> list[str]:
+    return [statement for statement in server.statements("test") if statement.startswith("INSERT")]
+
+
+def test_up_runs_chunked_statement_per_partition(server: FakeClickHouse, migrator: Migrator) -> None:
+    server.latency = 0.01
+    server.reset_stats()
+
+    assert migrator.up() == ["001_backfill.sql"]
+
+    assert sorted(_backfills(server)) == [
+        BACKFILL.replace("{partition_id}", f"'{partition_id}'") for partition_id in ("202401", "202402", "202403")
+    ]
+    assert ("test", "EXPLAIN AST " + BACKFILL.replace("{partition_id}", "'0'")) in server.queries
+    # jobs=2: two worker connections on top of the migrator's own.
+    assert server.connections == 2
+    assert server.max_in_flight == 2
+    assert server.databases["test"].chunks == set()
+    stats = server.databases["test"].stats
+    assert len(stats) == 1 and stats[0]["read_rows"] == 4
+
+
+def test_failed_chunk_resumes_with_pending_partitions(server: FakeClickHouse, migrator: Migrator) -> None:
+    server.fail_on("'202402'")
+
+    with pytest.raises(InvalidMigrationError, match="202402"):
+        migrator.up(validate=False)
+
+    assert server.applied_names("test") == []
+    done = {chunk[3] for chunk in server.databases["test"].chunks}
+    assert "202402" not in done
+    server.clear_failures()
+    server.databases["test"].statements.clear()
+
+    assert migrator.up(validate=False) == ["001_backfill.sql"]
+
+    pending = sorted({"202401", "202402", "202403"} - done)
+    assert sorted(_backfills(server)) == [
+        BACKFILL.replace("{partition_id}", f"'{partition_id}'") for partition_id in pending
+    ]
+    assert "CREATE TABLE events_v2 AS events" not in server.statements("test")
+
+
+def test_rollback_runs_chunked_statement_per_partition(server: FakeClickHouse, migrator: Migrator) -> None:
+    migrator.up(validate=False)
+    server.add_partitions("test", "events_v2", ["202401", "202402"])
+
+    migrator.rollback(validate=False)
+
+    assert server.statements("test")[-2:] == [
+        "ALTER TABLE events_v2 DROP PARTITION 202401",
+        "ALTER TABLE events_v2 DROP PARTITION 202402",
+    ]
+    assert server.applied_names("test") == []
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import datetime as dt
 import os
+import sys
 from collections.abc import Generator
 from unittest.mock import MagicMock, patch
 
@@ -11,6 +12,7 @@ import click
 import pytest
 from click.testing import CliRunner
 
+from py_clickhouse_migrator import cli
 from py_clickhouse_migrator.cli import main
 from py_clickhouse_migrator.errors import (
     BaselineError,
@@ -20,12 +22,14 @@ from py_clickhouse_migrator.errors import (
     InvalidMigrationError,
     MigrationDirectoryNotFoundError,
     MissingDatabaseUrlError,
+    MutationTimeoutError,
 )
 from py_clickhouse_migrator.lock import LockError, LockInfo
 from py_clickhouse_migrator.migrator import (
     DEFAULT_MIGRATIONS_DIR,
     ChecksumMismatch,
     Migration,
+    MigrationStats,
     Migrator,
     ShowMigrationsResult,
 )
@@ -142,6 +146,7 @@ def test_up_dry_run_output_visible_with_quiet(runner: CliRunner) -> None:
     ]
     with (
         patch.object(Migrator, "__init__", return_value=None),
+        patch.object(Migrator, "load_ledger"),
         patch.object(Migrator, "check_integrity"),
         patch.object(Migrator, "get_migrations_for_apply", return_value=migrations),
         patch.object(Migrator, "validate_migrations"),
@@ -316,14 +321,37 @@ def test_cli_show(runner: CliRunner, mock_migrator: MagicMock) -> None:
     result = runner.invoke(main, ["--url", FAKE_URL, "show"])
     assert result.exit_code == 0
     assert "Applied: 0" in result.output
-    mock_migrator.show_migrations.assert_called_once_with(show_all=False)
+    mock_migrator.show_migrations.assert_called_once_with(show_all=False, ledger=mock_migrator.load_ledger.return_value)
 
 
 def test_cli_show_all(runner: CliRunner, mock_migrator: MagicMock) -> None:
     mock_migrator.show_migrations.return_value = ShowMigrationsResult("Applied: 5", "")
     result = runner.invoke(main, ["--url", FAKE_URL, "show", "--all"])
     assert result.exit_code == 0
-    mock_migrator.show_migrations.assert_called_once_with(show_all=True)
+    mock_migrator.show_migrations.assert_called_once_with(show_all=True, ledger=mock_migrator.load_ledger.return_value)
+
+
+@pytest.mark.parametrize(("args", "limit"), [(["--stats"], 10), (["--stats", "--all"], None)])
+def test_cli_show_stats(runner: CliRunner, mock_migrator: MagicMock, args: list[str], limit: int | None) -> None:
+    mock_migrator.show_migrations.return_value = ShowMigrationsResult("Applied: 1", "")
+    mock_migrator.get_migration_stats.return_value = [
+        MigrationStats("001.sql", dt.datetime(2026, 1, 1), 1500, 0, [1500]),
+    ]
+    result = runner.invoke(main, ["--url", FAKE_URL, "show", *args])
+    assert result.exit_code == 0
+    assert "Slowest migrations:" in result.output
+    assert "001.sql  1.5s" in result.output
+    mock_migrator.load_ledger.assert_called_once_with()
+    mock_migrator.get_migration_stats.assert_called_once_with(
+        limit=limit, ledger=mock_migrator.load_ledger.return_value
+    )
+
+
+def test_cli_show_without_stats_flag(runner: CliRunner, mock_migrator: MagicMock) -> None:
+    mock_migrator.show_migrations.return_value = ShowMigrationsResult("Applied: 1", "")
+    result = runner.invoke(main, ["--url", FAKE_URL, "show"])
+    assert "Slowest migrations:" not in result.output
+    mock_migrator.get_migration_stats.assert_not_called()
 
 
 def test_cli_show_warning_to_stderr(runner: CliRunner, mock_migrator: MagicMock) -> None:
@@ -413,6 +441,19 @@ def test_cli_repair_nothing(runner: CliRunner, mock_migrator: MagicMock) -> None
     assert "Nothing to repair" in result.output
 
 
+def test_cli_repair_reads_ledger_once(runner: CliRunner, mock_migrator: MagicMock) -> None:
+    mock_migrator.validate_checksums.return_value = [
+        ChecksumMismatch("001.sql", "aaa111bbb222ccc", "ddd444eee555fff"),
+    ]
+    mock_migrator.repair.return_value = ["001.sql"]
+    result = runner.invoke(main, ["--url", FAKE_URL, "repair"])
+    assert result.exit_code == 0
+    mock_migrator.load_ledger.assert_called_once_with()
+    ledger = mock_migrator.load_ledger.return_value
+    mock_migrator.validate_checksums.assert_called_once_with(ledger=ledger)
+    mock_migrator.repair.assert_called_once_with(ledger=ledger)
+
+
 def test_cli_repair_with_mismatch(runner: CliRunner, mock_migrator: MagicMock) -> None:
     mock_migrator.validate_checksums.return_value = [
         ChecksumMismatch("001.sql", "aaa111bbb222ccc", "ddd444eee555fff"),
@@ -448,10 +489,26 @@ def test_cli_force_unlock(runner: CliRunner, mock_migrator: MagicMock) -> None:
 
     assert result.exit_code == 0
     assert "Lock forcefully released" in result.output
-    mock_lock_cls.assert_called_once_with(client=mock_migrator.ch_client, db="test", cluster="")
+    mock_lock_cls.assert_called_once_with(client=mock_migrator.ch_client, db="test", cluster="", backend=None)
     mock_lock.release.assert_called_once_with(force=True)
 
 
+def test_cli_keeper_hosts_without_kazoo(
+    runner: CliRunner, mock_migrator: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    mock_migrator.get_db_name.return_value = "test"
+    for name in [name for name in sys.modules if name.split(".")[0] == "kazoo"] + ["kazoo"]:
+        monkeypatch.setitem(sys.modules, name, None)
+    monkeypatch.delitem(sys.modules, "py_clickhouse_migrator.keeper", raising=False)
+    monkeypatch.delitem(vars(cli), "connect_keeper", raising=False)
+    monkeypatch.delitem(vars(cli), "KeeperLockBackend", raising=False)
+
+    result = runner.invoke(main, ["--url", FAKE_URL, "--keeper-hosts", "keeper:9181", "force-unlock"])
+
+    assert result.exit_code == 2
+    assert "pip install 'py-clickhouse-migrator[keeper]'" in result.stderr
+
+
 # --- lock-info ---
 
 
@@ -577,3 +634,44 @@ def test_connect_retries_passed_to_migrator(runner: CliRunner) -> None:
     call_kwargs = mock_cls.call_args[1]
     assert call_kwargs["connect_retries"] == 5
     assert call_kwargs["connect_retries_interval"] == 2
+
+
+@pytest.mark.parametrize("cmd", ["up", "show", "repair"])
+def test_jobs_option_passed_to_migrator(runner: CliRunner, cmd: str) -> None:
+    with patch("py_clickhouse_migrator.cli.Migrator") as mock_cls:
+        mock_cls.return_value.show_migrations.return_value = ShowMigrationsResult("ok", "")
+        mock_cls.return_value.validate_checksums.return_value = []
+        result = runner.invoke(main, ["--url", FAKE_URL, cmd, "--jobs", "4"] + (["--no-lock"] if cmd == "up" else []))
+
+    assert result.exit_code == 0
+    assert mock_cls.call_args.kwargs["jobs"] == 4
+
+
+@pytest.mark.parametrize("cmd", ["up", "rollback"])
+def test_wait_mutations_options_passed_to_migrator(runner: CliRunner, cmd: str) -> None:
+    with patch("py_clickhouse_migrator.cli.Migrator") as mock_cls:
+        result = runner.invoke(
+            main, ["--url", FAKE_URL, cmd, "--no-lock", "--wait-mutations", "--mutation-timeout", "120"]
+        )
+
+    assert result.exit_code == 0
+    assert mock_cls.call_args.kwargs["wait_mutations"] is True
+    assert mock_cls.call_args.kwargs["mutation_timeout"] == 120
+
+
+@pytest.mark.parametrize(("args", "record_stats"), [([], False), (["--stats"], True)])
+def test_up_stats_option_passed_to_migrator(runner: CliRunner, args: list[str], record_stats: bool) -> None:
+    with patch("py_clickhouse_migrator.cli.Migrator") as mock_cls:
+        result = runner.invoke(main, ["--url", FAKE_URL, "up", "--no-lock", *args])
+
+    assert result.exit_code == 0
+    assert mock_cls.call_args.kwargs["record_stats"] is record_stats
+
+
+def test_mutation_timeout_is_handled(runner: CliRunner) -> None:
+    with patch("py_clickhouse_migrator.cli.Migrator") as mock_cls:
+        mock_cls.return_value.up.side_effect = MutationTimeoutError("Mutations on db.t are not done")
+        result = runner.invoke(main, ["--url", FAKE_URL, "up", "--no-lock", "--wait-mutations"])
+
+    assert result.exit_code == 1
+    assert "Mutations on db.t are not done" in result.output
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from py_clickhouse_migrator.cli import main
+from py_clickhouse_migrator.errors import SchemaCloneError
+from py_clickhouse_migrator.migrator import Migrator
+from py_clickhouse_migrator.schema import SchemaObject, plan_schema, run_planned
+from tests.fake_clickhouse import FakeClickHouse
+from tests.helpers import render_test_migration_content
+
+URL = "clickhouse://default@localhost:9000/test"
+REFERENCE_URL = "clickhouse://default@localhost:9000/ref"
+
+
+def test_plan_schema() -> None:
+    objects = [
+        SchemaObject("users", "MergeTree", "CREATE TABLE ref.users (id UInt64) ENGINE = MergeTree ORDER BY id"),
+        SchemaObject("events", "MergeTree", "CREATE TABLE ref.events (id UInt64) ENGINE = MergeTree ORDER BY id"),
+        SchemaObject("users_dict", "Dictionary", "CREATE DICTIONARY ref.users_dict (id UInt64) SOURCE(NULL())"),
+        SchemaObject(
+            "events_mv", "MaterializedView", "CREATE MATERIALIZED VIEW ref.events_mv TO ref.events AS SELECT 1"
+        ),
+        SchemaObject("events_view", "View", "CREATE VIEW ref.events_view AS SELECT * FROM ref.events_mv"),
+    ]
+
+    assert plan_schema(objects) == {
+        "users": (),
+        "events": (),
+        "users_dict": ("users", "events"),
+        "events_mv": ("users", "events"),
+        "events_view": ("events_mv",),
+    }
+
+
+def test_run_planned_stops_after_failure() -> None:
+    ran: list[str] = []
+    lock = threading.Lock()
+
+    def run(name: str) -> None:
+        with lock:
+            ran.append(name)
+        if name == "b":
+            raise ValueError("b failed")
+
+    with pytest.raises(ValueError, match="b failed"):
+        run_planned({"a": (), "b": (), "c": ("a", "b")}, run, workers=2)
+
+    assert sorted(ran) == ["a", "b"]
+
+
+def _make_reference(server: FakeClickHouse, fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    (tmp_path / "001_users.sql").write_text(render_test_migration_content("SELECT 1", ""))
+    (tmp_path / "002_events.sql").write_text(render_test_migration_content("SELECT 2", ""))
+    fake_migrator(server, REFERENCE_URL).up(validate=False)
+    server.add_schema_object("ref", "db_migrations", "MergeTree", "CREATE TABLE ref.db_migrations (name String)")
+    server.add_schema_object("ref", "users", "Memory", "CREATE TABLE ref.users (id UInt64) ENGINE = Memory")
+    server.add_schema_object("ref", "users_view", "View", "CREATE VIEW ref.users_view AS SELECT id FROM ref.users")
+
+
+def test_clone_schema(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    server = FakeClickHouse(databases=["ref", "test"])
+    _make_reference(server, fake_migrator, tmp_path)
+    migrator = fake_migrator(server, jobs=2)
+
+    result = migrator.clone_schema(REFERENCE_URL)
+
+    assert result.objects == ["users", "users_view"]
+    assert result.migrations == ["001_users.sql", "002_events.sql"]
+    assert server.statements("test") == [
+        "CREATE TABLE users (id UInt64) ENGINE = Memory",
+        "CREATE VIEW users_view AS SELECT id FROM users",
+    ]
+    assert server.applied_names("test") == server.applied_names("ref")
+    assert migrator.up(validate=False) == []
+
+
+def test_clone_schema_requires_empty_target(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    server = FakeClickHouse(databases=["ref", "test"])
+    _make_reference(server, fake_migrator, tmp_path)
+    migrator = fake_migrator(server, jobs=2)
+    server.add_schema_object("test", "users", "Memory", "CREATE TABLE test.users (id UInt64) ENGINE = Memory")
+
+    with pytest.raises(SchemaCloneError, match="already has 1 object\\(s\\) of ref, starting with users"):
+        migrator.clone_schema(REFERENCE_URL)
+
+    migrator.up(validate=False)
+    with pytest.raises(SchemaCloneError, match="empty db_migrations"):
+        migrator.clone_schema(REFERENCE_URL)
+
+
+def test_clone_schema_requires_reference_ledger(fake_migrator: Callable[..., Migrator]) -> None:
+    server = FakeClickHouse(databases=["ref", "test"])
+
+    with pytest.raises(SchemaCloneError, match="ref has no db_migrations table"):
+        fake_migrator(server).clone_schema(REFERENCE_URL)
+
+
+def test_cli_clone_schema(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    server = FakeClickHouse(databases=["ref", "test"])
+    _make_reference(server, fake_migrator, tmp_path)
+
+    with patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect):
+        dry_run = CliRunner().invoke(
+            main, ["--url", URL, "--path", str(tmp_path), "clone-schema", "--from", REFERENCE_URL, "--dry-run"]
+        )
+        result = CliRunner().invoke(
+            main, ["--url", URL, "--path", str(tmp_path), "clone-schema", "--from", REFERENCE_URL]
+        )
+
+    assert dry_run.exit_code == 0
+    assert "-- users_view (view)\nCREATE VIEW users_view AS SELECT id FROM users" in dry_run.output
+    assert result.exit_code == 0
+    assert "Created 2 object(s) and recorded 2 migration(s)." in result.output
+    assert "HEAD: 002_events.sql" in result.output
+
+
+def test_clone_schema_rejects_cluster(fake_migrator: Callable[..., Migrator]) -> None:
+    server = FakeClickHouse(databases=["ref", "test"])
+    migrator = fake_migrator(server, cluster="main")
+
+    with pytest.raises(SchemaCloneError, match="does not support --cluster"):
+        migrator.clone_schema(REFERENCE_URL)
+
+    assert server.statements("test") == []
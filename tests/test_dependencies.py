@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from py_clickhouse_migrator.cli import main
+from py_clickhouse_migrator.dependencies import MigrationNode, plan_dependencies, statement_objects
+from py_clickhouse_migrator.errors import InvalidMigrationError, MigrationParseError
+from py_clickhouse_migrator.migration_parser import load_migration_header
+from py_clickhouse_migrator.migrator import Migrator
+from tests.fake_clickhouse import FakeClickHouse
+from tests.helpers import render_test_migration_content
+
+URL = "clickhouse://default@localhost:9000/test"
+
+
+@pytest.mark.parametrize(
+    ("statement", "objects"),
+    [
+        ("CREATE TABLE IF NOT EXISTS db.`Events` (id Int32) ENGINE = MergeTree ORDER BY id", {"events"}),
+        ("INSERT INTO b SELECT * FROM c JOIN d USING id WHERE id IN (SELECT id FROM numbers(10))", {"b", "c", "d"}),
+        ("CREATE MATERIALIZED VIEW mv TO target AS SELECT * FROM src", {"mv", "target", "src"}),
+        ("CREATE DICTIONARY users_dict (id UInt64) SOURCE(CLICKHOUSE(TABLE 'users'))", {"users_dict", "users"}),
+        ("-- rename\nRENAME TABLE a TO b", {"a", "b"}),
+        ("CREATE TABLE events_v2 AS events", {"events_v2", "events"}),
+        (
+            "CREATE TABLE events_all AS events ENGINE = Distributed(c, default, events_local, rand())",
+            {"events_all", "events", "events_local"},
+        ),
+        ("CREATE TABLE b (id UInt64) ENGINE = Buffer(currentDatabase(), 'events', 16, 10, 100)", {"b", "events"}),
+        ("CREATE TABLE d (id UInt64) ENGINE = Dictionary(users_dict)", {"d", "users_dict"}),
+        ("INSERT INTO t SELECT dictGet('db.users_dict', 'name', id) FROM src", {"t", "users_dict", "src"}),
+        ("ALTER TABLE t ADD COLUMN n String DEFAULT dictGetOrDefault('d', 'n', id, '')", {"t", "d"}),
+        ("INSERT INTO t SELECT dictHas('d', id), joinGet('j', 'v', id) FROM src", {"t", "d", "j", "src"}),
+        ("INSERT INTO t SELECT dictGet(concat('d', '1'), 'n', id) FROM src", None),
+        ("CREATE TABLE d (id UInt64) ENGINE = Distributed(c, db, concat('t', '1'))", None),
+        ("CREATE TABLE m (id UInt64) ENGINE = Merge(currentDatabase(), '^events')", None),
+        ("INSERT INTO t SELECT * FROM remote('host', db, src)", None),
+        ("CREATE DATABASE analytics", None),
+        ("SYSTEM RELOAD DICTIONARIES", None),
+        ("SELECT 1", None),
+    ],
+)
+def test_statement_objects(statement: str, objects: set[str] | None) -> None:
+    assert statement_objects(statement) == objects
+
+
+def test_plan_dependencies_waits_for_copied_table() -> None:
+    nodes = [
+        _node("001.sql", "CREATE TABLE events (id UInt64) ENGINE = MergeTree ORDER BY id"),
+        _node("002.sql", "CREATE TABLE events_all AS events ENGINE = Distributed(c, default, events, rand())"),
+        _node("003.sql", "CREATE TABLE users (id UInt64) ENGINE = MergeTree ORDER BY id"),
+    ]
+
+    assert plan_dependencies(nodes, known={node.name for node in nodes}) == {
+        "001.sql": (),
+        "002.sql": ("001.sql",),
+        "003.sql": (),
+    }
+
+
+def _node(name: str, *statements: str, depends: tuple[str, ...] = ()) -> MigrationNode:
+    return MigrationNode(name, list(statements), list(depends))
+
+
+def test_plan_dependencies() -> None:
+    nodes = [
+        _node("001.sql", "CREATE TABLE a (id Int32) ENGINE = Memory"),
+        _node("002.sql", "CREATE TABLE b (id Int32) ENGINE = Memory"),
+        _node("003.sql", "ALTER TABLE a ADD COLUMN x Int32"),
+        _node("004.sql", "CREATE TABLE c (id Int32) ENGINE = Memory", depends=("002.sql",)),
+        _node("005.sql", "INSERT INTO a SELECT * FROM b"),
+        _node("006.sql", "CREATE DATABASE other"),
+        _node("007.sql", "CREATE TABLE d (id Int32) ENGINE = Memory"),
+    ]
+
+    assert plan_dependencies(nodes, known={node.name for node in nodes}) == {
+        "001.sql": (),
+        "002.sql": (),
+        "003.sql": ("001.sql",),
+        "004.sql": ("002.sql",),
+        # 001.sql is implied by 003.sql.
+        "005.sql": ("002.sql", "003.sql"),
+        "006.sql": ("004.sql", "005.sql"),
+        "007.sql": ("006.sql",),
+    }
+
+
+def test_plan_dependencies_allows_applied_dependency() -> None:
+    nodes = [_node("002.sql", "CREATE TABLE b (id Int32) ENGINE = Memory", depends=("001.sql",))]
+
+    assert plan_dependencies(nodes, known={"001.sql", "002.sql"}) == {"002.sql": ()}
+
+
+@pytest.mark.parametrize(
+    ("depends", "error"),
+    [("009.sql", "unknown migration 009.sql"), ("002.sql", "does not sort before it")],
+)
+def test_plan_dependencies_rejects_invalid_dependency(depends: str, error: str) -> None:
+    nodes = [
+        _node("001.sql", "CREATE TABLE a (id Int32) ENGINE = Memory", depends=(depends,)),
+        _node("002.sql", "CREATE TABLE b (id Int32) ENGINE = Memory"),
+    ]
+
+    with pytest.raises(InvalidMigrationError, match=error):
+        plan_dependencies(nodes, known={"001.sql", "002.sql"})
+
+
+def test_load_migration_header(tmp_path: Path) -> None:
+    filepath = tmp_path / "003.sql"
+    filepath.write_text(
+        "-- migrator:depends 001_a, 002_b.sql\n-- migrator:depends 000.sql\n"
+        + render_test_migration_content("SELECT 1", "")
+        + "\n-- migrator:depends 999.sql\n"
+    )
+
+    assert load_migration_header(str(filepath)).depends == ["001_a.sql", "002_b.sql", "000.sql"]
+    filepath.write_text("-- migrator:depends\n" + render_test_migration_content("SELECT 1", ""))
+    with pytest.raises(MigrationParseError, match="must list at least one migration"):
+        load_migration_header(str(filepath))
+
+
+def _write_migrations(tmp_path: Path) -> None:
+    (tmp_path / "001_users.sql").write_text(
+        render_test_migration_content("CREATE TABLE users (id Int32) ENGINE = Memory", "")
+    )
+    (tmp_path / "002_events.sql").write_text(
+        render_test_migration_content("CREATE TABLE events (id Int32) ENGINE = Memory", "")
+    )
+    (tmp_path / "003_users_name.sql").write_text(
+        render_test_migration_content("ALTER TABLE users ADD COLUMN name String", "")
+    )
+
+
+def test_up_parallel_records_in_file_order(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    _write_migrations(tmp_path)
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server, parallel=2)
+    server.latency = 0.01
+    server.reset_stats()
+
+    assert migrator.up(validate=False) == ["001_users.sql", "002_events.sql", "003_users_name.sql"]
+
+    assert server.applied_names("test") == ["001_users.sql", "002_events.sql", "003_users_name.sql"]
+    statements = server.statements("test")
+    assert statements.index("CREATE TABLE users (id Int32) ENGINE = Memory") < statements.index(
+        "ALTER TABLE users ADD COLUMN name String"
+    )
+    assert server.max_in_flight == 2
+
+
+def test_up_parallel_failure_records_finished_migrations(
+    fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    _write_migrations(tmp_path)
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server, parallel=2)
+    server.fail_on("CREATE TABLE users")
+
+    with pytest.raises(InvalidMigrationError, match="CREATE TABLE users"):
+        migrator.up(validate=False)
+
+    assert server.applied_names("test") == ["002_events.sql"]
+    assert "ALTER TABLE users ADD COLUMN name String" not in server.statements("test")
+    server.clear_failures()
+    assert migrator.up(validate=False) == ["001_users.sql", "003_users_name.sql"]
+
+
+def test_up_parallel_dry_run_shows_dependencies(tmp_path: Path) -> None:
+    _write_migrations(tmp_path)
+    server = FakeClickHouse(databases=["test"])
+
+    with patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect):
+        result = CliRunner().invoke(
+            main, ["--url", URL, "--path", str(tmp_path), "up", "--dry-run", "--no-validate", "--parallel", "2"]
+        )
+
+    assert result.exit_code == 0
+    assert "-- 002_events.sql (up)\n" in result.output
+    assert "-- 003_users_name.sql (up, after 001_users.sql)" in result.output
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import datetime as dt
+import time
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from py_clickhouse_migrator.errors import DatabaseNotFoundError, InvalidMigrationError
+from py_clickhouse_migrator.fanout import resolve_databases, up_databases
+from py_clickhouse_migrator.lock import LockError, MigrationLock
+from py_clickhouse_migrator.migrator import Migrator
+from py_clickhouse_migrator.throttle import ThrottleConfig
+from py_clickhouse_migrator.timings import QueryTimings
+from tests.fake_clickhouse import FakeClickHouse
+from tests.helpers import render_test_migration_content
+
+URL = "clickhouse://default@localhost:9000/test"
+
+
+def _write_migrations(directory: Path, count: int, statements: int = 1) -> list[str]:
+    names = []
+    for index in range(count):
+        name = f"{index:04d}_m.sql"
+        up = [f"CREATE TABLE t{index}_{i} (id Int32) ENGINE = MergeTree ORDER BY id" for i in range(statements)]
+        (directory / name).write_text(render_test_migration_content(up, f"DROP TABLE t{index}_0"), encoding="utf-8")
+        names.append(name)
+    return names
+
+
+@pytest.fixture
+def server() -> FakeClickHouse:
+    return FakeClickHouse(databases=["test"])
+
+
+def test_up_and_rollback_against_fake_server(
+    server: FakeClickHouse, fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    names = _write_migrations(tmp_path, 3)
+    migrator = fake_migrator(server)
+
+    assert migrator.up() == names
+    assert server.applied_names("test") == names
+    assert migrator.get_unapplied_migration_names() == []
+
+    migrator.rollback(number=2)
+
+    assert server.applied_names("test") == names[:1]
+    assert server.statements("test")[-2:] == ["DROP TABLE t2_0", "DROP TABLE t1_0"]
+
+
+def test_up_round_trips(server: FakeClickHouse, fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    _write_migrations(tmp_path, 10, statements=2)
+    migrator = fake_migrator(server)
+    server.reset_stats()
+
+    migrator.up(validate=False)
+
+    # ledger read + progress table + progress read, then per migration: 2 statements, 1 checkpoint,
+    # 1 ledger insert and 1 progress cleanup.
+    assert server.round_trips == 3 + 10 * 5
+    assert server.connections == 0
+
+
+def test_show_round_trips_do_not_grow_with_history(
+    server: FakeClickHouse, fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    _write_migrations(tmp_path, 50)
+    migrator = fake_migrator(server)
+    migrator.up(validate=False)
+    server.reset_stats()
+
+    migrator.show_migrations()
+
+    assert server.round_trips == 1
+
+
+def test_show_with_stats_reads_ledger_once(
+    server: FakeClickHouse, fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    _write_migrations(tmp_path, 3)
+    migrator = fake_migrator(server, record_stats=True)
+    migrator.up(validate=False)
+    server.reset_stats()
+
+    ledger = migrator.load_ledger()
+    migrator.show_migrations(ledger=ledger)
+    stats = migrator.get_migration_stats(ledger=ledger)
+
+    assert server.round_trips == 2  # the ledger and the stats table
+    assert len(stats) == 3
+
+
+def test_resume_after_injected_failure(
+    server: FakeClickHouse, fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    _write_migrations(tmp_path, 1, statements=3)
+    migrator = fake_migrator(server)
+    server.fail_on("t0_1")
+
+    with pytest.raises(InvalidMigrationError):
+        migrator.up(validate=False)
+
+    server.clear_failures()
+    migrator.up(validate=False)
+
+    assert server.statements("test") == [
+        "CREATE TABLE t0_0 (id Int32) ENGINE = MergeTree ORDER BY id",
+        "CREATE TABLE t0_1 (id Int32) ENGINE = MergeTree ORDER BY id",
+        "CREATE TABLE t0_2 (id Int32) ENGINE = MergeTree ORDER BY id",
+    ]
+
+
+def test_rollback_clears_checkpoints_left_by_crash(
+    server: FakeClickHouse, fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    _write_migrations(tmp_path, 1, statements=3)
+    migrator = fake_migrator(server)
+    with (
+        patch.object(migrator, "clear_statement_progress", side_effect=ConnectionError("connection lost")),
+        pytest.raises(ConnectionError),
+    ):
+        migrator.up(validate=False)
+    assert server.databases["test"].progress
+
+    migrator.rollback()
+    migrator.up(validate=False)
+
+    assert not server.databases["test"].progress
+    assert server.statements("test")[-3:] == [
+        "CREATE TABLE t0_0 (id Int32) ENGINE = MergeTree ORDER BY id",
+        "CREATE TABLE t0_1 (id Int32) ENGINE = MergeTree ORDER BY id",
+        "CREATE TABLE t0_2 (id Int32) ENGINE = MergeTree ORDER BY id",
+    ]
+
+
+def test_unknown_database(server: FakeClickHouse, fake_migrator: Callable[..., Migrator]) -> None:
+    with pytest.raises(DatabaseNotFoundError):
+        fake_migrator(server, "clickhouse://localhost/missing")
+
+
+def test_parallel_validation_opens_one_connection_per_worker(
+    fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    server = FakeClickHouse(databases=["test"], latency=0.01)
+    _write_migrations(tmp_path, 8)
+    migrator = fake_migrator(server, jobs=4)
+    server.reset_stats()
+
+    migrator.up()
+
+    assert server.connections == 4
+    assert server.max_in_flight > 1
+
+
+def test_parallel_validation_splits_one_migration_by_statement(
+    fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    server = FakeClickHouse(databases=["test"], latency=0.01)
+    _write_migrations(tmp_path, 1, statements=8)
+    migrator = fake_migrator(server, jobs=4)
+    server.reset_stats()
+
+    migrator.up()
+
+    assert server.connections == 4
+    assert server.max_in_flight > 1
+
+
+def test_lock_contention(server: FakeClickHouse) -> None:
+    first = MigrationLock(server.connect(URL), db="test")  # type: ignore[arg-type]
+    second = MigrationLock(server.connect(URL), db="test")  # type: ignore[arg-type]
+
+    first.acquire()
+    with pytest.raises(LockError):
+        second.acquire()
+    first.release()
+    second.acquire()
+
+    assert second.is_locked()
+
+
+def test_lock_expires_with_server_clock() -> None:
+    now = [dt.datetime(2026, 1, 1)]
+    server = FakeClickHouse(databases=["test"], clock=lambda: now[0])
+    first = MigrationLock(server.connect(URL), db="test", ttl=60)  # type: ignore[arg-type]
+    second = MigrationLock(server.connect(URL), db="test")  # type: ignore[arg-type]
+    first.acquire()
+
+    now[0] += dt.timedelta(seconds=61)
+
+    second.acquire()
+    assert second.get_lock_info().locked_by == second._locked_by  # type: ignore[union-attr]
+
+
+def test_up_databases_overlaps_round_trips(tmp_path: Path) -> None:
+    databases = [f"tenant_{index}" for index in range(4)]
+    server = FakeClickHouse(databases=databases, latency=0.02)
+    _write_migrations(tmp_path, 2)
+
+    started = time.monotonic()
+    results = up_databases(URL, databases, migrations_dir=str(tmp_path), jobs=4, client_factory=server.connect)
+    elapsed = time.monotonic() - started
+
+    assert [result.error for result in results] == [""] * 4
+    assert all(server.applied_names(database) == ["0000_m.sql", "0001_m.sql"] for database in databases)
+    sequential = server.round_trips * server.latency
+    assert elapsed < sequential / 2
+
+
+def test_resolve_databases_uses_client_factory_and_timings() -> None:
+    server = FakeClickHouse(databases=["test", "tenant_1"])
+    timings = QueryTimings()
+
+    names = resolve_databases(
+        URL, "SELECT name FROM system.databases ORDER BY name", client_factory=server.connect, timings=timings
+    )
+
+    assert names == ["tenant_1", "test"]
+    assert timings.count == server.round_trips == 1
+
+
+def test_up_databases_closes_every_connection(tmp_path: Path) -> None:
+    server = FakeClickHouse(databases=["tenant_1", "tenant_2"])
+    _write_migrations(tmp_path, 2)
+    clients = []
+
+    def connect(database_url: str) -> object:
+        clients.append(server.connect(database_url))
+        return clients[-1]
+
+    results = up_databases(
+        URL,
+        ["tenant_1", "tenant_2"],
+        migrations_dir=str(tmp_path),
+        jobs=2,
+        client_factory=connect,
+        parallel=2,
+        throttle=ThrottleConfig(max_merges=10, poll_interval=0),
+    )
+
+    assert [result.error for result in results] == ["", ""]
+    assert len(clients) > 2
+    assert not any(client.connected for client in clients)
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import py_clickhouse_migrator
+
+_DRIVER_LOADED = "import sys; print('clickhouse_driver' in sys.modules)"
+
+
+def _run(code: str) -> str:
+    result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_cli_import_does_not_load_driver() -> None:
+    assert _run(f"import py_clickhouse_migrator.cli; {_DRIVER_LOADED}") == "False"
+
+
+@pytest.mark.parametrize("args", [["init"], ["new", "create_users"], ["--version"]])
+def test_offline_commands_do_not_load_driver(tmp_path: Path, args: list[str]) -> None:
+    path = str(tmp_path / "migrations")
+    (tmp_path / "migrations").mkdir()
+    code = (
+        "from py_clickhouse_migrator.cli import main\n"
+        f"main(['--path', {path!r}, *{args!r}], standalone_mode=False)\n"
+        f"{_DRIVER_LOADED}"
+    )
+    assert _run(code) == "False"
+
+
+def test_package_exports_resolve_lazily() -> None:
+    assert _run(f"import py_clickhouse_migrator; {_DRIVER_LOADED}") == "False"
+    assert _run(f"from py_clickhouse_migrator import Migrator; {_DRIVER_LOADED}") == "True"
+
+
+def test_package_exports_are_importable() -> None:
+    for name in py_clickhouse_migrator.__all__:
+        assert getattr(py_clickhouse_migrator, name) is not None
+    assert set(py_clickhouse_migrator.__all__) <= set(dir(py_clickhouse_migrator))
+    with pytest.raises(AttributeError):
+        py_clickhouse_migrator.missing  # noqa: B018
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import functools
+import time
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from click.testing import CliRunner
+
+pytest.importorskip("kazoo")
+
+from py_clickhouse_migrator.cli import main  # noqa: E402
+from py_clickhouse_migrator.fanout import up_databases  # noqa: E402
+from py_clickhouse_migrator.keeper import KeeperLockBackend  # noqa: E402
+from py_clickhouse_migrator.lock import LockError, LockLostError, MigrationLock  # noqa: E402
+from tests.fake_clickhouse import FakeClickHouse  # noqa: E402
+from tests.fake_keeper import FakeKazooClient, FakeKeeper  # noqa: E402
+from tests.helpers import render_test_migration_content  # noqa: E402
+
+URL = "clickhouse://default@localhost:9000/test"
+
+
+def _wait_until(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def _make_lock(keeper: FakeKazooClient, db: str = "test", scope: str = "", **kwargs: object) -> MigrationLock:
+    backend = KeeperLockBackend(keeper, db, scope=scope)
+    return MigrationLock(MagicMock(), db=db, ttl=60, backend=backend, **kwargs)  # type: ignore[arg-type]
+
+
+def test_keeper_lock_is_exclusive() -> None:
+    keeper = FakeKeeper()
+    lock, other = _make_lock(keeper.connect()), _make_lock(keeper.connect())
+
+    lock.acquire()
+    with pytest.raises(LockError, match=lock._locked_by):
+        other.acquire()
+    other.release()
+    assert lock.get_lock_info().locked_by == lock._locked_by  # type: ignore[union-attr]
+
+    lock.release()
+    other.acquire()
+    assert other.is_locked()
+    assert list(keeper.nodes) == ["/py_clickhouse_migrator/locks/test"]
+
+
+def test_keeper_lock_is_released_when_session_ends() -> None:
+    keeper = FakeKeeper()
+    holder = keeper.connect()
+    _make_lock(holder).acquire()
+
+    holder.stop()
+
+    other = _make_lock(keeper.connect())
+    other.acquire()
+    assert other.is_locked()
+
+
+def test_keeper_heartbeat_detects_session_loss() -> None:
+    keeper = FakeKeeper()
+    client = keeper.connect()
+    lock = _make_lock(client, heartbeat_interval=0.01)
+
+    with lock:
+        _wait_until(lambda: keeper.nodes["/py_clickhouse_migrator/locks/test"].version > 0)
+        client.expire_session()
+        _wait_until(lock.lost.is_set)
+        with pytest.raises(LockLostError):
+            lock.check()
+
+    assert not keeper.nodes
+
+
+def test_keeper_force_release() -> None:
+    keeper = FakeKeeper()
+    lock = _make_lock(keeper.connect())
+    lock.acquire()
+
+    _make_lock(keeper.connect()).release(force=True)
+
+    assert not lock.is_locked()
+    assert not lock.renew()
+
+
+def test_cli_up_with_keeper_lock(tmp_path: Path) -> None:
+    (tmp_path / "001.sql").write_text(render_test_migration_content("SELECT 2", ""))
+    server = FakeClickHouse(databases=["test"])
+    keeper = FakeKeeper()
+    client = keeper.connect()
+
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect),
+        patch("py_clickhouse_migrator.cli.connect_keeper", return_value=client) as mock_connect,
+    ):
+        result = CliRunner().invoke(
+            main, ["--url", URL, "--path", str(tmp_path), "--keeper-hosts", "keeper:9181", "up", "--no-validate"]
+        )
+
+    assert result.exit_code == 0, result.output
+    mock_connect.assert_called_once_with("keeper:9181")
+    assert server.applied_names("test") == ["001.sql"]
+    assert "_migrations_lock" not in server.databases["test"].tables
+    assert not keeper.nodes
+
+
+def test_up_databases_with_keeper_locks(tmp_path: Path) -> None:
+    (tmp_path / "001.sql").write_text(render_test_migration_content("SELECT 2", ""))
+    server = FakeClickHouse(databases=["a", "b"])
+    keeper = FakeKeeper()
+    _make_lock(keeper.connect(), db="b").acquire()
+
+    with patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect):
+        results = up_databases(
+            URL,
+            ["a", "b"],
+            migrations_dir=str(tmp_path),
+            validate=False,
+            lock_retry=0,
+            lock_backends=functools.partial(KeeperLockBackend, keeper.connect()),
+        )
+
+    assert results[0].applied == ["001.sql"]
+    assert results[1].error.startswith("Migration lock is held by")
+    assert "_migrations_lock" not in server.databases["a"].tables
+
+
+def test_keeper_lock_scope_is_shared_across_databases() -> None:
+    keeper = FakeKeeper()
+    _make_lock(keeper.connect(), db="a", scope="shared").acquire()
+
+    with pytest.raises(LockError):
+        _make_lock(keeper.connect(), db="b", scope="shared").acquire()
+    _make_lock(keeper.connect(), db="b").acquire()
+    with pytest.raises(LockError):
+        _make_lock(keeper.connect(), db="c", scope="b").acquire()
+
+
+@pytest.mark.parametrize("scope", ["a/b", "..", "a b"])
+def test_keeper_lock_scope_must_be_node_name(scope: str) -> None:
+    with pytest.raises(ValueError, match="Invalid lock scope"):
+        KeeperLockBackend(FakeKeeper().connect(), "test", scope=scope)  # type: ignore[arg-type]
+
+
+def test_keeper_lock_path_includes_cluster() -> None:
+    keeper = FakeKeeper()
+
+    assert KeeperLockBackend(keeper.connect(), "app", cluster="main").path == "/py_clickhouse_migrator/locks/main/app"  # type: ignore[arg-type]
+    assert KeeperLockBackend(keeper.connect(), "app", root="/staging/", scope="billing").path == "/staging/billing"  # type: ignore[arg-type]
+    with pytest.raises(ValueError, match="absolute path"):
+        KeeperLockBackend(keeper.connect(), "app", root="locks")  # type: ignore[arg-type]
+
+
+def test_cli_keeper_lock_is_per_cluster() -> None:
+    keeper = FakeKeeper()
+    _make_lock(keeper.connect(), db="test").acquire()
+    runner = CliRunner()
+    args = ["--url", URL, "--keeper-hosts", "keeper:9181"]
+
+    with (
+        patch("py_clickhouse_migrator.cli.Migrator") as mock_migrator_cls,
+        patch("py_clickhouse_migrator.cli.connect_keeper", return_value=keeper.connect()),
+    ):
+        mock_migrator_cls.return_value.get_db_name.return_value = "test"
+        result = runner.invoke(main, [*args, "--cluster", "main", "lock-info"])
+        root = runner.invoke(main, [*args, "--keeper-root", "/staging", "lock-info"])
+        held = runner.invoke(main, [*args, "lock-info"])
+
+    assert result.exit_code == 0, result.output
+    assert "No active lock" in result.output
+    assert "No active lock" in root.output
+    assert "Locked by" in held.output
+
+
+def test_cli_lock_scope(tmp_path: Path) -> None:
+    (tmp_path / "001.sql").write_text(render_test_migration_content("SELECT 2", ""))
+    server = FakeClickHouse(databases=["test"])
+    keeper = FakeKeeper()
+    _make_lock(keeper.connect(), db="other", scope="billing").acquire()
+    args = ["--url", URL, "--path", str(tmp_path), "--keeper-hosts", "keeper:9181", "--lock-scope", "billing"]
+
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect),
+        patch("py_clickhouse_migrator.cli.connect_keeper", return_value=keeper.connect()),
+    ):
+        result = CliRunner().invoke(main, [*args, "up", "--no-validate", "--lock-retry", "0"])
+        fanout = CliRunner().invoke(main, [*args, "up", "--databases", "test"])
+    without_keeper = CliRunner().invoke(main, ["--url", URL, "--lock-scope", "billing", "lock-info"])
+
+    assert result.exit_code == 1
+    assert "Migration lock is held by" in result.stderr
+    assert server.applied_names("test") == []
+    assert fanout.exit_code == 2
+    assert "all databases would share one lock" in fanout.stderr
+    assert without_keeper.exit_code == 2
+    assert "--lock-scope requires --keeper-hosts" in without_keeper.stderr
+
+
+def test_cli_lock_wait_until_expiry_needs_table_lock() -> None:
+    result = CliRunner().invoke(main, ["--url", URL, "--keeper-hosts", "keeper:9181", "up", "--lock-wait-until-expiry"])
+
+    assert result.exit_code == 2
+    assert "--lock-wait-until-expiry cannot be used with --keeper-hosts" in result.stderr
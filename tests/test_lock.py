@@ -9,7 +9,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 from clickhouse_driver import Client
 
-from py_clickhouse_migrator.lock import LockError, LockInfo, LockTimeoutError, MigrationLock
+from py_clickhouse_migrator.lock import LockBackend, LockError, LockInfo, LockTimeoutError, MigrationLock
 
 DB = "test"
 
@@ -194,11 +194,11 @@ def test_context_manager_release_failure(ch_client: Client, caplog: pytest.LogCa
 
 
 def test_try_acquire_race_condition(lock: MigrationLock, ch_client: Client) -> None:
-    """When another process grabs the lock between insert and verify, _try_acquire returns holder info."""
+    """When another process grabs the lock between insert and verify, try_acquire returns holder info."""
     # Simulate: after our insert, _get_active_lock returns someone else's lock
     other_info = LockInfo(locked_by="other:999", locked_at=dt.datetime.now(), expires_at=dt.datetime.now())
     with patch.object(lock, "_get_active_lock", return_value=other_info):
-        result = lock._try_acquire()
+        result = lock.try_acquire()
 
     assert result is not None
     assert result.locked_by == "other:999"
@@ -206,7 +206,7 @@ def test_try_acquire_race_condition(lock: MigrationLock, ch_client: Client) -> N
 
 
 def test_acquire_race_on_try_acquire(ch_client: Client) -> None:
-    """When lock appears free but _try_acquire returns a holder, acquire should raise LockError."""
+    """When lock appears free but try_acquire returns a holder, acquire should raise LockError."""
     lock = MigrationLock(client=ch_client, db=DB, ttl=300)
     other_info = LockInfo(locked_by="other:999", locked_at=dt.datetime.now(), expires_at=dt.datetime.now())
 
@@ -221,7 +221,7 @@ def test_acquire_race_on_try_acquire(ch_client: Client) -> None:
 
     with (
         patch.object(lock, "_get_active_lock", side_effect=mock_get_active_lock),
-        patch.object(lock, "_try_acquire", return_value=other_info),
+        patch.object(lock, "try_acquire", return_value=other_info),
         pytest.raises(LockError),
     ):
         lock.acquire()
@@ -268,3 +268,51 @@ def test_release_skips_when_no_active_lock(lock: MigrationLock, caplog: pytest.L
     assert "No active lock to release" in caplog.text
     assert not lock.is_locked()
     assert lock.get_lock_info() is None
+
+
+def test_release_in_same_millisecond_wins(lock: MigrationLock, ch_client: Client) -> None:
+    now = dt.datetime.now(tz=dt.timezone.utc)
+    ch_client.execute(
+        f"INSERT INTO {DB}.{MigrationLock._LOCK_TABLE} (lock_id, locked_by, locked_at, expires_at, is_locked) VALUES",
+        [
+            ["migration", "other_host:999", now, now + dt.timedelta(seconds=300), 1],
+            ["migration", "other_host:999", now, now, 0],
+        ],
+    )
+
+    assert not lock.is_locked()
+
+
+def test_lock_table_has_row_ttl(lock: MigrationLock, ch_client: Client) -> None:
+    rows = ch_client.execute(
+        "SELECT engine_full FROM system.tables WHERE database = %(database)s AND name = %(name)s",
+        {"database": DB, "name": MigrationLock._LOCK_TABLE},
+    )
+
+    assert "TTL toDateTime(expires_at) + toIntervalDay(1)" in rows[0][0]
+
+
+def test_ensure_table_adds_row_ttl_to_old_table() -> None:
+    mock_client = MagicMock(spec=Client)
+    mock_client.execute.side_effect = [[], [("ReplacingMergeTree(locked_at) ORDER BY lock_id",)], []]
+
+    MigrationLock(client=mock_client, db=DB)
+
+    alter = mock_client.execute.call_args_list[2].args[0]
+    assert alter.startswith(f"ALTER TABLE {DB}._migrations_lock ")
+    assert alter.endswith("MODIFY TTL toDateTime(expires_at) + INTERVAL 1 DAY")
+
+
+def test_incomplete_backend_cannot_be_created() -> None:
+    class NoRenewBackend(LockBackend):
+        def get_active_lock(self) -> LockInfo | None:
+            return None
+
+        def try_acquire(self, locked_by: str, ttl: int) -> LockInfo | None:
+            return None
+
+        def release(self, locked_by: str, *, force: bool = False) -> None:
+            pass
+
+    with pytest.raises(TypeError, match="renew"):
+        NoRenewBackend()  # type: ignore[abstract]
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import datetime as dt
+import time
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from click.testing import CliRunner
+
+from py_clickhouse_migrator.cli import main
+from py_clickhouse_migrator.lock import LockError, LockLostError, MigrationLock
+from py_clickhouse_migrator.migrator import Migrator
+from tests.fake_clickhouse import FakeClickHouse
+from tests.helpers import render_test_migration_content
+
+URL = "clickhouse://default@localhost:9000/test"
+
+
+def _wait_until(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def _make_lock(server: FakeClickHouse, **kwargs: object) -> MigrationLock:
+    return MigrationLock(
+        server.connect(URL),  # type: ignore[arg-type]
+        db="test",
+        ttl=60,
+        heartbeat_client=server.connect(URL),  # type: ignore[arg-type]
+        **kwargs,  # type: ignore[arg-type]
+    )
+
+
+def test_heartbeat_renews_lock() -> None:
+    now = [dt.datetime(2026, 1, 1)]
+    server = FakeClickHouse(databases=["test"], clock=lambda: now[0])
+    lock = _make_lock(server, heartbeat_interval=0.01)
+    other = MigrationLock(server.connect(URL), db="test")  # type: ignore[arg-type]
+
+    with lock:
+        for _ in range(3):
+            now[0] += dt.timedelta(seconds=50)
+            _wait_until(lambda: lock.get_lock_info().expires_at > now[0] + dt.timedelta(seconds=50))  # type: ignore[union-attr]
+        with pytest.raises(LockError):
+            other.acquire()
+        lock.check()
+
+    assert not lock.is_locked()
+    assert not lock._heartbeat_client.connected  # type: ignore[union-attr]
+
+
+def test_heartbeat_detects_takeover(caplog: pytest.LogCaptureFixture) -> None:
+    server = FakeClickHouse(databases=["test"])
+    lock = _make_lock(server, heartbeat_interval=0.01)
+    other = MigrationLock(server.connect(URL), db="test")  # type: ignore[arg-type]
+
+    with lock:
+        other.release(force=True)
+        other.acquire()
+        _wait_until(lock.lost.is_set)
+        with pytest.raises(LockLostError, match="was lost"):
+            lock.check()
+
+    assert other.get_lock_info().locked_by == other._locked_by  # type: ignore[union-attr]
+    assert "stopping before the next statement" in caplog.text
+
+
+def test_renew_does_not_take_back_lock_acquired_after_expiry() -> None:
+    now = [dt.datetime(2026, 1, 1)]
+    server = FakeClickHouse(databases=["test"], clock=lambda: now[0])
+    lock = MigrationLock(server.connect(URL), db="test", ttl=60)  # type: ignore[arg-type]
+    other = MigrationLock(server.connect(URL), db="test", ttl=60)  # type: ignore[arg-type]
+    lock.acquire()
+    read_before_expiry = lock.get_lock_info()
+    now[0] += dt.timedelta(seconds=61)
+    other.acquire()
+    get_active_lock = lock._get_active_lock
+    reads = iter([read_before_expiry])
+
+    # The renewal's first read still sees the old row; the lock expires and is taken before its insert.
+    with patch.object(
+        lock, "_get_active_lock", side_effect=lambda client=None: next(reads, None) or get_active_lock(client)
+    ):
+        assert lock.renew() is False
+
+    assert other.get_lock_info().locked_by == other._locked_by  # type: ignore[union-attr]
+
+
+def test_heartbeat_gives_up_after_ttl_without_renewal() -> None:
+    server = FakeClickHouse(databases=["test"])
+    lock = _make_lock(server, heartbeat_interval=0.01)
+
+    with lock:
+        lock._heartbeat_client.execute = MagicMock(side_effect=ConnectionError("server unreachable"))  # type: ignore[union-attr]
+        lock._ttl = 0
+        _wait_until(lock.lost.is_set)
+
+    assert not lock.is_locked()
+
+
+def test_migrator_stops_when_lock_is_lost(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    (tmp_path / "001.sql").write_text(render_test_migration_content(["SELECT 2", "SELECT 3"], ""))
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server)
+    migrator.lock = _make_lock(server)
+    migrator.lock.lost.set()
+
+    with pytest.raises(LockLostError):
+        migrator.up(validate=False)
+
+    assert server.statements("test") == []
+    assert server.applied_names("test") == []
+
+
+def test_cli_up_stops_when_lock_is_lost(tmp_path: Path) -> None:
+    (tmp_path / "001.sql").write_text(render_test_migration_content([f"SELECT {i}" for i in range(2, 10)], ""))
+    server = FakeClickHouse(databases=["test"], latency=0.1)
+
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect),
+        patch.object(MigrationLock, "renew", return_value=False),
+    ):
+        result = CliRunner().invoke(
+            main, ["--url", URL, "--path", str(tmp_path), "up", "--no-validate", "--lock-ttl", "1"]
+        )
+
+    assert result.exit_code == 1
+    assert "was lost" in result.stderr
+    assert len(server.statements("test")) < 8
+    assert server.applied_names("test") == []
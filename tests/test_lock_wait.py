@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import datetime as dt
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from py_clickhouse_migrator.cli import main
+from py_clickhouse_migrator.lock import (
+    LockError,
+    LockInfo,
+    LockTimeoutError,
+    LockWait,
+    LockWaiter,
+    LockWaitStrategy,
+    MigrationLock,
+)
+from tests.fake_clickhouse import FakeClickHouse
+
+URL = "clickhouse://default@localhost:9000/test"
+NOW = dt.datetime(2026, 1, 1)
+HOLDER = LockInfo(locked_by="other", locked_at=NOW, expires_at=NOW + dt.timedelta(seconds=45), checked_at=NOW)
+
+
+def _delays(waiter: LockWaiter, holder: LockInfo | None = HOLDER) -> list[float]:
+    delays: list[float] = []
+    while (delay := waiter.next_delay(holder)) is not None:
+        delays.append(delay)
+    return delays
+
+
+@pytest.mark.parametrize(
+    ("wait", "expected"),
+    [
+        (LockWait(), [1.0, 1.0, 1.0, 1.0, 1.0, 1.0]),
+        (LockWait(LockWaitStrategy.EXPONENTIAL, max_delay=10.0), [1.0, 2.0, 4.0, 8.0, 10.0, 10.0]),
+        (LockWait(until_expiry=True), [30.0] * 6),
+        (LockWait(until_expiry=True, max_delay=60.0), [45.0] * 6),
+    ],
+)
+def test_waiter_delays(wait: LockWait, expected: list[float]) -> None:
+    assert _delays(LockWaiter(wait, retry_count=6)) == expected
+
+
+def test_waiter_jitter_grows_from_previous_delay() -> None:
+    bounds: list[tuple[float, float]] = []
+
+    def uniform(low: float, high: float) -> float:
+        bounds.append((low, high))
+        return high
+
+    waiter = LockWaiter(LockWait(LockWaitStrategy.JITTER, delay=0.5, max_delay=10.0), retry_count=4, uniform=uniform)
+
+    assert _delays(waiter) == [1.5, 4.5, 10.0, 10.0]
+    assert bounds == [(0.5, 1.5), (0.5, 4.5), (0.5, 13.5), (0.5, 30.0)]
+
+
+def test_waiter_timeout_replaces_retry_count() -> None:
+    now = [0.0]
+    waiter = LockWaiter(LockWait(LockWaitStrategy.EXPONENTIAL, timeout=10.0), retry_count=0, clock=lambda: now[0])
+    delays: list[float] = []
+    while (delay := waiter.next_delay(HOLDER)) is not None:
+        delays.append(delay)
+        now[0] += delay
+
+    assert delays == [1.0, 2.0, 4.0, 3.0]
+    assert isinstance(waiter.error(HOLDER), LockTimeoutError)
+
+
+def test_waiter_without_retries_reports_holder() -> None:
+    waiter = LockWaiter(LockWait(), retry_count=0)
+
+    assert waiter.next_delay(HOLDER) is None
+    assert type(waiter.error(HOLDER)) is LockError
+
+
+def test_acquire_sleeps_until_holder_expires() -> None:
+    now = [NOW]
+    server = FakeClickHouse(databases=["test"], clock=lambda: now[0])
+    holder = MigrationLock(server.connect(URL), db="test", ttl=45)  # type: ignore[arg-type]
+    holder.acquire()
+    lock = MigrationLock(server.connect(URL), db="test", ttl=60)  # type: ignore[arg-type]
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += dt.timedelta(seconds=seconds)
+
+    with patch("py_clickhouse_migrator.lock.time.sleep", side_effect=sleep):
+        lock.acquire(wait=LockWait(until_expiry=True, max_delay=60.0, timeout=120.0))
+
+    assert sleeps == [45.0]
+    assert lock.is_locked()
+
+
+def test_cli_lock_wait_options() -> None:
+    with (
+        patch("py_clickhouse_migrator.cli.Migrator"),
+        patch("py_clickhouse_migrator.cli.MigrationLock") as mock_lock_cls,
+    ):
+        result = CliRunner().invoke(
+            main,
+            ["--url", URL, "up", "--lock-wait", "jitter", "--lock-wait-timeout", "300", "--lock-wait-until-expiry"],
+        )
+
+    assert result.exit_code == 0, result.output
+    assert mock_lock_cls.call_args.kwargs["wait"] == LockWait(LockWaitStrategy.JITTER, timeout=300.0, until_expiry=True)
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+import datetime as dt
 import logging
 import os
 import shutil
+from collections.abc import Callable
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import click
 import pytest
 from clickhouse_driver import Client
+from clickhouse_driver.errors import ServerException
 
+from py_clickhouse_migrator.checksum import compute_statement_checksum
 from py_clickhouse_migrator.errors import (
     BaselineError,
     ClickHouseServerIsNotHealthyError,
@@ -20,15 +25,26 @@ from py_clickhouse_migrator.errors import (
 )
 from py_clickhouse_migrator.migrator import (
     DEFAULT_MIGRATIONS_DIR,
+    LedgerRow,
+    LedgerSnapshot,
     Migration,
+    MigrationDirection,
     MigrationKind,
     Migrator,
+    MigrationStats,
     create_migration_file,
     create_migrations_dir,
+    format_migration_stats,
 )
 
 
-from tests.helpers import MIGRATION_FILENAME_REGEX, create_test_migration, table_exists
+from tests.fake_clickhouse import FakeClickHouse
+from tests.helpers import (
+    MIGRATION_FILENAME_REGEX,
+    create_test_migration,
+    render_test_migration_content,
+    table_exists,
+)
 
 
 def test_db_migrations_table_creation(ch_client: Client, test_db: str) -> None:
@@ -743,6 +759,58 @@ def test_validate_statements_wraps_clickhouse_error(migrator: Migrator) -> None:
         migrator.validate_statements(["SELECT FROM system.tables"])
 
 
+def _make_offline_migrator(**kwargs: object) -> Migrator:
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", return_value=MagicMock()),
+        patch.object(Migrator, "check_migrations_table"),
+    ):
+        return Migrator(database_url="clickhouse://default@localhost:9000/test", **kwargs)  # type: ignore[arg-type]
+
+
+def _explain_side_effect(query: str, settings: object = None) -> list[tuple[str]]:
+    if "bad" in query:
+        raise ServerException("Syntax error", code=62)
+    return [("ok",)]
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_validate_migrations_reports_all_failures(jobs: int) -> None:
+    migrator = _make_offline_migrator(jobs=jobs, use_cache=False)
+    clients: list[MagicMock] = []
+
+    def create_client() -> MagicMock:
+        client = MagicMock()
+        client.execute.side_effect = _explain_side_effect
+        clients.append(client)
+        return client
+
+    migrator.ch_client.execute.reset_mock()
+    migrator.ch_client.execute.side_effect = _explain_side_effect
+    migrations = [
+        Migration(name="001.sql", up="-- @stmt\nSELECT bad_1\n-- @stmt\nSELECT bad_2", rollback=""),
+        Migration(name="002.sql", up="-- @stmt\nSELECT 1", rollback=""),
+        Migration(name="003.sql", up="-- @stmt\nSELECT bad_3", rollback=""),
+    ]
+
+    with (
+        patch.object(migrator, "create_client", side_effect=create_client),
+        pytest.raises(InvalidMigrationError) as exc_info,
+    ):
+        migrator.validate_migrations(migrations, direction=MigrationDirection.UP)
+
+    message = str(exc_info.value)
+    assert "Validation failed for migration 001.sql" in message
+    assert "Validation failed for migration 003.sql" in message
+    assert "002.sql" not in message
+    assert message.index("bad_1") < message.index("bad_2") < message.index("bad_3")
+    if jobs > 1:
+        assert 1 <= len(clients) <= jobs
+        assert all(client.disconnect.called for client in clients)
+        assert not migrator.ch_client.execute.called
+    else:
+        assert clients == []
+
+
 def test_up_validation_failure_does_not_execute_queries(
     migrator: Migrator, migrator_init: None, ch_client: Client
 ) -> None:
@@ -876,6 +944,135 @@ def test_get_db_name_with_query_params() -> None:
     assert migrator.get_db_name() == "mydb"
 
 
+def test_load_ledger_snapshot_properties() -> None:
+    applied_at = dt.datetime(2026, 1, 1)
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", return_value=MagicMock()),
+        patch.object(Migrator, "check_migrations_table"),
+    ):
+        migrator = Migrator(database_url="clickhouse://default@localhost:9000/test")
+    migrator.ch_client.execute.return_value = [
+        ("001.sql", "baseline", "", applied_at),
+        ("002.sql", "migration", "abc", applied_at),
+    ]
+
+    ledger = migrator.load_ledger()
+
+    assert ledger.rows[0] == LedgerRow("001.sql", "baseline", "", applied_at)
+    assert ledger.applied_names == ["001.sql", "002.sql"]
+    assert ledger.baseline_names == {"001.sql"}
+    assert ledger.checksums == [("002.sql", "abc")]
+
+
+def test_show_migrations_reads_ledger_once(tmp_path: Path) -> None:
+    migrations_dir = str(tmp_path)
+    create_test_migration(name="applied", up="SELECT 1", rollback="", migrations_dir=migrations_dir)
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", return_value=MagicMock()),
+        patch.object(Migrator, "check_migrations_table"),
+    ):
+        migrator = Migrator(database_url="clickhouse://default@localhost:9000/test", migrations_dir=migrations_dir)
+    migrator.ch_client.execute.reset_mock()
+    migrator.ch_client.execute.return_value = []
+
+    result = migrator.show_migrations()
+
+    assert "Pending: 1" in click.unstyle(result.output)
+    migrator.ch_client.execute.assert_called_once()
+
+
+def test_up_passes_single_ledger_snapshot(tmp_path: Path) -> None:
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", return_value=MagicMock()),
+        patch.object(Migrator, "check_migrations_table"),
+    ):
+        migrator = Migrator(database_url="clickhouse://default@localhost:9000/test", migrations_dir=str(tmp_path))
+    ledger = LedgerSnapshot([])
+
+    with (
+        patch.object(migrator, "load_ledger", return_value=ledger) as mock_load,
+        patch.object(migrator, "check_integrity") as mock_check,
+        patch.object(migrator, "get_migrations_for_apply", return_value=[]) as mock_get,
+    ):
+        migrator.up()
+
+    mock_load.assert_called_once_with()
+    mock_check.assert_called_once_with(allow_dirty=False, ledger=ledger)
+    mock_get.assert_called_once_with(None, ledger=ledger)
+
+
+def test_apply_migration_checkpoints_all_but_last_statement() -> None:
+    migrator = _make_offline_migrator(use_cache=False)
+    migrator.ch_client.execute.reset_mock()
+
+    migrator.apply_migration(["SELECT 1", "SELECT 2", "SELECT 3"], name="001.sql")
+
+    executed = [call.args[0] for call in migrator.ch_client.execute.call_args_list]
+    assert executed[0::2] == ["SELECT 1", "SELECT 2", "SELECT 3"]
+    progress = [
+        call.args[1] for call in migrator.ch_client.execute.call_args_list if "db_migrations_progress" in call.args[0]
+    ]
+    assert progress == [
+        [["001.sql", 0, compute_statement_checksum("SELECT 1")]],
+        [["001.sql", 1, compute_statement_checksum("SELECT 2")]],
+    ]
+
+
+@pytest.mark.parametrize(
+    ("stored", "expected_start"),
+    [
+        ({}, 0),
+        ({0: compute_statement_checksum("SELECT 1")}, 1),
+        ({0: compute_statement_checksum("SELECT 1"), 1: compute_statement_checksum("SELECT 2")}, 2),
+        ({0: compute_statement_checksum("SELECT 1"), 1: "edited"}, 1),
+        ({1: compute_statement_checksum("SELECT 2")}, 0),
+    ],
+)
+def test_get_resume_index(stored: dict[int, str], expected_start: int) -> None:
+    migrator = _make_offline_migrator(use_cache=False)
+    migration = Migration(name="001.sql", up="-- @stmt\nSELECT 1\n-- @stmt\nSELECT 2\n-- @stmt\nSELECT 3", rollback="")
+
+    assert migrator._get_resume_index(migration, stored) == expected_start
+
+
+def test_up_resumes_from_checkpoint_and_clears_progress(tmp_path: Path) -> None:
+    migrator = _make_offline_migrator(migrations_dir=str(tmp_path), use_cache=False)
+    migration = Migration(name="001.sql", up="-- @stmt\nSELECT 1\n-- @stmt\nSELECT 2", rollback="")
+    stored = {"001.sql": {0: compute_statement_checksum("SELECT 1")}}
+
+    with (
+        patch.object(migrator, "load_ledger", return_value=LedgerSnapshot([])),
+        patch.object(migrator, "check_integrity"),
+        patch.object(migrator, "get_migrations_for_apply", return_value=[migration]),
+        patch.object(migrator, "check_progress_table"),
+        patch.object(migrator, "load_statement_progress", return_value=stored),
+        patch.object(migrator, "apply_migration") as mock_apply,
+        patch.object(migrator, "save_applied_migration"),
+        patch.object(migrator, "clear_statement_progress") as mock_clear,
+    ):
+        migrator.up()
+
+    mock_apply.assert_called_once_with(["SELECT 1", "SELECT 2"], name="001.sql", start=1, chunks={}, client=None)
+    mock_clear.assert_called_once_with("001.sql")
+
+
+def test_up_dry_run_skips_progress_table(tmp_path: Path) -> None:
+    migrator = _make_offline_migrator(migrations_dir=str(tmp_path), use_cache=False)
+    migration = Migration(name="001.sql", up="-- @stmt\nSELECT 1", rollback="")
+
+    with (
+        patch.object(migrator, "load_ledger", return_value=LedgerSnapshot([])),
+        patch.object(migrator, "check_integrity"),
+        patch.object(migrator, "get_migrations_for_apply", return_value=[migration]),
+        patch.object(migrator, "check_progress_table") as mock_table,
+        patch.object(migrator, "load_statement_progress") as mock_load,
+    ):
+        migrator.up(dry_run=True)
+
+    mock_table.assert_not_called()
+    mock_load.assert_not_called()
+
+
 def test_show_migrations_no_applied(migrator: Migrator, migrator_init: None) -> None:
     """show_migrations with zero applied migrations should show 'none'."""
     output, warning = migrator.show_migrations()
@@ -955,3 +1152,131 @@ def test_migrator_cluster_param_empty_by_default(ch_client: Client, test_db: str
     migrator = Migrator(database_url=test_db)
     assert migrator.cluster == ""
     ch_client.execute("DROP TABLE IF EXISTS db_migrations")
+
+
+# --- migration stats ---
+
+
+def test_up_records_migration_stats(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    create_test_migration(name="one", up=["SELECT 1", "SELECT 22"], rollback="", migrations_dir=str(tmp_path))
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server, record_stats=True)
+
+    [name] = migrator.up(validate=False)
+
+    [stats] = migrator.get_migration_stats()
+    assert stats.name == name
+    assert stats.resumed_from == 0
+    assert len(stats.statement_duration_ms) == 2
+    assert (stats.read_rows, stats.read_bytes, stats.peak_memory_usage) == (2, len("SELECT 1") + len("SELECT 22"), 9)
+    [row] = server.databases["test"].stats
+    assert len(row["statement_query_ids"]) == 2
+    assert all(query_id in server.query_log for query_id in row["statement_query_ids"])
+
+
+def test_up_skips_stats_table_by_default(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    create_test_migration(name="one", up="SELECT 1", rollback="", migrations_dir=str(tmp_path))
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server)
+
+    migrator.up(validate=False)
+
+    assert "db_migrations_stats" not in server.databases["test"].tables
+    assert migrator.get_migration_stats() == []
+
+
+def test_stats_failure_does_not_fail_up(
+    fake_migrator: Callable[..., Migrator], tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    create_test_migration(name="one", up="SELECT 1", rollback="", migrations_dir=str(tmp_path))
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server, record_stats=True)
+
+    with patch.object(server, "_stats_query", side_effect=ServerException("Not enough privileges", code=497)):
+        applied = migrator.up(validate=False)
+
+    assert len(applied) == 1
+    assert "Could not record migration stats" in caplog.text
+
+
+def test_stats_without_query_log_records_durations_quietly(
+    fake_migrator: Callable[..., Migrator], tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    create_test_migration(name="one", up="SELECT 1", rollback="", migrations_dir=str(tmp_path))
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server, record_stats=True)
+    dispatch = server._dispatch
+
+    def without_query_log(db: object, sql: str, params: object) -> object:
+        if "system.query_log" in sql:
+            raise ServerException("Table system.query_log does not exist", code=60)
+        return dispatch(db, sql, params)  # type: ignore[arg-type]
+
+    with caplog.at_level(logging.WARNING), patch.object(server, "_dispatch", side_effect=without_query_log):
+        migrator.up(validate=False)
+
+    assert caplog.text == ""
+    [row] = server.databases["test"].stats
+    assert row["read_rows"] == 0
+
+
+def test_stats_recorded_for_applied_migrations_when_later_one_fails(
+    fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    (tmp_path / "001_ok.sql").write_text(render_test_migration_content("SELECT 1", "SELECT 2"), encoding="utf-8")
+    (tmp_path / "002_bad.sql").write_text(render_test_migration_content("SELECT broken", "SELECT 2"), encoding="utf-8")
+    server = FakeClickHouse(databases=["test"])
+    server.fail_on("broken")
+    migrator = fake_migrator(server, record_stats=True)
+
+    with pytest.raises(InvalidMigrationError):
+        migrator.up(validate=False)
+
+    assert [row["name"] for row in server.databases["test"].stats] == server.applied_names("test") == ["001_ok.sql"]
+
+
+def test_get_migration_stats_orders_by_duration_and_skips_rolled_back(tmp_path: Path) -> None:
+    migrator = _make_offline_migrator(migrations_dir=str(tmp_path))
+    started_at = dt.datetime(2026, 1, 1)
+    stats_rows = [
+        ("001.sql", started_at, 50, 0, [50], 0, 0, 0, 0, 0),
+        ("002.sql", started_at, 900, 0, [100, 800], 10, 1024, 0, 0, 2048),
+        ("003.sql", started_at, 9000, 0, [9000], 0, 0, 0, 0, 0),
+    ]
+    ledger = LedgerSnapshot([LedgerRow(name, "migration", "", started_at) for name in ("001.sql", "002.sql")])
+    migrator.ch_client.execute.return_value = stats_rows
+
+    stats = migrator.get_migration_stats(ledger=ledger)
+
+    assert [item.name for item in stats] == ["002.sql", "001.sql"]
+    assert stats[0].statement_duration_ms == [100, 800]
+    assert migrator.get_migration_stats(limit=1, ledger=ledger) == stats[:1]
+
+
+def test_get_migration_stats_without_stats_table() -> None:
+    migrator = _make_offline_migrator()
+    migrator.ch_client.execute.side_effect = ServerException("Table db_migrations_stats does not exist", code=60)
+
+    assert migrator.get_migration_stats() == []
+
+
+def test_format_migration_stats() -> None:
+    stats = MigrationStats(
+        name="002.sql",
+        started_at=dt.datetime(2026, 1, 1, 10, 0),
+        duration_ms=125_000,
+        resumed_from=1,
+        statement_duration_ms=[1_000, 124_000],
+        read_rows=10,
+        read_bytes=2048,
+        peak_memory_usage=3 * 1024 * 1024,
+    )
+
+    output = click.unstyle(format_migration_stats([stats]))
+
+    assert output.splitlines() == [
+        "Slowest migrations:",
+        "  002.sql  2m 05s  started 2026-01-01 10:00:00  2 statement(s), slowest #3 2m 04s  resumed at #2"
+        "  read 10 rows/2.0KiB  written 0 rows/0B  peak memory 3.0MiB",
+    ]
+    assert "no stats recorded yet" in format_migration_stats([])
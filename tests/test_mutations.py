@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from py_clickhouse_migrator.errors import MutationFailedError, MutationTimeoutError
+from py_clickhouse_migrator.migrator import Migrator
+from py_clickhouse_migrator.mutations import MutationTarget, MutationWaiter, find_mutation_target
+
+FAKE_URL = "clickhouse://default@localhost:9000/test"
+
+
+@pytest.mark.parametrize(
+    ("statement", "expected"),
+    [
+        ("ALTER TABLE events UPDATE x = 1 WHERE id = 2", MutationTarget("test", "events")),
+        ("alter table analytics.events delete where id = 2", MutationTarget("analytics", "events")),
+        ("ALTER TABLE `my db`.`events` MODIFY COLUMN x UInt64", MutationTarget("my db", "events")),
+        ("ALTER TABLE events ON CLUSTER main DROP COLUMN x", MutationTarget("test", "events")),
+        ("-- backfill\nALTER TABLE events\n    MATERIALIZE INDEX idx_x", MutationTarget("test", "events")),
+        ("ALTER TABLE events ADD COLUMN x UInt64, UPDATE x = 1 WHERE 1", MutationTarget("test", "events")),
+        ("ALTER TABLE events ADD COLUMN x UInt64", None),
+        ("ALTER TABLE events DROP PARTITION 202401", None),
+        ("ALTER TABLE events MODIFY COMMENT 'updated'", None),
+        ("CREATE TABLE events (id UInt64) ENGINE = MergeTree ORDER BY id", None),
+        ("INSERT INTO events SELECT * FROM staging WHERE updated", None),
+    ],
+)
+def test_find_mutation_target(statement: str, expected: MutationTarget | None) -> None:
+    assert find_mutation_target(statement, default_db="test") == expected
+
+
+def _rows(*parts_to_do: int, fail_reason: str = "") -> list[tuple[str, str, int, str]]:
+    return [(f"mutation_{i}.txt", "UPDATE x = 1 WHERE 1", parts, fail_reason) for i, parts in enumerate(parts_to_do)]
+
+
+def test_wait_polls_until_done() -> None:
+    client = MagicMock()
+    client.execute.side_effect = [_rows(10), _rows(4), []]
+    waiter = MutationWaiter(client, timeout=60, poll_interval=0.5)
+
+    with patch("py_clickhouse_migrator.mutations.time") as mock_time:
+        mock_time.monotonic.return_value = 0.0
+        waiter.wait(MutationTarget("test", "events"))
+
+    assert client.execute.call_count == 3
+    assert mock_time.sleep.call_count == 2
+    assert client.execute.call_args.args[1] == {"database": "test", "table": "events"}
+
+
+def test_wait_returns_without_sleep_when_no_mutations() -> None:
+    client = MagicMock()
+    client.execute.return_value = []
+
+    with patch("py_clickhouse_migrator.mutations.time") as mock_time:
+        mock_time.monotonic.return_value = 0.0
+        MutationWaiter(client).wait(MutationTarget("test", "events"))
+
+    mock_time.sleep.assert_not_called()
+
+
+def test_wait_raises_on_persistent_mutation_failure() -> None:
+    client = MagicMock()
+    client.execute.return_value = _rows(3, fail_reason="Cannot parse input")
+    waiter = MutationWaiter(client, failure_timeout=60)
+
+    with patch("py_clickhouse_migrator.mutations.time") as mock_time:
+        mock_time.monotonic.side_effect = [0.0, 1.0, 30.0, 61.0]
+        with pytest.raises(MutationFailedError, match="failed for 60s: Cannot parse input.*\n.*\n.*KILL MUTATION"):
+            waiter.wait(MutationTarget("test", "events"), query_id="migrator-1")
+
+    assert client.execute.call_count == 3
+
+
+def test_wait_continues_when_failed_mutation_recovers(caplog: pytest.LogCaptureFixture) -> None:
+    client = MagicMock()
+    client.execute.side_effect = [_rows(3, fail_reason="Memory limit exceeded"), _rows(1), []]
+    waiter = MutationWaiter(client, failure_timeout=60)
+
+    with patch("py_clickhouse_migrator.mutations.time") as mock_time:
+        mock_time.monotonic.side_effect = [0.0, 1.0, 50.0]
+        waiter.wait(MutationTarget("test", "events"))
+
+    assert client.execute.call_count == 3
+    assert "ClickHouse will retry it: Memory limit exceeded" in caplog.text
+
+
+def test_wait_reports_failure_still_present_at_timeout() -> None:
+    client = MagicMock()
+    client.execute.return_value = _rows(3, fail_reason="Cannot parse input")
+    waiter = MutationWaiter(client, timeout=10, failure_timeout=60)
+
+    with patch("py_clickhouse_migrator.mutations.time") as mock_time:
+        mock_time.monotonic.side_effect = [0.0, 5.0, 10.0]
+        with pytest.raises(MutationFailedError, match="failed for 5s"):
+            waiter.wait(MutationTarget("test", "events"))
+
+
+def test_wait_ignores_mutations_pending_before_the_statement() -> None:
+    client = MagicMock()
+    unrelated = ("mutation_9.txt", "DELETE WHERE 1", 50, "Cannot parse input")
+    client.execute.side_effect = [[unrelated], [unrelated, *_rows(2)], [unrelated]]
+    waiter = MutationWaiter(client, timeout=60, failure_timeout=0)
+
+    before = waiter.pending_ids(MutationTarget("test", "events"))
+    with patch("py_clickhouse_migrator.mutations.time") as mock_time:
+        mock_time.monotonic.return_value = 0.0
+        waiter.wait(MutationTarget("test", "events"), ignore=before)
+
+    assert before == {"mutation_9.txt"}
+    assert client.execute.call_count == 3
+
+
+def test_wait_raises_on_timeout() -> None:
+    client = MagicMock()
+    client.execute.return_value = _rows(3, 2)
+    waiter = MutationWaiter(client, timeout=10)
+
+    with patch("py_clickhouse_migrator.mutations.time") as mock_time:
+        mock_time.monotonic.side_effect = [0.0, 5.0, 10.0]
+        with pytest.raises(MutationTimeoutError, match=r"mutation_0.txt, mutation_1.txt \(5 part\(s\) left\)"):
+            waiter.wait(MutationTarget("test", "events"))
+
+
+def test_wait_reads_all_replicas_on_cluster() -> None:
+    client = MagicMock()
+    client.execute.return_value = []
+
+    MutationWaiter(client, cluster="main").wait(MutationTarget("test", "events"))
+
+    assert "clusterAllReplicas('main', system.mutations)" in client.execute.call_args.args[0]
+
+
+def test_apply_migration_waits_for_mutations() -> None:
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", return_value=MagicMock()),
+        patch.object(Migrator, "check_migrations_table"),
+    ):
+        migrator = Migrator(database_url=FAKE_URL, use_cache=False, wait_mutations=True)
+    migrator.ch_client.execute.reset_mock()
+
+    with (
+        patch.object(MutationWaiter, "pending_ids", return_value=frozenset({"mutation_1.txt"})) as mock_pending,
+        patch.object(MutationWaiter, "wait") as mock_wait,
+    ):
+        migrator.apply_migration(["ALTER TABLE events ADD COLUMN x UInt64", "ALTER TABLE events UPDATE x = 1 WHERE 1"])
+
+    query_ids = [call.kwargs["query_id"] for call in migrator.ch_client.execute.call_args_list]
+    assert all(query_id.startswith("migrator-") for query_id in query_ids)
+    mock_pending.assert_called_once_with(MutationTarget("test", "events"), client=None)
+    mock_wait.assert_called_once_with(
+        MutationTarget("test", "events"), query_id=query_ids[1], client=None, ignore=frozenset({"mutation_1.txt"})
+    )
+
+
+def test_apply_migration_does_not_wait_by_default() -> None:
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", return_value=MagicMock()),
+        patch.object(Migrator, "check_migrations_table"),
+    ):
+        migrator = Migrator(database_url=FAKE_URL, use_cache=False)
+    migrator.ch_client.execute.reset_mock()
+
+    with patch.object(MutationWaiter, "wait") as mock_wait:
+        migrator.apply_migration(["ALTER TABLE events UPDATE x = 1 WHERE 1"])
+
+    mock_wait.assert_not_called()
+    migrator.ch_client.execute.assert_called_once_with("ALTER TABLE events UPDATE x = 1 WHERE 1")
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import itertools
+import logging
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from click.testing import CliRunner
+from clickhouse_driver.errors import ServerException
+
+from py_clickhouse_migrator.cli import main
+from py_clickhouse_migrator.errors import StatementTimeoutError
+from py_clickhouse_migrator.migrator import Migrator
+from py_clickhouse_migrator.progress import StatementMonitor, StatementProgress, format_progress
+from py_clickhouse_migrator.timings import QueryCategory, QueryTimings
+from tests.fake_clickhouse import FakeClickHouse
+from tests.helpers import render_test_migration_content
+
+URL = "clickhouse://default@localhost:9000/test"
+BACKFILL = "INSERT INTO events_v2 SELECT * FROM events"
+# ClickHouse sends total_rows once, with the first packet; the client adds up all packets.
+PACKETS = [{"rows": 1_000_000, "bytes": 64 * 1024**2, "total_rows": 4_000_000, "written_rows": 1_000_000}] + [
+    {"rows": 1_000_000, "bytes": 64 * 1024**2, "written_rows": 1_000_000}
+] * 3
+
+
+def _clock(step: float) -> itertools.count[float]:
+    return itertools.count(0.0, step)
+
+
+def test_format_progress_with_total_rows() -> None:
+    progress = StatementProgress(1_000_000, 64 * 1024**2, 4_000_000, 900_000, 0, elapsed=10.0)
+
+    assert format_progress(progress) == (
+        "1.0M/4.0M rows (25.0%), 64.0MiB read, 900.0k rows written, 100.0k rows/s, ETA 30s, 10s elapsed"
+    )
+
+
+def test_format_progress_without_total_rows() -> None:
+    progress = StatementProgress(1500, 2048, 0, 0, 0, elapsed=3725.0)
+
+    assert progress.eta is None
+    assert format_progress(progress) == "1.5k rows, 2.0KiB read, 0 rows/s, 1h02m elapsed"
+
+
+def test_monitor_logs_progress_every_interval(caplog: pytest.LogCaptureFixture) -> None:
+    server = FakeClickHouse(databases=["test"])
+    server.progress_on("events_v2", PACKETS)
+    clock = _clock(3.0)
+    monitor = StatementMonitor(server.connect(URL), report_interval=5.0, clock=lambda: next(clock))  # type: ignore[arg-type]
+
+    with caplog.at_level(logging.INFO, logger="py_clickhouse_migrator"):
+        progress = monitor.execute(BACKFILL, label="0001_backfill.sql statement 1/1")
+
+    assert server.statements("test") == [BACKFILL]
+    assert (progress.read_rows, progress.total_rows, progress.written_rows) == (4_000_000, 4_000_000, 4_000_000)
+    lines = [record.getMessage() for record in caplog.records]
+    assert lines == [
+        "0001_backfill.sql statement 1/1: 2.0M/4.0M rows (50.0%), 128.0MiB read, 2.0M rows written, "
+        "333.3k rows/s, ETA 6s, 6s elapsed",
+        "0001_backfill.sql statement 1/1: 4.0M/4.0M rows (100.0%), 256.0MiB read, 4.0M rows written, "
+        "333.3k rows/s, 12s elapsed",
+    ]
+
+
+def test_monitor_cancels_statement_after_timeout() -> None:
+    client = MagicMock()
+    result = client.execute_with_progress.return_value
+    result.__iter__.return_value = iter([(1, 10), (2, 10), (3, 10)])
+    result.progress_totals.configure_mock(rows=2, bytes=10, total_rows=10, written_rows=0, written_bytes=0)
+    clock = _clock(30.0)
+    monitor = StatementMonitor(client, report_interval=0, timeout=60, clock=lambda: next(clock))
+
+    with pytest.raises(StatementTimeoutError, match=r"did not finish in 60s and was cancelled \(query q1\)"):
+        monitor.execute(BACKFILL, query_id="q1")
+
+    client.execute_with_progress.assert_called_once_with(BACKFILL, settings={"max_execution_time": 60}, query_id="q1")
+    client.cancel.assert_called_once_with()
+    result.get_result.assert_not_called()
+
+
+def test_monitor_disconnects_when_cancel_fails() -> None:
+    client = MagicMock()
+    result = client.execute_with_progress.return_value
+    result.__iter__.return_value = iter([(1, 0)])
+    result.progress_totals.configure_mock(rows=1, bytes=0, total_rows=0, written_rows=0, written_bytes=0)
+    client.cancel.side_effect = ServerException("Query was cancelled", code=394)
+    clock = _clock(10.0)
+    monitor = StatementMonitor(client, report_interval=0, timeout=5, clock=lambda: next(clock))
+
+    with pytest.raises(StatementTimeoutError):
+        monitor.execute(BACKFILL)
+
+    client.disconnect.assert_called_once_with()
+
+
+def test_server_side_timeout_is_reported_as_statement_timeout(
+    fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    (tmp_path / "001_backfill.sql").write_text(render_test_migration_content(["SELECT 1 FROM t", BACKFILL], ""))
+    server = FakeClickHouse(databases=["test"])
+    server.fail_on("events_v2", code=159)
+    migrator = fake_migrator(server, statement_timeout=30)
+
+    with pytest.raises(StatementTimeoutError, match="did not finish in 30s"):
+        migrator.up(validate=False)
+
+    assert server.applied_names("test") == []
+    server.clear_failures()
+    assert migrator.up(validate=False) == ["001_backfill.sql"]
+    assert server.statements("test") == ["SELECT 1 FROM t", BACKFILL]
+
+
+def test_progress_is_used_for_migration_statements(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    (tmp_path / "001_backfill.sql").write_text(render_test_migration_content(BACKFILL, "TRUNCATE TABLE events_v2"))
+    server = FakeClickHouse(databases=["test"])
+    server.progress_on("events_v2", PACKETS)
+    timings = QueryTimings()
+    migrator = fake_migrator(server, timings=timings, progress_interval=5)
+
+    assert migrator.up(validate=False) == ["001_backfill.sql"]
+    migrator.rollback()
+
+    assert server.statements("test") == [BACKFILL, "TRUNCATE TABLE events_v2"]
+    assert timings.stats()[QueryCategory.USER_DDL].count == 2
+
+
+def test_cli_statement_timeout(tmp_path: Path) -> None:
+    (tmp_path / "001_backfill.sql").write_text(render_test_migration_content(BACKFILL, ""))
+    server = FakeClickHouse(databases=["test"])
+    server.fail_on("events_v2", code=159)
+
+    with patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect):
+        result = CliRunner().invoke(
+            main,
+            ["--url", URL, "--path", str(tmp_path), "up", "--no-lock", "--no-validate", "--statement-timeout", "45"],
+        )
+
+    assert result.exit_code == 1
+    assert "did not finish in 45s" in result.stderr
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from py_clickhouse_migrator.cli import main
+from py_clickhouse_migrator.errors import InvalidMigrationError, SquashError
+from py_clickhouse_migrator.migration_parser import load_migration_header
+from py_clickhouse_migrator.migrator import Migrator
+from py_clickhouse_migrator.squash import squash_database_schema, squash_migration_files, write_snapshot
+from tests.fake_clickhouse import FakeClickHouse
+from tests.helpers import render_test_migration_content
+
+URL = "clickhouse://default@localhost:9000/test"
+
+
+def _write_migrations(tmp_path: Path) -> None:
+    (tmp_path / "001_users.sql").write_text(
+        render_test_migration_content("CREATE TABLE users (id Int32) ENGINE = Memory", "DROP TABLE users")
+    )
+    (tmp_path / "002_events.sql").write_text(
+        "-- migrator:up\n"
+        "-- @stmt chunk_by=partition table=events\n"
+        "ALTER TABLE events UPDATE x = 1 WHERE _partition_id = {partition}\n"
+        "\n-- migrator:down\n"
+        "-- @stmt\nSELECT 1\n"
+    )
+    (tmp_path / "003_users_name.sql").write_text(
+        render_test_migration_content("ALTER TABLE users ADD COLUMN name String", "ALTER TABLE users DROP COLUMN name")
+    )
+
+
+def test_squash_migration_files(tmp_path: Path) -> None:
+    _write_migrations(tmp_path)
+
+    snapshot = squash_migration_files(str(tmp_path), "002_events")
+
+    assert snapshot.filename == "002_events_squashed.sql"
+    assert snapshot.replaced == snapshot.squashes == ["001_users.sql", "002_events.sql"]
+    up, rollback = snapshot.content.split("-- migrator:down")
+    assert "-- @stmt\nCREATE TABLE users" in up
+    assert "-- @stmt chunk_by=partition table=events\nALTER TABLE events UPDATE" in up
+    assert rollback.index("SELECT 1") < rollback.index("DROP TABLE users")
+
+    filepath = write_snapshot(str(tmp_path), snapshot)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["002_events_squashed.sql", "003_users_name.sql"]
+    assert load_migration_header(filepath).squashes == ["001_users.sql", "002_events.sql"]
+
+
+def test_squash_includes_earlier_snapshots(tmp_path: Path) -> None:
+    _write_migrations(tmp_path)
+    write_snapshot(str(tmp_path), squash_migration_files(str(tmp_path), "002_events.sql"))
+
+    snapshot = squash_migration_files(str(tmp_path), "003_users_name.sql")
+
+    assert snapshot.replaced == ["002_events_squashed.sql", "003_users_name.sql"]
+    assert snapshot.squashes == ["001_users.sql", "002_events.sql", "002_events_squashed.sql", "003_users_name.sql"]
+
+
+@pytest.mark.parametrize(
+    ("target", "error"),
+    [("009_missing.sql", "not found"), ("001_users.sql", "is the first migration")],
+)
+def test_squash_rejects_target(tmp_path: Path, target: str, error: str) -> None:
+    _write_migrations(tmp_path)
+
+    with pytest.raises(SquashError, match=error):
+        squash_migration_files(str(tmp_path), target)
+
+
+def test_up_records_snapshot_where_squashed_migrations_are_applied(
+    fake_migrator: Callable[..., Migrator], tmp_path: Path
+) -> None:
+    _write_migrations(tmp_path)
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server)
+    migrator.up(n=2, validate=False)
+    write_snapshot(str(tmp_path), squash_migration_files(str(tmp_path), "002_events.sql"))
+    before = len(server.statements("test"))
+
+    assert migrator.up(validate=False) == ["002_events_squashed.sql", "003_users_name.sql"]
+
+    assert server.statements("test")[before:] == ["ALTER TABLE users ADD COLUMN name String"]
+    migrator.check_integrity()
+
+
+def test_up_applies_snapshot_on_fresh_database(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    _write_migrations(tmp_path)
+    write_snapshot(str(tmp_path), squash_migration_files(str(tmp_path), "002_events.sql"))
+    server = FakeClickHouse(databases=["test"])
+
+    assert fake_migrator(server).up(validate=False) == ["002_events_squashed.sql", "003_users_name.sql"]
+
+    assert server.statements("test")[0] == "CREATE TABLE users (id Int32) ENGINE = Memory"
+    assert server.applied_names("test") == ["002_events_squashed.sql", "003_users_name.sql"]
+
+
+def test_up_rejects_partially_applied_snapshot(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    _write_migrations(tmp_path)
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server)
+    migrator.up(n=1, validate=False)
+    write_snapshot(str(tmp_path), squash_migration_files(str(tmp_path), "002_events.sql"))
+
+    with pytest.raises(InvalidMigrationError, match="only some of them are applied"):
+        migrator.up(validate=False)
+
+
+def test_squash_database_schema(tmp_path: Path) -> None:
+    _write_migrations(tmp_path)
+    server = FakeClickHouse(databases=["test"])
+    server.add_schema_object("test", "db_migrations", "MergeTree", "CREATE TABLE test.db_migrations (name String)")
+    server.add_schema_object("test", "users", "Memory", "CREATE TABLE test.users (id Int32) ENGINE = Memory")
+    server.add_schema_object(
+        "test", "users-view", "View", "CREATE VIEW test.`users-view` AS SELECT id FROM `test`.users"
+    )
+    client = server.connect(URL)
+
+    snapshot = squash_database_schema(
+        client,  # type: ignore[arg-type]
+        "test",
+        str(tmp_path),
+        "002_events.sql",
+        applied=["001_users.sql", "002_events.sql"],
+    )
+
+    up, rollback = snapshot.content.split("-- migrator:down")
+    assert "db_migrations" not in up
+    assert "-- @stmt\nCREATE TABLE users (id Int32) ENGINE = Memory" in up
+    assert "CREATE VIEW `users-view` AS SELECT id FROM users" in up
+    assert rollback.index("DROP VIEW IF EXISTS `users-view`") < rollback.index("DROP TABLE IF EXISTS users")
+
+
+@pytest.mark.parametrize(
+    ("applied", "error"),
+    [
+        (["001_users.sql"], "1 migration\\(s\\) up to it are not applied"),
+        (["001_users.sql", "002_events.sql", "003_users_name.sql"], "after 002_events.sql"),
+    ],
+)
+def test_squash_database_schema_requires_target_state(tmp_path: Path, applied: list[str], error: str) -> None:
+    _write_migrations(tmp_path)
+    client = FakeClickHouse(databases=["test"]).connect(URL)
+
+    with pytest.raises(SquashError, match=error):
+        squash_database_schema(client, "test", str(tmp_path), "002_events.sql", applied)  # type: ignore[arg-type]
+
+
+def test_cli_squash(tmp_path: Path) -> None:
+    _write_migrations(tmp_path)
+
+    dry_run = CliRunner().invoke(main, ["--url", URL, "--path", str(tmp_path), "squash", "002_events", "--dry-run"])
+    result = CliRunner().invoke(main, ["--url", URL, "--path", str(tmp_path), "squash", "002_events"])
+    again = CliRunner().invoke(main, ["--url", URL, "--path", str(tmp_path), "squash", "002_events"])
+
+    assert dry_run.exit_code == 0
+    assert dry_run.output == (tmp_path / "002_events_squashed.sql").read_text()
+    assert result.exit_code == 0
+    assert "Squashed 2 migration(s)" in result.output
+    assert again.exit_code == 1
+    assert "002_events.sql not found" in again.stderr
+
+
+def test_cli_squash_from_database(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    _write_migrations(tmp_path)
+    server = FakeClickHouse(databases=["test"])
+    with patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect):
+        fake_migrator(server).up(n=2, validate=False)
+        server.add_schema_object("test", "users", "Memory", "CREATE TABLE test.users (id Int32) ENGINE = Memory")
+
+        result = CliRunner().invoke(
+            main, ["--url", URL, "--path", str(tmp_path), "squash", "002_events", "--from-database", "--dry-run"]
+        )
+
+    assert result.exit_code == 0
+    assert "from the schema of database test" in result.output
+    assert "CREATE TABLE users (id Int32) ENGINE = Memory" in result.output
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import itertools
+import logging
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from py_clickhouse_migrator.cli import main
+from py_clickhouse_migrator.errors import ThrottleTimeoutError
+from py_clickhouse_migrator.migrator import Migrator
+from py_clickhouse_migrator.throttle import LoadThrottle, ServerLoad, ThrottleConfig, parse_throttle_spec
+from tests.fake_clickhouse import FakeClickHouse
+from tests.helpers import render_test_migration_content
+
+URL = "clickhouse://default@localhost:9000/test"
+
+
+def test_parse_throttle_spec() -> None:
+    assert parse_throttle_spec(" queries=50, merges=10,mutations=2,background_tasks=16 ", timeout=60) == ThrottleConfig(
+        max_queries=50, max_background_tasks=16, max_merges=10, max_mutations=2, timeout=60
+    )
+
+
+@pytest.mark.parametrize(
+    ("spec", "error"),
+    [
+        ("queries", "Invalid throttle limit 'queries'"),
+        ("cpu=80", "Invalid throttle limit 'cpu=80'"),
+        ("merges=0", "must be a positive integer"),
+        ("merges=many", "must be a positive integer"),
+        (" , ", "at least one limit"),
+    ],
+)
+def test_parse_throttle_spec_errors(spec: str, error: str) -> None:
+    with pytest.raises(ValueError, match=error):
+        parse_throttle_spec(spec)
+
+
+def test_exceeded_ignores_disabled_limits() -> None:
+    throttle = LoadThrottle(FakeClickHouse(databases=["test"]).connect(URL), ThrottleConfig(max_merges=2))  # type: ignore[arg-type]
+
+    assert throttle.exceeded(ServerLoad(queries=500, background_tasks=0, merges=3, mutations=9)) == ["merges 3 > 2"]
+
+
+def test_wait_pauses_until_load_drops(caplog: pytest.LogCaptureFixture) -> None:
+    server = FakeClickHouse(databases=["test"])
+    server.set_load(queries=80, merges=3)
+    clock = itertools.count(0.0, 10.0)
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            server.set_load(queries=20, merges=3)
+
+    throttle = LoadThrottle(
+        server.connect(URL),  # type: ignore[arg-type]
+        ThrottleConfig(max_queries=50, max_merges=5, poll_interval=30),
+        clock=lambda: next(clock),
+        sleep=sleep,
+    )
+
+    with caplog.at_level(logging.INFO, logger="py_clickhouse_migrator"):
+        waited = throttle.wait("001.sql statement 1/1")
+
+    assert sleeps == [30, 30]
+    assert waited == throttle.paused_seconds > 0
+    assert [record.getMessage() for record in caplog.records] == [
+        "Throttling before 001.sql statement 1/1: queries 80 > 50.",
+        f"Server load is back under the limits after {waited:.0f}s, resuming.",
+    ]
+
+
+def test_wait_skips_checks_within_poll_interval() -> None:
+    server = FakeClickHouse(databases=["test"])
+    now = [0.0]
+    throttle = LoadThrottle(server.connect(URL), ThrottleConfig(max_queries=5, poll_interval=5), clock=lambda: now[0])  # type: ignore[arg-type]
+
+    throttle.wait()
+    now[0] = 4.0
+    throttle.wait()
+    now[0] = 6.0
+    throttle.wait()
+
+    assert server.round_trips == 2
+
+
+def test_wait_times_out() -> None:
+    server = FakeClickHouse(databases=["test"])
+    server.set_load(mutations=4)
+    clock = itertools.count(0.0, 100.0)
+    throttle = LoadThrottle(
+        server.connect(URL),  # type: ignore[arg-type]
+        ThrottleConfig(max_mutations=1, timeout=250),
+        clock=lambda: next(clock),
+        sleep=lambda seconds: None,
+    )
+
+    with pytest.raises(ThrottleTimeoutError, match=r"for 250s before 001.sql: mutations 4 > 1"):
+        throttle.wait("001.sql")
+
+
+def test_migrator_checks_load_before_statements(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    (tmp_path / "001.sql").write_text(render_test_migration_content(["SELECT 2", "SELECT 3"], ""))
+    server = FakeClickHouse(databases=["test"])
+    migrator = fake_migrator(server, throttle=ThrottleConfig(max_merges=10, poll_interval=0))
+    server.reset_stats()
+
+    migrator.up(validate=False)
+
+    statements = [sql for _, sql in server.queries if "system.metrics" in sql or sql.startswith("SELECT 2")]
+    assert len(statements) == 3
+    assert statements[1] == "SELECT 2"
+
+
+def test_cli_rejects_invalid_throttle(tmp_path: Path) -> None:
+    result = CliRunner().invoke(main, ["--url", URL, "--path", str(tmp_path), "up", "--throttle", "cpu=90"])
+
+    assert result.exit_code == 2
+    assert "Invalid throttle limit 'cpu=90'" in result.output
+
+
+def test_cli_throttle_timeout(tmp_path: Path) -> None:
+    (tmp_path / "001.sql").write_text(render_test_migration_content("SELECT 2", ""))
+    server = FakeClickHouse(databases=["test"])
+    server.set_load(merges=50)
+
+    with (
+        patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect),
+        patch(
+            "py_clickhouse_migrator.migrator.LoadThrottle",
+            partial(LoadThrottle, clock=partial(next, itertools.count(0.0, 1000.0)), sleep=lambda seconds: None),
+        ),
+    ):
+        result = CliRunner().invoke(
+            main,
+            ["--url", URL, "--path", str(tmp_path), "up", "--no-lock", "--no-validate", "--throttle", "merges=10"],
+        )
+
+    assert result.exit_code == 1
+    assert "merges 50 > 10" in result.stderr
+    assert server.statements("test") == []
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from click.testing import CliRunner
+from clickhouse_driver.errors import ServerException
+
+from py_clickhouse_migrator.cli import main
+from py_clickhouse_migrator.lock import MigrationLock
+from py_clickhouse_migrator.migrator import Migrator
+from py_clickhouse_migrator.timings import InstrumentedClient, QueryCategory, QueryTimings, classify_query
+from tests.fake_clickhouse import FakeClickHouse
+from tests.helpers import render_test_migration_content
+
+URL = "clickhouse://default@localhost:9000/test"
+
+
+@pytest.mark.parametrize(
+    ("query", "category"),
+    [
+        ("SELECT 1", QueryCategory.SERVICE),
+        ("SELECT version()", QueryCategory.SERVICE),
+        ("\n  CREATE TABLE IF NOT EXISTS db_migrations (name String) Engine MergeTree()", QueryCategory.SERVICE),
+        ("CREATE TABLE IF NOT EXISTS test._migrations_lock (lock_id String)", QueryCategory.SERVICE),
+        ("SELECT name, kind, checksum, dt FROM db_migrations ORDER BY dt", QueryCategory.LEDGER_READ),
+        ("INSERT INTO db_migrations (name, kind, up, rollback, checksum) VALUES", QueryCategory.LEDGER_WRITE),
+        ("ALTER TABLE db_migrations UPDATE checksum = %(checksum)s", QueryCategory.LEDGER_WRITE),
+        ("DELETE FROM db_migrations_progress WHERE name = %(name)s", QueryCategory.PROGRESS),
+        ("SELECT locked_by FROM test._migrations_lock FINAL", QueryCategory.LOCK),
+        ("SELECT mutation_id FROM system.mutations", QueryCategory.MUTATION_WAIT),
+        ("SELECT (SELECT value FROM system.metrics), (SELECT count() FROM system.mutations)", QueryCategory.THROTTLE),
+        ("EXPLAIN AST CREATE TABLE t (id Int32) ENGINE = Memory", QueryCategory.VALIDATION),
+        ("CREATE TABLE t (id Int32) ENGINE = Memory", QueryCategory.USER_DDL),
+        ("SELECT 1 FROM events", QueryCategory.USER_DDL),
+        ("SYSTEM FLUSH LOGS", QueryCategory.STATS),
+        ("SELECT query_id FROM system.query_log WHERE type = 'QueryFinish'", QueryCategory.STATS),
+        ("SELECT engine_full FROM system.tables WHERE name = '_migrations_lock'", QueryCategory.SERVICE),
+        ("ALTER TABLE test._migrations_lock MODIFY TTL toDateTime(locked_at) + INTERVAL 1 DAY", QueryCategory.LOCK),
+        ("SELECT mutation_id FROM clusterAllReplicas('main', system.mutations)", QueryCategory.MUTATION_WAIT),
+        ("SELECT partition FROM clusterAllReplicas('main', system.parts)", QueryCategory.PROGRESS),
+        ("SELECT latest.1 FROM (SELECT argMax(locked_by, locked_at) FROM test._migrations_lock)", QueryCategory.LOCK),
+        ("/* startup */ SELECT 1", QueryCategory.SERVICE),
+    ],
+)
+def test_classify_query(query: str, category: QueryCategory) -> None:
+    assert classify_query(query) == category
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "-- wait like system.mutations does\nALTER TABLE events DELETE WHERE id = 1",
+        "/* replaces db_migrations */ ALTER TABLE events UPDATE x = 1 WHERE 1",
+        "INSERT INTO events (note) VALUES ('SELECT 1 FROM system.mutations')",
+        "ALTER TABLE events UPDATE note = 'copied from db_migrations' WHERE id = 1",
+        "ALTER TABLE events UPDATE note = 'it''s in db_migrations -- not a comment' WHERE id = 1",
+        "INSERT INTO events SELECT * FROM db_migrations",
+        "CREATE TABLE IF NOT EXISTS events AS db_migrations",
+    ],
+)
+def test_classify_query_uses_target_table_outside_comments_and_strings(query: str) -> None:
+    assert classify_query(query) == QueryCategory.USER_DDL
+
+
+def test_record_aggregates_per_category() -> None:
+    timings = QueryTimings()
+    timings.record("SELECT 1", 0.0005, bytes_sent=8)
+    timings.record("SELECT 1", 0.02, bytes_sent=8, bytes_received=100)
+    timings.record("CREATE TABLE t (id Int32) ENGINE = Memory", 20.0, failed=True)
+
+    stats = timings.stats()
+
+    assert list(stats) == [QueryCategory.SERVICE, QueryCategory.USER_DDL]
+    service = stats[QueryCategory.SERVICE]
+    assert (service.count, service.bytes_sent, service.bytes_received) == (2, 16, 100)
+    assert service.max_seconds == 0.02
+    assert service.histogram[0] == 1 and service.histogram[3] == 1
+    assert stats[QueryCategory.USER_DDL].errors == 1
+    assert stats[QueryCategory.USER_DDL].histogram[-1] == 1
+    assert timings.count == 3
+
+
+def test_instrumented_client_records_failed_queries() -> None:
+    client = MagicMock()
+    client.execute.side_effect = ServerException("boom", code=62)
+    timings = QueryTimings()
+
+    with pytest.raises(ServerException):
+        InstrumentedClient(client, timings).execute("CREATE TABLE t", settings={})
+
+    client.execute.assert_called_once_with("CREATE TABLE t", settings={})
+    assert timings.stats()[QueryCategory.USER_DDL].errors == 1
+
+
+def test_migrator_and_lock_queries_are_recorded(fake_migrator: Callable[..., Migrator], tmp_path: Path) -> None:
+    (tmp_path / "001.sql").write_text(render_test_migration_content(["SELECT 2", "SELECT 3"], "SELECT 4"))
+    server = FakeClickHouse(databases=["test"])
+    timings = QueryTimings()
+    migrator = fake_migrator(server, timings=timings, record_stats=True)
+
+    with MigrationLock(client=migrator.ch_client, db="test"):
+        migrator.up()
+
+    counts = {category: stats.count for category, stats in timings.stats().items()}
+    assert counts == {
+        QueryCategory.SERVICE: 6,
+        QueryCategory.LEDGER_READ: 1,
+        QueryCategory.LEDGER_WRITE: 1,
+        QueryCategory.PROGRESS: 3,
+        QueryCategory.LOCK: 5,
+        QueryCategory.VALIDATION: 2,
+        QueryCategory.STATS: 3,
+        QueryCategory.USER_DDL: 2,
+    }
+    assert timings.count == server.round_trips
+
+
+def test_cli_timings_flag_prints_report(tmp_path: Path) -> None:
+    (tmp_path / "001.sql").write_text(render_test_migration_content("SELECT 2", "SELECT 3"))
+    server = FakeClickHouse(databases=["test"])
+
+    with patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect):
+        result = CliRunner().invoke(main, ["--url", URL, "--path", str(tmp_path), "--timings", "show"])
+
+    assert result.exit_code == 0, result.output
+    assert "Query timings:" in result.stderr
+    assert "ledger read" in result.stderr
+    assert "Query timings:" not in result.stdout
+
+
+def test_cli_without_timings_flag_prints_no_report(tmp_path: Path) -> None:
+    server = FakeClickHouse(databases=["test"])
+
+    with patch("py_clickhouse_migrator.migrator.Client.from_url", side_effect=server.connect):
+        result = CliRunner().invoke(main, ["--url", URL, "--path", str(tmp_path), "show"])
+
+    assert result.exit_code == 0, result.output
+    assert "Query timings:" not in result.output